@@ -0,0 +1,87 @@
+# aggregates.py — running totals shared by the stats panel, charts and the coach
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Sequence
+
+from chain import Block, to_cents, resume_point
+
+
+@dataclass
+class Aggregates:
+    # kept in integer cents so long ledgers don't accumulate float drift; floats are exposed for display
+    count: int = 0          # blocks folded in so far (genesis included)
+    tip_hash: str = ""      # hash of the last folded block
+    total_in_cents: int = 0
+    total_out_cents: int = 0
+    by_actor_cents: Dict[str, int] = field(default_factory=dict)  # net = deposits - withdrawals
+
+    @property
+    def total_in(self) -> float:
+        return self.total_in_cents / 100
+
+    @property
+    def total_out(self) -> float:
+        return self.total_out_cents / 100
+
+    @property
+    def net(self) -> float:
+        return (self.total_in_cents - self.total_out_cents) / 100
+
+    @property
+    def by_actor(self) -> Dict[str, float]:
+        return {a: c / 100 for a, c in self.by_actor_cents.items()}
+
+    def _fold(self, action: str, actor: str, amount: float, block_hash: str):
+        if action == "DEPOSIT":
+            cents = to_cents(amount)
+            self.total_in_cents += cents
+            self.by_actor_cents[actor] = self.by_actor_cents.get(actor, 0) + cents
+        elif action == "WITHDRAW":
+            cents = to_cents(amount)
+            self.total_out_cents += cents
+            self.by_actor_cents[actor] = self.by_actor_cents.get(actor, 0) - cents
+        self.count += 1
+        self.tip_hash = block_hash
+
+    def apply(self, b: Block):
+        """Fold one new block in. O(1)."""
+        self._fold(b.action, b.actor, b.amount, b.hash)
+
+    def sync(self, chain: Sequence[Block]) -> bool:
+        """Catch up with `chain`, folding only blocks we haven't seen. Rebuilds if history diverged. Returns True if changed.
+
+        A chain with an archived prefix can't be rebuilt from; seed from a snapshot first (snapshots.sync_state).
+        """
+        pos = resume_point(chain, self.count, self.tip_hash)
+        if pos is None:
+            if chain and chain[0].index > 0:
+                raise ValueError("aggregates don't reach the live ledger; restore them from a snapshot")
+            self.__init__()
+            pos = 0
+        if pos == len(chain):
+            return False
+        for b in chain[pos:]:
+            self.apply(b)
+        return True
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "Aggregates":
+        """One pass over plain row dicts (what storage.load_chain returns)."""
+        agg = cls()
+        for r in rows:
+            agg._fold(r.get("action"), r.get("actor", "Unknown"), float(r.get("amount", 0.0)), r.get("hash", ""))
+        return agg
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Aggregates":
+        if "total_in_cents" not in d:
+            return cls()  # missing or pre-cents state: sync() rebuilds from the chain
+        return cls(
+            count=int(d.get("count", 0)),
+            tip_hash=str(d.get("tip_hash", "")),
+            total_in_cents=int(d["total_in_cents"]),
+            total_out_cents=int(d.get("total_out_cents", 0)),
+            by_actor_cents={str(k): int(v) for k, v in (d.get("by_actor_cents") or {}).items()},
+        )
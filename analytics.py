@@ -0,0 +1,166 @@
+# analytics.py — balance / contribution time series from the ledger columns (numpy + pandas, no per-row loops)
+import math
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd   # imported where used: Rollups and snapshots load without it
+
+from chain import Block, to_cents, resume_point
+
+DAY = 86400
+FREQS = {"Daily": "D", "Weekly": "W", "Monthly": "MS"}
+
+
+def _np(arr, start: int) -> np.ndarray:
+    # copy of the tail only; a view on the array itself would stop BlockStore from growing it
+    return np.frombuffer(arr[start:], dtype=arr.typecode)
+
+
+def _columns(chain: Sequence[Block], start: int):
+    """(timestamps, cents, sign, actor ids, actor labels) for chain[start:]. sign is +1 deposit, -1 withdraw, 0 other."""
+    if hasattr(chain, "codes"):   # BlockStore: read the typed arrays directly
+        action_ids, action_values = chain.codes("action")
+        actor_ids, actor_values = chain.codes("actor")
+        signs = np.array([1 if a == "DEPOSIT" else -1 if a == "WITHDRAW" else 0 for a in action_values] or [0])
+        return (_np(chain.timestamps(), start), _np(chain.cents(), start),
+                signs[_np(action_ids, start)], _np(actor_ids, start), actor_values)
+    blocks = chain[start:]
+    actors = sorted({b.actor for b in blocks})
+    ids = {a: i for i, a in enumerate(actors)}
+    return (np.array([b.timestamp for b in blocks], dtype=float),
+            np.array([to_cents(b.amount) for b in blocks], dtype=np.int64),
+            np.array([1 if b.action == "DEPOSIT" else -1 if b.action == "WITHDRAW" else 0 for b in blocks]),
+            np.array([ids[b.actor] for b in blocks], dtype=np.int64), actors)
+
+
+@dataclass
+class Rollups:
+    """Per-day (UTC) deposit/withdrawal totals and per-actor net, in cents. Extended a slice at a time."""
+    count: int = 0          # blocks folded in so far (genesis included)
+    tip_hash: str = ""
+    days: Dict[int, List[int]] = field(default_factory=dict)                 # epoch day -> [in, out]
+    actor_days: Dict[str, Dict[int, int]] = field(default_factory=dict)      # actor -> epoch day -> net
+
+    def sync(self, chain: Sequence[Block]) -> bool:
+        """Catch up with `chain`, rolling up only blocks we haven't seen. Rebuilds if history diverged."""
+        pos = resume_point(chain, self.count, self.tip_hash)
+        if pos is None:
+            if chain and chain[0].index > 0:
+                raise ValueError("rollups don't reach the live ledger; restore them from a snapshot")
+            self.__init__()
+            pos = 0
+        if pos == len(chain):
+            return False
+        self._fold(*_columns(chain, pos))
+        self.count, self.tip_hash = chain[-1].index + 1, chain[-1].hash
+        return True
+
+    def _fold(self, ts, cents, sign, actor_ids, actor_values):
+        moving = sign != 0
+        if not moving.any():
+            return
+        import pandas as pd
+        df = pd.DataFrame({
+            "day": (ts[moving] // DAY).astype(np.int64),
+            "actor": actor_ids[moving],
+            "in": np.where(sign[moving] > 0, cents[moving], 0),
+            "out": np.where(sign[moving] < 0, cents[moving], 0),
+        })
+        # one Python step per (day) / (actor, day) group, not per block
+        for day, i, o in df.groupby("day")[["in", "out"]].sum().itertuples():
+            tot = self.days.setdefault(int(day), [0, 0])
+            tot[0] += int(i)
+            tot[1] += int(o)
+        df["net"] = df["in"] - df["out"]
+        for (actor, day), net in df.groupby(["actor", "day"])["net"].sum().items():
+            per = self.actor_days.setdefault(actor_values[actor], {})
+            per[int(day)] = per.get(int(day), 0) + int(net)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count, "tip_hash": self.tip_hash,
+            "days": {str(d): v for d, v in self.days.items()},
+            "actor_days": {a: {str(d): v for d, v in per.items()} for a, per in self.actor_days.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Rollups":
+        return cls(
+            count=int(d.get("count", 0)),
+            tip_hash=str(d.get("tip_hash", "")),
+            days={int(k): [int(v[0]), int(v[1])] for k, v in (d.get("days") or {}).items()},
+            actor_days={str(a): {int(k): int(v) for k, v in per.items()} for a, per in (d.get("actor_days") or {}).items()},
+        )
+
+
+# ---------- series ----------
+def _day_range(r: Rollups) -> np.ndarray:
+    return np.arange(min(r.days), max(r.days) + 1) if r.days else np.arange(0)
+
+
+def balance_series(r: Rollups, freq: str = "D") -> "pd.DataFrame":
+    """date, deposits, withdrawals, net, balance (end of period), every period filled, in currency units."""
+    import pandas as pd
+    days = _day_range(r)
+    if not len(days):
+        return pd.DataFrame(columns=["date", "deposits", "withdrawals", "net", "balance"])
+    flows = np.zeros((len(days), 2), dtype=np.int64)
+    keys = np.fromiter(r.days, dtype=np.int64, count=len(r.days))
+    flows[keys - days[0]] = np.array(list(r.days.values()), dtype=np.int64)
+    df = pd.DataFrame({"deposits": flows[:, 0], "withdrawals": flows[:, 1]},
+                      index=pd.to_datetime(days, unit="D"))
+    if freq != "D":
+        df = df.resample(freq).sum()
+    df["net"] = df["deposits"] - df["withdrawals"]
+    df["balance"] = df["net"].cumsum()
+    return (df / 100).rename_axis("date").reset_index()
+
+
+def actor_cumulative(r: Rollups, freq: str = "D", top: int = 8) -> "pd.DataFrame":
+    """Long frame (date, actor, cumulative) of each actor's running net; actors past `top` are summed as "others"."""
+    import pandas as pd
+    days = _day_range(r)
+    if not len(days) or not r.actor_days:
+        return pd.DataFrame(columns=["date", "actor", "cumulative"])
+    actors = list(r.actor_days)
+    grid = np.zeros((len(days), len(actors)), dtype=np.int64)
+    for j, a in enumerate(actors):
+        per = r.actor_days[a]
+        grid[np.fromiter(per, dtype=np.int64, count=len(per)) - days[0], j] = list(per.values())
+    wide = pd.DataFrame(grid, index=pd.to_datetime(days, unit="D"), columns=actors)
+    if len(actors) > top:
+        keep = wide.sum().abs().nlargest(top).index
+        wide = wide[keep].assign(others=wide.drop(columns=keep).sum(axis=1))
+    if freq != "D":
+        wide = wide.resample(freq).sum()
+    cum = wide.cumsum() / 100
+    return cum.rename_axis("date").reset_index().melt(id_vars="date", var_name="actor", value_name="cumulative")
+
+
+def project_goal(series: "pd.DataFrame", goal: float, window_days: Optional[int] = 28,
+                 today: Optional["pd.Timestamp"] = None) -> Dict[str, Any]:
+    """When the balance reaches `goal` at the pace of the `window_days` days up to `today` (default: the
+    current UTC day; None = all history). Days without activity count as zero.
+
+    Returns {"reached", "date", "per_day"}: reached means the current balance is at the goal, with the day it
+    got there; otherwise date is the projected day, None when the recent pace is flat or negative.
+    `series` is a daily balance_series.
+    """
+    import pandas as pd
+    if series.empty or goal <= 0:
+        return {"reached": False, "date": None, "per_day": 0.0}
+    balance = series["balance"].to_numpy()
+    if balance[-1] >= goal:
+        below = np.flatnonzero(balance < goal)
+        return {"reached": True, "date": series["date"].iloc[below[-1] + 1 if len(below) else 0], "per_day": None}
+    today = pd.Timestamp.now("UTC").tz_localize(None).normalize() if today is None else pd.Timestamp(today).normalize()
+    first = today - pd.Timedelta(days=window_days - 1) if window_days is not None else series["date"].iloc[0]
+    days = max((today - first).days + 1, 1)
+    per_day = float(series.loc[series["date"] >= first, "net"].sum()) / days
+    if per_day <= 0:
+        return {"reached": False, "date": None, "per_day": per_day}
+    eta = today + pd.Timedelta(days=math.ceil((goal - float(balance[-1])) / per_day))
+    return {"reached": False, "date": eta, "per_day": per_day}
@@ -0,0 +1,219 @@
+# api.py — headless JSON API for bulk deposits/withdrawals (runs alongside the Streamlit UI)
+#
+#   python api.py --port 8502 --workers 8
+#
+#   GET  /pots                      -> pot index (count, tip hash, balance per pot)
+#   GET  /pots/<pot>/tip            -> {"index", "hash"} of the current tip
+#   POST /pots/<pot>/transactions   -> commit a batch, in order, in one durable write
+#        {"base_hash": "<tip the batch was built on>",          # required if any entry is signed
+#         "transactions": [{"actor", "action", "amount", "note", "ts", "wallet_address", "signature"}, ...]}
+#
+# Each entry becomes one block. Its signed_message is canonical_message(pot, actor, action, amount, ts,
+# prev_hash) where prev_hash is the previous block *in the batch* and the block timestamp is `ts`, so a
+# client holding the base tip can build and sign the whole batch up front (see build_blocks).
+import argparse, json, logging, math, os, re, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from urllib.parse import unquote
+
+import storage
+from audit import audit_signatures
+from chain import Block, make_block, canonical_message, block_dict
+from committer import commit_blocks, commit_built, CommitConflict
+
+MAX_BATCH = 10_000
+MAX_AMOUNT = 1e12        # cents stay exact as a float and far inside BlockStore's array('q')
+MAX_CLOCK_SKEW = 300     # seconds a client `ts` may run ahead of the server clock
+_TEXT_FIELDS = ("actor", "note", "wallet_address", "signature")
+_POT_PATH = re.compile(r"^/pots/([^/]+)/(tip|transactions)$")
+
+log = logging.getLogger(__name__)
+
+
+class BatchError(Exception):
+    def __init__(self, status: int, message: str, errors: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.status, self.errors = status, errors or []
+
+
+def build_blocks(pot: str, prev: Block, entries: List[Dict[str, Any]],
+                 sign: Optional[Callable[[str], Tuple[str, str]]] = None) -> List[Block]:
+    """Chain `entries` onto `prev`. With `sign(message) -> (address, signature)` the entries get signed
+    (client side); without it existing wallet_address/signature fields are carried as-is (server side)."""
+    blocks = []
+    for e in entries:
+        actor = (e.get("actor") or "").strip() or "UNKNOWN"
+        amount = round(float(e["amount"]), 2)
+        # never before the block it follows, even if that one was stamped a little in the future
+        ts = int(e["ts"]) if e.get("ts") else max(int(time.time()), math.ceil(prev.timestamp))
+        msg = canonical_message(pot, actor, e["action"], amount, ts, prev.hash)
+        wallet, sig = (sign(msg) if sign else (e.get("wallet_address") or "", e.get("signature") or ""))
+        prev = make_block(prev, actor, e["action"], amount, e.get("note") or "", wallet, msg, sig, timestamp=ts)
+        blocks.append(prev)
+    return blocks
+
+
+def _number(v: Any) -> Optional[float]:
+    """`v` as a finite float, or None (bools, NaN, inf and non-numeric strings included)."""
+    if isinstance(v, bool):
+        return None
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def _check_times(tip: Block, entries: List[Dict[str, Any]]):
+    """Client timestamps may not run backwards: each is >= the tip's and the previous entry's."""
+    last, errors = tip.timestamp, []
+    for i, e in enumerate(entries):
+        if e.get("ts"):
+            ts = int(e["ts"])
+            if ts < last:
+                errors.append({"i": i, "error": f"ts {ts} is before the previous block ({last:.0f})"})
+            last = max(last, ts)
+    if errors:
+        raise BatchError(400, "invalid transactions", errors)
+
+
+def _check_entries(entries: Any) -> List[Dict[str, Any]]:
+    if not isinstance(entries, list) or not entries:
+        raise BatchError(400, "transactions must be a non-empty list")
+    if len(entries) > MAX_BATCH:
+        raise BatchError(413, f"at most {MAX_BATCH} transactions per batch")
+    errors = []
+    for i, e in enumerate(entries):
+        if not isinstance(e, dict):
+            errors.append({"i": i, "error": "not an object"})
+            continue
+        for k in _TEXT_FIELDS:
+            if e.get(k) is not None and not isinstance(e[k], str):
+                errors.append({"i": i, "error": f"{k} must be a string"})
+        if e.get("action") not in ("DEPOSIT", "WITHDRAW"):
+            errors.append({"i": i, "error": "action must be DEPOSIT or WITHDRAW"})
+        amount = _number(e.get("amount", 0))
+        if amount is None:
+            errors.append({"i": i, "error": "amount must be a finite number"})
+        elif round(amount, 2) <= 0:
+            errors.append({"i": i, "error": "amount must be at least 0.01"})
+        elif amount > MAX_AMOUNT:
+            errors.append({"i": i, "error": f"amount must be at most {MAX_AMOUNT:.0f}"})
+        if e.get("ts"):
+            ts = _number(e["ts"])
+            if ts is None or not 0 < ts <= time.time() + MAX_CLOCK_SKEW:
+                errors.append({"i": i, "error": "ts must be a unix time in seconds, not in the future"})
+        if bool(e.get("wallet_address")) != bool(e.get("signature")):
+            errors.append({"i": i, "error": "wallet_address and signature go together"})
+    if errors:
+        raise BatchError(400, "invalid transactions", errors)
+    return entries
+
+
+def ingest(pot: str, body: Dict[str, Any], executor=None, chunk_size: int = 64) -> Dict[str, Any]:
+    """Validate, verify signatures (in the worker pool) and commit one batch. All-or-nothing."""
+    entries = _check_entries(body.get("transactions"))
+    signed = any(e.get("signature") for e in entries)
+    base_hash = body.get("base_hash")
+    if signed and not base_hash:
+        raise BatchError(400, "base_hash is required for signed batches (messages commit to it)")
+
+    def build(tip: Optional[Block]) -> List[Block]:
+        if tip is None:
+            raise BatchError(404, f"pot {pot!r} has no ledger yet (open it in the app to create its genesis)")
+        if base_hash and base_hash != tip.hash:
+            raise BatchError(409, f"tip moved: ledger tip is #{tip.index} {tip.hash}")
+        _check_times(tip, entries)
+        return build_blocks(pot, tip, entries)
+
+    if not storage.pot_exists(pot):   # checked first: taking the writer lock would create the pot dir
+        build(None)
+    if not signed:
+        # nothing commits to a tip, so build on whatever the tip is once we hold the writer lock
+        blocks = commit_built(build, pot)
+    else:
+        tail = storage.load_tail(pot, 1)
+        blocks = build(Block(**tail[0]) if tail else None)
+        problems = audit_signatures([block_dict(b) for b in blocks], pot_name=pot,
+                                    executor=executor, chunk_size=chunk_size)
+        if problems:
+            first = blocks[0].index
+            raise BatchError(400, "signature verification failed",
+                             [{"i": p["index"] - first, "error": p["problem"]} for p in problems])
+        try:
+            commit_blocks(blocks, pot)
+        except CommitConflict as e:   # verified against base_hash, which another writer replaced meanwhile
+            raise BatchError(409, str(e))
+    return {"committed": len(blocks), "first_index": blocks[0].index,
+            "tip": {"index": blocks[-1].index, "hash": blocks[-1].hash}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    executor = None
+    server_version = "PotAPI/1.0"
+
+    def _send(self, status: int, obj: Any):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        try:
+            if self.path == "/pots":
+                return self._send(200, storage.list_pots())
+            m = _POT_PATH.match(self.path)
+            if m and m.group(2) == "tip":
+                pot = unquote(m.group(1))
+                tail = storage.load_tail(pot, 1) if storage.pot_exists(pot) else []   # never creates a pot dir
+                if not tail:
+                    return self._send(404, {"error": "unknown pot"})
+                return self._send(200, {"index": tail[0]["index"], "hash": tail[0]["hash"]})
+            self._send(404, {"error": "not found"})
+        except Exception:
+            log.exception("GET %s failed", self.path)
+            self._send(500, {"error": "internal error"})
+
+    def do_POST(self):
+        m = _POT_PATH.match(self.path)
+        if not m or m.group(2) != "transactions":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise BatchError(400, "body must be a JSON object")
+            self._send(200, ingest(unquote(m.group(1)), body, executor=self.executor))
+        except BatchError as e:
+            self._send(e.status, {"error": str(e), "errors": e.errors})
+        except ValueError as e:
+            self._send(400, {"error": f"bad request: {e}"})
+        except Exception:
+            log.exception("POST %s failed", self.path)
+            self._send(500, {"error": "internal error"})
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Bulk-ingest JSON API for savings pots")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8502)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="signature verification processes")
+    args = ap.parse_args(argv)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        Handler.executor = pool
+        httpd = ThreadingHTTPServer((args.host, args.port), Handler)
+        print(f"Pot API on http://{args.host}:{args.port} ({args.workers} verify workers)")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
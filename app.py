@@ -1,24 +1,54 @@
+import json
 import time
-import altair as alt
-import pandas as pd
+from datetime import datetime, timedelta
 import streamlit as st
-from eth_account import Account
-from eth_account.messages import encode_defunct
 
 from chain import (
+    Block,
     make_genesis,
     make_block,
-    validate_chain,
+    validate_incremental,
     to_dicts,
-    from_dicts,
     canonical_message,
+    block_dict,
 )
-from storage import load_chain, save_chain
-from summarize import local_summary, ai_studio_summary
-from utils import pretty_time, is_positive_number, fmt_money, CURRENCY_SYMBOLS, clean_ai_text
-
+from storage import (
+    load_store,
+    save_chain,
+    load_checkpoint,
+    save_checkpoint,
+    save_aggregates,
+    save_rollups,
+    list_snapshots,
+    load_archive_manifest,
+    drop_history,
+    iter_rows,
+    list_pots,
+    pot_owner,
+    DEFAULT_POT,
+)
+from aggregates import Aggregates
+from audit import verify_chain
+from snapshots import sync_state, take_snapshot, maybe_snapshot, anchor_for, archive_upto, verify_archive, SNAPSHOT_EVERY
+from blockstore import BlockStore
+from export import export_chain, export_pot, FORMATS as EXPORT_FORMATS
+from committer import commit_block, reset_pot, CommitConflict
+from indexes import open_index
+from merkle import verify_inclusion
+from sigcache import recover_signer
+from summarize import local_summary, coach_summary
+from metrics import RerunTrace, REGISTRY, timer, METRICS_PATH, PROFILE_RERUNS
+from utils import fmt_money, CURRENCY_SYMBOLS, clean_ai_text
+
+
+# ---------- Instrumentation (phase timings -> data/metrics.prom; diagnostics panel at the bottom) ----------
+if "trace" in st.session_state:
+    st.session_state.trace.abort()   # previous run ended early (st.stop) and never finished
+trace = RerunTrace(profile=st.session_state.get("profile_reruns", False) or PROFILE_RERUNS)
+st.session_state.trace = trace
 
 # ---------- Page setup ----------
+trace.begin("setup")
 st.set_page_config(page_title="Money Savings Pot (Simulated)", layout="wide")
 st.title("Money Savings Pot — Demo App (FinSight)")
 st.caption(
@@ -26,17 +56,62 @@ st.caption(
     "Not real money. Not financial advice."
 )
 
+# ---------- Sidebar: pick a pot (listed from the pot index, no ledger opened) ----------
+trace.begin("pot_select")
+st.sidebar.header("Pot Settings")
+NEW_POT = "➕ New pot…"
+pots = list_pots()
+pot_names = sorted(pots) or [DEFAULT_POT]
+if "pending_pot" in st.session_state:
+    # a pot was just created: select it now that it's in the list (options changed, so set it explicitly)
+    st.session_state.pot_select = st.session_state.pop("pending_pot")
+pot_choice = st.sidebar.selectbox(
+    "Pot",
+    pot_names + [NEW_POT],
+    index=pot_names.index(DEFAULT_POT) if DEFAULT_POT in pot_names else 0,
+    key="pot_select",
+)
+if pot_choice == NEW_POT:
+    pot_name = st.sidebar.text_input("New pot name", placeholder="RoadTrip2026").strip()
+    if not pot_name:
+        st.info("Name the new pot in the sidebar to create it.")
+        st.stop()
+    clash = pot_owner(pot_name)
+    if clash:
+        st.sidebar.error(f"“{pot_name}” would be stored with the existing pot “{clash}”. Pick another name.")
+        st.stop()
+else:
+    pot_name = pot_choice
+
 # ---------- Load / init chain ----------
-raw_rows = load_chain()
-chain = from_dicts(raw_rows) if raw_rows else [make_genesis()]
-if not raw_rows:
-    save_chain(to_dicts(chain))
+trace.begin("load")
+# compact struct-of-arrays store (integer cents, 32-byte hashes) streamed from the ledger; indexing yields ordinary Blocks
+chain = load_store(pot_name)
+if not len(chain):
+    chain = BlockStore.from_blocks([make_genesis("" if pot_name == DEFAULT_POT else pot_name)])
+    save_chain(to_dicts(chain), pot=pot_name)
+if pot_choice == NEW_POT:
+    st.session_state.pending_pot = pot_name
+    st.rerun()
+
+trace.begin("state_sync")
+# running totals, daily rollups (trend charts) and the Merkle tree over block hashes, all persisted next to
+# the ledger; only blocks they haven't seen are folded in, starting from the newest snapshot if a sidecar is lost.
+# Once old blocks are archived, `chain` holds just the live tail (chain[0].index == base).
+agg, rollups, mtree = sync_state(chain, pot=pot_name)
+base = chain[0].index
+# secondary indexes (actor / wallet / action / time) for the ledger filter, coach rows and filtered export
+ledger_index = open_index(pot_name)
+ledger_index.sync(chain)
 
 # ---------- Sidebar ----------
-st.sidebar.header("Pot Settings")
-pot_name = st.sidebar.text_input("Pot name", value="SpringBreakFund")
+trace.begin("sidebar")
 goal = st.sidebar.number_input("Savings goal", min_value=0.0, value=500.0, step=50.0)
 currency = st.sidebar.selectbox("Currency", ["USD", "EUR", "GBP", "CAD", "AUD", "JPY"], index=0)
+with st.sidebar.expander(f"All pots ({len(pots)})"):
+    for name in sorted(pots):
+        p = pots[name]
+        st.caption(f"{name}: {fmt_money(p.get('balance', 0.0), currency)} · {max(p.get('count', 1) - 1, 0)} tx")
 allow_withdraw = st.sidebar.checkbox("Allow withdrawals", value=True)
 use_ai = st.sidebar.checkbox(
     "AI Coach (Google AI Studio)",
@@ -45,6 +120,7 @@ use_ai = st.sidebar.checkbox(
 )
 
 # ---------- Transaction form (with LOCKED message/amount) ----------
+trace.begin("form")
 st.subheader("Add Transaction")
 c1, c2, c3, c4 = st.columns([1.2, 1, 1, 2])
 with c1:
@@ -75,7 +151,7 @@ with lock_col1:
             st.session_state.locked_amt = float(amount_val)
             st.session_state.locked_msg = canonical_message(
                 pot_name=pot_name,
-                actor=actor or "UNKNOWN",
+                actor=actor.strip(),   # as make_block stores it
                 action=action,
                 amount=float(amount_val),
                 ts=ts_now,
@@ -98,6 +174,7 @@ st.markdown(
 
 
 # ---------- Add to ledger (verifies signature if provided) ----------
+trace.begin("insert")
 if st.button("2) Add to Ledger"):
     if not actor.strip():
         st.warning("Enter a name.")
@@ -119,8 +196,9 @@ if st.button("2) Add to Ledger"):
     # Optional signature verification
     if wallet_address.strip() and signature.strip():
         try:
-            msg = encode_defunct(text=msg_to_sign)
-            recovered = Account.recover_message(msg, signature=signature)
+            # persistent (message, signature) -> signer cache; eth_account is only loaded on a miss
+            with timer("app.signature_recovery"):
+                recovered = recover_signer(msg_to_sign, signature)
             if recovered.lower() != wallet_address.strip().lower():
                 st.error(
                     "Signature does not match wallet address.\n\n"
@@ -147,8 +225,23 @@ if st.button("2) Add to Ledger"):
         signed_message=msg_to_sign,
         signature=signature,
     )
+    try:
+        # serialized with other sessions/processes; rejected if someone else extended the ledger first
+        commit_block(new_block, pot=pot_name)
+    except CommitConflict as e:
+        st.session_state.locked_msg = ""
+        st.session_state.locked_ts = 0
+        st.session_state.locked_amt = None
+        st.error(f"Someone else added a block first ({e}). Generate (and sign) a fresh message, then add again.")
+        st.stop()
     chain.append(new_block)
-    save_chain(to_dicts(chain))
+    agg.apply(new_block)
+    save_aggregates(agg.to_dict(), pot=pot_name)
+    rollups.sync(chain)
+    save_rollups(rollups.to_dict(), pot=pot_name)
+    mtree.append(new_block.hash)
+    mtree.save()
+    ledger_index.sync(chain)
     st.success(f"Added {action} of {fmt_money(amount_to_use, currency)} by {actor}")
 
     # clear locks
@@ -158,35 +251,97 @@ if st.button("2) Add to Ledger"):
 
 
 # ---------- Ledger view ----------
+trace.begin("validate")
 st.subheader("Ledger")
-valid = validate_chain(chain)
-st.write(f"Chain status: {'✅ Valid' if valid else '❌ INVALID'}")
-
-df = pd.DataFrame(
-    [
-        {
-            "index": b.index,
-            "time": pretty_time(b.timestamp),
-            "actor": b.actor,
-            "action": b.action,
-            "amount": fmt_money(b.amount, currency),
-            "note": b.note,
-            "prev_hash": str(b.prev_hash)[:10] + "…",
-            "hash": str(b.hash)[:10] + "…",
-            "wallet": (b.wallet_address[:10] + "…") if b.wallet_address else "",
-            "signed?": "yes" if b.signature else "no",
-        }
-        for b in chain
-    ]
-)
-st.dataframe(df, use_container_width=True, height=280)
+# only blocks after the persisted verified tip are re-hashed; full audit on demand
+checkpoint = load_checkpoint(pot_name)
+anchor = anchor_for(chain, pot=pot_name)
+bad_block = None
+if st.button("Run full audit"):
+    # archived segments are re-hashed from genesis up to the snapshot the live ledger hangs off;
+    # the live ledger is re-hashed in segments across all cores
+    if not verify_archive(pot_name):
+        bad_block = {"index": 0, "problem": "archived segments do not verify"}
+    else:
+        bad_block = verify_chain(chain, anchor)
+    valid = bad_block is None
+    new_cp = {"index": chain[-1].index, "hash": chain[-1].hash} if valid else None
+    audit_label = " (full audit)"
+else:
+    valid, new_cp = validate_incremental(chain, checkpoint, anchor)
+    audit_label = ""
+if new_cp != checkpoint:
+    save_checkpoint(new_cp, pot=pot_name)
+if valid:
+    maybe_snapshot(chain, agg, rollups, mtree, pot=pot_name)
+st.write(f"Chain status: {'✅ Valid' if valid else '❌ INVALID'}{audit_label}")
+if bad_block:
+    st.error(f"First bad block: #{bad_block['index']} — {bad_block['problem']}")
+st.caption(f"Merkle root ({mtree.size} blocks): `{mtree.root()}`")
+
+with st.expander("Snapshots & archive"):
+    snaps, segments = list_snapshots(pot_name), load_archive_manifest(pot_name)
+    st.caption(f"Snapshots (every {SNAPSHOT_EVERY} blocks) at: {', '.join(f'#{i}' for i in snaps) or 'none yet'}. "
+               + (f"Blocks #0–#{segments[-1]['last']} are archived in {len(segments)} segment(s); the live ledger starts at #{base}."
+                  if segments else "Nothing archived."))
+    s1, s2 = st.columns(2)
+    if valid and s1.button("Snapshot now", disabled=chain[-1].index in snaps):
+        take_snapshot(chain, agg, rollups, mtree, pot=pot_name)
+        st.rerun()
+    archivable = [i for i in snaps if base <= i < chain[-1].index]
+    if valid and archivable and s2.button(f"Archive blocks up to #{archivable[-1]}",
+                                          help="Moves them to a compressed segment; startup then loads only the later blocks."):
+        archive_upto(archivable[-1], pot=pot_name)
+        st.rerun()
+
+with st.expander("Inclusion proof"):
+    tip_index = chain[-1].index
+    proof_idx = st.number_input("Block index", min_value=base, max_value=tip_index, value=tip_index, step=1)
+    proof = {
+        "index": int(proof_idx),
+        "block_hash": chain.hash_at(int(proof_idx) - base),
+        "size": mtree.size,
+        "root": mtree.root(),
+        "proof": mtree.inclusion_proof(int(proof_idx)),
+    }
+    ok = verify_inclusion(proof["block_hash"], proof["index"], proof["size"], proof["proof"], proof["root"])
+    st.write(f"Proof verifies against root: {'✅' if ok else '❌'} ({len(proof['proof'])} hashes)")
+    st.json(proof)
+
+trace.begin("ledger_table")
+from ledger_view import select as select_blocks, page_count, page_frame  # deferred (pandas) until the table is drawn
+# Only the visible page is formatted (display columns are cached per block hash)
+with st.expander("Filter ledger"):
+    f1, f2, f3, f4 = st.columns(4)
+    with f1:
+        f_actors = st.multiselect("Actor", sorted(agg.by_actor))
+    with f2:
+        f_actions = st.multiselect("Action", ["DEPOSIT", "WITHDRAW", "GENESIS"])
+    with f3:
+        f_wallets = st.multiselect("Wallet", [w for w in ledger_index.keys("wallet") if w])
+    with f4:
+        f_dates = st.date_input("Date range", value=())
+start_ts = end_ts = None
+if len(f_dates) == 2:
+    start_ts = datetime.combine(f_dates[0], datetime.min.time()).timestamp()
+    end_ts = datetime.combine(f_dates[1] + timedelta(days=1), datetime.min.time()).timestamp()
+positions = select_blocks(chain, actors=f_actors, actions=f_actions, start_ts=start_ts, end_ts=end_ts,
+                          wallets=f_wallets, index=ledger_index)
+
+p1, p2, p3 = st.columns([1, 1, 3])
+with p1:
+    page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+pages = page_count(len(positions), page_size)
+with p2:
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+with p3:
+    st.caption(f"{len(positions)} matching blocks · page {page} of {pages} · newest first")
+st.dataframe(page_frame(chain, positions, int(page), page_size, currency), use_container_width=True, height=280)
 
 # ---------- Stats ----------
+trace.begin("stats")
 st.subheader("Stats & Progress")
-txs = [b for b in chain if b.action in ("DEPOSIT", "WITHDRAW")]
-total_in = sum(b.amount for b in txs if b.action == "DEPOSIT")
-total_out = sum(b.amount for b in txs if b.action == "WITHDRAW")
-net = round(total_in - total_out, 2)
+total_in, total_out, net = agg.total_in, agg.total_out, agg.net
 
 m1, m2, m3 = st.columns(3)
 m1.metric("Total Deposited", fmt_money(total_in, currency))
@@ -198,16 +353,13 @@ if goal > 0:
     st.progress(pct, text=f"{pct}% of {fmt_money(goal, currency)} goal")
 
 # ---------- Contributions charts ----------
-# Build per-actor net (deposits minus withdrawals)
-by_actor = {}
-for b in txs:
-    by_actor.setdefault(b.actor, 0.0)
-    if b.action == "DEPOSIT":
-        by_actor[b.actor] += b.amount
-    elif b.action == "WITHDRAW":
-        by_actor[b.actor] -= b.amount
+trace.begin("charts")
+# Per-actor net (deposits minus withdrawals), maintained by the aggregate state
+by_actor = agg.by_actor
 
 if by_actor:
+    import altair as alt  # deferred until there is something to chart
+    import pandas as pd
     plot_df = pd.DataFrame({
         "actor": list(by_actor.keys()),
         "net_contribution": list(by_actor.values())
@@ -279,29 +431,137 @@ if by_actor:
 else:
     st.info("No contributors yet.")
 
+# ---------- Trends ----------
+trace.begin("trends")
+from analytics import FREQS, balance_series, actor_cumulative, project_goal  # numpy + pandas
+daily = balance_series(rollups)
+if not daily.empty:
+    import altair as alt
+    import pandas as pd
+    st.subheader("Trends")
+    freq_label = st.radio("Resolution", list(FREQS), horizontal=True, key="trend_freq")
+    series = balance_series(rollups, FREQS[freq_label])
+    sym = CURRENCY_SYMBOLS.get(currency, "$")
+    balance_chart = alt.Chart(series).mark_line(point=len(series) < 60).encode(
+        x=alt.X("date:T", title=None),
+        y=alt.Y("balance:Q", title=f"Balance ({sym})"),
+        tooltip=[alt.Tooltip("date:T"), alt.Tooltip("net:Q", format=",.2f"), alt.Tooltip("balance:Q", format=",.2f")],
+    )
+    if goal > 0:
+        balance_chart += alt.Chart(pd.DataFrame({"goal": [goal]})).mark_rule(strokeDash=[4, 4], color="gray").encode(y="goal:Q")
+    st.altair_chart(balance_chart.properties(height=260), use_container_width=True)
+
+    cum = actor_cumulative(rollups, FREQS[freq_label])
+    st.altair_chart(
+        alt.Chart(cum).mark_line().encode(
+            x=alt.X("date:T", title=None),
+            y=alt.Y("cumulative:Q", title=f"Cumulative net ({sym})"),
+            color=alt.Color("actor:N", legend=alt.Legend(title="Contributor")),
+            tooltip=["actor:N", alt.Tooltip("date:T"), alt.Tooltip("cumulative:Q", format=",.2f")],
+        ).properties(height=260),
+        use_container_width=True,
+    )
+
+    if goal > 0:
+        proj = project_goal(daily, goal, 28)
+        if proj["reached"]:
+            st.caption(f"Goal reached on {proj['date']:%Y-%m-%d}.")
+        elif proj["date"] is not None:
+            st.caption(f"At the last 28 days' pace ({fmt_money(proj['per_day'], currency)}/day) "
+                       f"the goal is reached around {proj['date']:%Y-%m-%d}.")
+        else:
+            st.caption("No net saving over the last 28 days, so no projected goal date yet.")
+
 
 
 # ---------- Coach ----------
+trace.begin("coach")
 st.subheader("Coach Summary")
-rows_dict = [vars(b) for b in chain]
 sym = CURRENCY_SYMBOLS.get(currency, "$")
-summary_text = ai_studio_summary(rows_dict, goal, sym) if use_ai else local_summary(rows_dict, goal, sym)
+ai_pending = False
+if use_ai:
+    # cached per (tip, goal, currency); generated in the background, local summary shown meanwhile
+    # (the prompt only uses the last 80 deposits/withdrawals, picked by the index; totals come from agg)
+    recent = ledger_index.query(actions=("DEPOSIT", "WITHDRAW"), start=base, limit=80, newest_first=True)
+    summary_text, ai_pending = coach_summary(
+        [block_dict(chain[i - base]) for i in reversed(recent)], goal, sym, tip_hash=chain[-1].hash, agg=agg
+    )
+else:
+    summary_text = local_summary([], goal, sym, agg=agg)
 # Clean and show as plain text so no accidental markdown/bold
 st.text(clean_ai_text(summary_text))
+if ai_pending:
+    st.caption("AI coach is thinking… showing the local summary for now.")
+    st.button("Refresh coach")
 
 
 # ---------- Export / Reset ----------
+trace.begin("export")
 st.divider()
 cx, cy = st.columns(2)
 with cx:
+    ex_fmt = st.radio("Export format", EXPORT_FORMATS, horizontal=True, key="export_fmt")
+    ex_since = st.number_input("Blocks since index", min_value=0, max_value=chain[-1].index, value=0, step=1,
+                               key="export_since", help="0 = whole ledger; a mirror passes the first index it lacks.")
+    ledger_filter = (tuple(f_actors), tuple(f_actions), tuple(f_wallets), tuple(f_dates))
+    ex_filtered = st.checkbox("Only blocks matching the ledger filter", key="export_filtered", disabled=not any(ledger_filter))
+    ex_only = positions if ex_filtered and any(ledger_filter) else None
+    ex_key = (pot_name, chain.hash_at(-1), ex_fmt, int(ex_since), ledger_filter if ex_only is not None else None)
+    # encoded only on demand, never on every rerun; keyed by the tip so a stale export is never offered
+    if st.session_state.get("export_key") != ex_key:
+        st.session_state.pop("export_data", None)
+    if "export_data" not in st.session_state and st.button("Prepare export"):
+        # archived blocks are streamed from their segments
+        if ex_only is not None:
+            chunks = export_chain(chain, ex_fmt, start=max(int(ex_since), base), only=[base + p for p in ex_only])
+        elif ex_since >= base:
+            chunks = export_chain(chain, ex_fmt, start=int(ex_since))
+        else:
+            chunks = export_pot(pot_name, ex_fmt, start=int(ex_since))
+        st.session_state.export_data = "".join(chunks).encode("utf-8")
+        st.session_state.export_key = ex_key
+    if "export_data" in st.session_state:
+        st.download_button(
+            f"Download ledger {ex_fmt.upper()}",
+            data=st.session_state.export_data,
+            file_name=f"ledger{'_since_%d' % ex_since if ex_since else ''}.{'csv' if ex_fmt == 'csv' else 'ndjson'}",
+            mime="text/csv" if ex_fmt == "csv" else "application/x-ndjson",
+        )
     st.download_button(
-        "Download ledger CSV",
-        data=pd.DataFrame([vars(b) for b in chain]).to_csv(index=False),
-        file_name="ledger.csv",
-        mime="text/csv",
+        "Download Merkle root (JSON)",
+        data=json.dumps({"pot": pot_name, "size": mtree.size, "root": mtree.root(), "tip_hash": chain[-1].hash}),
+        file_name="ledger.root.json",
+        mime="application/json",
+        help="Check any block against this root with an inclusion proof instead of re-hashing the whole chain.",
     )
 with cy:
     if st.button("Reset (delete all non-genesis blocks)"):
-        chain = [chain[0]]
-        save_chain([vars(chain[0])])
+        chain = [chain[0] if base == 0 else Block(**next(iter_rows(pot_name)))]
+        reset_pot(chain[0], pot=pot_name)
+        drop_history(pot_name)
+        save_checkpoint(None, pot=pot_name)
+        save_aggregates(Aggregates.from_rows([block_dict(chain[0])]).to_dict(), pot=pot_name)
+        save_rollups(None, pot=pot_name)
+        mtree.sync([chain[0].hash])
+        mtree.save()
         st.warning("Ledger reset. (Genesis kept.)")
+
+
+# ---------- Diagnostics ----------
+trace.begin("diagnostics")
+if st.sidebar.checkbox("Diagnostics", value=False, key="show_diagnostics"):
+    import pandas as pd
+    with st.expander("Diagnostics (this rerun and process totals)", expanded=True):
+        st.checkbox("Profile reruns with cProfile", key="profile_reruns",
+                    help="Each rerun is dumped as a .prof file (view with snakeviz or pstats).")
+        # the current run's diagnostics phase is still open, so it shows from the next rerun
+        st.dataframe(pd.DataFrame(
+            [{"phase": p, "ms": round(dt * 1000, 2)} for p, dt in trace.phases]), use_container_width=True)
+        st.caption(f"Rerun so far: {(time.perf_counter() - trace.t0) * 1000:.1f} ms · metrics file: {METRICS_PATH or 'off'}")
+        st.dataframe(pd.DataFrame(REGISTRY.rows()), use_container_width=True)
+        counters = {label: v for (_, label), v in sorted(REGISTRY.counters.items())}
+        if counters:
+            st.caption(" · ".join(f"{k}: {v:g}" for k, v in counters.items()))
+profile_path = trace.finish()
+if profile_path:
+    st.sidebar.caption(f"Profile written to {profile_path}")
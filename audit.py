@@ -0,0 +1,174 @@
+# audit.py — re-verify wallet signatures already stored in the ledger, and re-hash the whole chain in parallel
+import argparse, os, re, sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import fields
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+from chain import Block, _hash_block, _payload, canonical_message
+from sigcache import SignatureCache, default_cache, sig_key, _recover
+from storage import DEFAULT_POT, load_chain, load_store
+
+_MSG_RE = re.compile(r"^POT:.*\|ACTOR:.*\|ACTION:.*\|AMOUNT:.*\|TS:(?P<ts>\d+)\|PREV:.*$")
+
+# (index, actor, action, amount, prev_hash, wallet_address, signed_message, signature, cached signer or None)
+WorkItem = Tuple[int, str, str, float, str, str, str, str, Optional[str]]
+
+
+def _expected_message(item: WorkItem, pot_name: Optional[str]) -> Optional[str]:
+    """Rebuild canonical_message for a block. TS comes from the signed text (lock time, not block time); the pot
+    is the one being audited (DEFAULT_POT for None), so a message signed for another pot does not match."""
+    idx, actor, action, amount, prev_hash, _, signed_message, _, _ = item
+    m = _MSG_RE.match(signed_message)
+    if not m:
+        return None
+    return canonical_message(pot_name or DEFAULT_POT, actor, action, amount, int(m.group("ts")), prev_hash)
+
+
+def _map(fn, chunks: List[Any], args: List[Any], workers: Optional[int], executor: Optional[Executor]) -> List[Any]:
+    # fn(chunk, arg) pairwise, results in order: in-process for a single chunk, else on `executor` or a fresh pool
+    workers = workers or os.cpu_count() or 1
+    if len(chunks) <= 1 or (executor is None and workers == 1):
+        return [fn(c, a) for c, a in zip(chunks, args)]
+    if executor is not None:
+        return list(executor.map(fn, chunks, args))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(fn, chunks, args))
+
+
+def _verify_chunk(items: List[WorkItem], pot_name: Optional[str] = None) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, str]]]:
+    """(problems, newly recovered (message, signature, address)) for a chunk; cached signers skip ECDSA."""
+    problems, learned = [], []
+    for item in items:
+        idx, _, _, _, _, wallet, signed_message, signature, known = item
+        if not signed_message:
+            if signature:
+                problems.append({"index": idx, "problem": "signature without signed_message"})
+            continue
+        if signed_message != _expected_message(item, pot_name):
+            problems.append({"index": idx, "problem": "signed_message does not match block fields"})
+        if not (wallet and signature):
+            continue
+        recovered = known
+        if recovered is None:
+            try:
+                recovered = _recover(signed_message, signature)
+            except Exception as e:
+                problems.append({"index": idx, "problem": f"signature recovery failed: {e}"})
+                continue
+            learned.append((signed_message, signature, recovered))
+        if recovered.lower() != wallet.lower():
+            problems.append({"index": idx, "problem": f"signer {recovered} != wallet {wallet}"})
+    return problems, learned
+
+
+def _work_items(rows: List[Dict[str, Any]]) -> List[WorkItem]:
+    return [
+        (int(r["index"]), r.get("actor", ""), r.get("action", ""), float(r.get("amount", 0.0)),
+         r.get("prev_hash", ""), r.get("wallet_address", ""), r.get("signed_message", ""), r.get("signature", ""), None)
+        for r in rows
+        if r.get("action") != "GENESIS"
+    ]
+
+
+def audit_signatures(rows: List[Dict[str, Any]], pot_name: Optional[str] = None,
+                     workers: Optional[int] = None, chunk_size: int = 256,
+                     executor: Optional[Executor] = None, cache: Optional[SignatureCache] = None) -> List[Dict[str, Any]]:
+    """Re-check every signed block. Signers already in the signature cache are reused; only the
+    remaining recoveries go to a process pool. Returns problems sorted by block index.
+    Pass a long-lived `executor` to avoid spawning a pool per call."""
+    cache = cache or default_cache()
+    items = _work_items(rows)
+    keys = [sig_key(it[6], it[7]) if it[5] and it[7] and it[6] else None for it in items]
+    known = cache.get_many(k for k in keys if k)
+    items = [it[:8] + (known.get(k) if k else None,) for it, k in zip(items, keys)]
+    todo = [it for it, k in zip(items, keys) if k and k not in known]
+    problems, learned = _verify_chunk([it for it, k in zip(items, keys) if not k or k in known], pot_name)
+
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    for chunk_problems, chunk_learned in _map(_verify_chunk, chunks, [pot_name] * len(chunks), workers, executor):
+        problems += chunk_problems
+        learned += chunk_learned
+    cache.put_many((sig_key(m, s), a) for m, s, a in learned)
+    return sorted(problems, key=lambda p: p["index"])
+
+
+# ---------- chain re-hash ----------
+_as_tuple = attrgetter(*(f.name for f in fields(Block)))   # Block(*t) rebuilds it; far cheaper to pickle than Blocks
+
+
+def _rehash_segment(seg: Any, genesis_first: bool) -> Tuple[Optional[Dict[str, Any]], str, str]:
+    """(first problem, prev_hash of the first block, hash of the last block) for one contiguous segment.
+    The first block's prev_hash is only linked up by the caller, once every segment is back."""
+    blocks = iter(seg) if hasattr(seg, "hash_at") else (Block(*t) for t in seg)
+    first = next(blocks)
+    if not genesis_first and _hash_block(_payload(first)) != first.hash:   # genesis is not re-hashed (validate_chain)
+        return {"index": first.index, "problem": "hash does not match block contents"}, first.prev_hash, first.hash
+    prev = first.hash
+    for b in blocks:
+        if b.prev_hash != prev:
+            return {"index": b.index, "problem": "prev_hash does not link to the previous block"}, first.prev_hash, prev
+        if _hash_block(_payload(b)) != b.hash:
+            return {"index": b.index, "problem": "hash does not match block contents"}, first.prev_hash, prev
+        prev = b.hash
+    return None, first.prev_hash, prev
+
+
+def verify_chain(chain: Sequence[Block], anchor: Optional[Dict[str, Any]] = None, workers: Optional[int] = None,
+                 segment_size: int = 50_000, executor: Optional[Executor] = None) -> Optional[Dict[str, Any]]:
+    """Full audit like validate_chain, but re-hashing segments of `chain` across a process pool and then
+    linking the segment boundaries. Returns None if valid, else {"index", "problem"} for the first bad block.
+
+    A chain whose older blocks are archived needs `anchor`, the snapshot of the block right before chain[0]
+    (see validate_incremental). A BlockStore is shipped to the workers as compact per-segment stores.
+    """
+    if not len(chain):
+        return {"index": 0, "problem": "empty ledger"}
+    base = chain[0].index
+    if base == 0 and chain[0].action != "GENESIS":
+        return {"index": 0, "problem": "first block is not GENESIS"}
+    if base > 0 and not (anchor and int(anchor.get("index", -1)) == base - 1):
+        return {"index": base, "problem": f"no snapshot of block {base - 1} to anchor the live ledger"}
+    starts = range(0, len(chain), segment_size)
+    if hasattr(chain, "segment"):
+        segs = [chain.segment(i, i + segment_size) for i in starts]
+    else:
+        segs = [[_as_tuple(b) for b in chain[i:i + segment_size]] for i in starts]
+    results = _map(_rehash_segment, segs, [base == 0] + [False] * (len(segs) - 1), workers, executor)
+    prev = anchor["hash"] if base > 0 else None
+    for i, (problem, first_prev, last_hash) in zip(starts, results):
+        if prev is not None and first_prev != prev:
+            return {"index": base + i, "problem": "prev_hash does not link to the previous block"}
+        if problem:
+            return problem
+        prev = last_hash
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Re-verify stored signatures, or re-hash the whole chain")
+    ap.add_argument("pot", nargs="?", default=None)
+    ap.add_argument("--chain", action="store_true", help="re-hash every block (archive included) and report the first bad one")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args(argv)
+    if args.chain:
+        # deferred: snapshots pulls in pandas/numpy via analytics
+        from snapshots import anchor_for, verify_archive
+        chain = load_store(args.pot)
+        if not verify_archive(args.pot):
+            print("Archived segments do not verify (python snapshots.py verify)")
+            return 1
+        bad = verify_chain(chain, anchor_for(chain, args.pot) if len(chain) else None, workers=args.workers)
+        print(f"Re-hashed {len(chain)} live blocks: " + (f"first bad block #{bad['index']}: {bad['problem']}" if bad else "valid"))
+        return 1 if bad else 0
+    rows = load_chain(args.pot)
+    found = audit_signatures(rows, pot_name=args.pot, workers=args.workers)
+    signed = sum(1 for r in rows if r.get("signature"))
+    print(f"Audited {len(rows)} blocks ({signed} signed): {len(found)} problem(s)")
+    for p in found:
+        print(f"  #{p['index']}: {p['problem']}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
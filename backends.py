@@ -0,0 +1,340 @@
+# backends.py — where a pot's live ledger is kept: one interface, three formats
+#
+#   csv       data/ledger.csv (default, human-readable; appends are CSV records + one fsync)
+#   columnar  data/ledger.col/ (memory-mapped binary, see colstore.py)
+#   sqlite    data/ledger.sqlite3 (WAL: indexed range reads, transactional appends, concurrent readers)
+#
+# storage.py picks one per LEDGER_FORMAT; migrate.py converts between them.
+import csv, os, re, sqlite3, threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Iterator, Optional
+
+COLUMNS = [
+    "index", "timestamp", "actor", "action", "amount", "note", "prev_hash",
+    "wallet_address", "signed_message", "signature", "hash",
+]
+
+
+def _fsync_dir(path: str):
+    # make the rename/creation itself durable (no-op where dirs can't be opened)
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class LedgerBackend(ABC):
+    """A pot's live ledger. Rows are dicts over COLUMNS with index int and timestamp/amount float,
+    oldest first; the first row is genesis unless older blocks were archived."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @abstractmethod
+    def append(self, rows: List[Dict[str, Any]]):
+        """Durably add blocks after the tip, all or nothing where the format allows."""
+
+    @abstractmethod
+    def rewrite(self, rows: List[Dict[str, Any]]):
+        """Replace the whole ledger (genesis / reset / archiving) without ever leaving it truncated."""
+
+    @abstractmethod
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Blocks with start <= index < stop, streamed."""
+
+    def load(self) -> List[Dict[str, Any]]:
+        return list(self.rows())
+
+    @abstractmethod
+    def tail(self, n: int = 1) -> List[Dict[str, Any]]:
+        """The last `n` blocks, oldest first."""
+
+    def tip(self) -> Optional[Dict[str, Any]]:
+        last = self.tail(1)
+        return last[0] if last else None
+
+    def count(self) -> int:
+        tip = self.tip()
+        if tip is None:
+            return 0
+        first = next(self.rows(), tip)
+        return tip["index"] - first["index"] + 1
+
+
+# ---------- CSV ----------
+_HEX64 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _typed(rec: List[str]) -> Dict[str, Any]:
+    row = dict(zip(COLUMNS, rec))
+    row["index"] = int(row["index"])
+    row["timestamp"] = float(row["timestamp"])
+    row["amount"] = float(row["amount"])
+    return row
+
+
+def _well_formed(rec: List[str]) -> bool:
+    return len(rec) == len(COLUMNS) and rec[0].isdigit() and bool(_HEX64.match(rec[-1]))
+
+
+def _parse_tail(data: bytes, from_start: bool) -> Optional[List[Dict[str, Any]]]:
+    if from_start:
+        recs = list(csv.reader(data.decode("utf-8").splitlines(keepends=True)))
+        return [_typed(r) for r in recs[1:] if _well_formed(r)]
+    # chunk starts mid-file: find the first line boundary from which everything parses as whole records
+    pos = data.find(b"\n") + 1
+    while 0 < pos < len(data):
+        seg = data[pos:]
+        if seg.count(b'"') % 2 == 0:
+            recs = list(csv.reader(seg.decode("utf-8", errors="replace").splitlines(keepends=True)))
+            if recs and all(_well_formed(r) for r in recs):
+                return [_typed(r) for r in recs]
+        pos = data.find(b"\n", pos) + 1
+    return None
+
+
+def read_records(f, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Typed rows from an open CSV ledger (or archive segment) with start <= index < stop."""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    for rec in reader:
+        if len(rec) != len(header):
+            break   # torn trailing record
+        row = dict(zip(header, rec))
+        row["index"] = int(row["index"])
+        if row["index"] < start:
+            continue
+        if stop is not None and row["index"] >= stop:
+            return
+        row["timestamp"] = float(row["timestamp"])
+        row["amount"] = float(row["amount"])
+        yield row
+
+
+def repair_tail(path: str) -> bool:
+    """Drop a torn final record left by a crash mid-append. Returns True if the file was truncated.
+    Writers only, under committer.pot_lock: to a reader, another writer's half-flushed batch looks torn too."""
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        data = f.read()
+    end = [0]
+
+    def lines():
+        while end[0] < len(data):
+            start, stop = end[0], data.find(b"\n", end[0])
+            end[0] = len(data) if stop < 0 else stop + 1
+            yield data[start:end[0]].decode("utf-8", errors="replace")
+
+    # keep everything up to the last whole record (newline-terminated and well formed, or the header);
+    # a tear can end mid-line, inside a quoted multi-line note, or on a line boundary of one
+    keep = 0
+    try:
+        for i, rec in enumerate(csv.reader(lines())):
+            if data[end[0] - 1:end[0]] == b"\n" and (i == 0 or _well_formed(rec)):
+                keep = end[0]
+    except csv.Error:
+        pass
+    if keep == len(data):
+        return False
+    with open(path, "r+b") as f:
+        f.truncate(keep)
+        f.flush()
+        os.fsync(f.fileno())
+    return True
+
+
+class CsvBackend(LedgerBackend):
+    def _torn(self) -> bool:
+        # only the last 64 KiB is looked at; repair_tail (a full read) runs just when this says so
+        with open(self.path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - 64 * 1024)
+            f.seek(start)
+            data = f.read()
+        if not data.endswith(b"\n"):
+            return True
+        if start == 0:
+            recs = list(csv.reader(data.decode("utf-8", errors="replace").splitlines(keepends=True)))
+            return not all(_well_formed(r) for r in recs[1:])
+        return _parse_tail(data, False) is None
+
+    def append(self, rows: List[Dict[str, Any]]):
+        # just the new blocks as CSV records with a single fsync: O(len(rows)), not O(ledger)
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if not new_file and self._torn():
+            repair_tail(self.path)   # never write onto a record torn by a crash mid-append (we hold the pot lock)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f, lineterminator="\n")
+            if new_file:
+                w.writerow(COLUMNS)
+            w.writerows([row.get(c, "") for c in COLUMNS] for row in rows)
+            f.flush()
+            os.fsync(f.fileno())
+        if new_file:
+            _fsync_dir(self.path)
+
+    def rewrite(self, rows: List[Dict[str, Any]]):
+        tmp = self.path + ".tmp"
+        import pandas as pd  # deferred: chain/storage import without pandas
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            pd.DataFrame(rows).to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        # no pandas, one row at a time
+        if not self.exists():
+            return
+        with open(self.path, "r", newline="", encoding="utf-8") as f:
+            yield from read_records(f, start, stop)
+
+    def tail(self, n: int = 1) -> List[Dict[str, Any]]:
+        """Read from the end of the file (a torn trailing record is ignored)."""
+        if not self.exists():
+            return []
+        chunk = 64 * 1024
+        with open(self.path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            while True:
+                start = max(0, size - chunk)
+                f.seek(start)
+                data = f.read(size - start)
+                data = data[:data.rfind(b"\n") + 1]
+                rows = _parse_tail(data, start == 0)
+                if start == 0 or (rows is not None and len(rows) >= n):
+                    return (rows or [])[-n:]
+                chunk *= 4
+
+
+# ---------- columnar ----------
+class ColumnarBackend(LedgerBackend):
+    def __init__(self, path: str):
+        super().__init__(path)
+        from colstore import ColumnarLedger   # numpy only when this format is in use
+        self.led = ColumnarLedger(path)
+
+    def exists(self) -> bool:
+        return len(self.led) > 0
+
+    def append(self, rows: List[Dict[str, Any]]):
+        self.led.append(rows)
+
+    def rewrite(self, rows: List[Dict[str, Any]]):
+        self.led.rewrite(rows)
+
+    def load(self) -> List[Dict[str, Any]]:
+        return self.led.to_rows()
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        # positions are index - first index (no gaps), so a range is a slice of the record file
+        base = int(self.led.column("index")[0]) if len(self.led) else 0
+        yield from self.led.rows(max(0, start - base), None if stop is None else max(0, stop - base))
+
+    def tail(self, n: int = 1) -> List[Dict[str, Any]]:
+        return self.led.tail(n)
+
+    def count(self) -> int:
+        return len(self.led)
+
+
+# ---------- SQLite ----------
+_SQL_COLUMNS = ["idx"] + COLUMNS[1:]   # "index" is an SQL keyword
+
+
+class SqliteBackend(LedgerBackend):
+    """One row per block keyed by index. WAL mode: readers never block the (single) writer or each other,
+    and every append / rewrite is one transaction, so a crash leaves the ledger at a whole batch boundary."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._local = threading.local()   # one connection per thread; SQLite does the locking between them
+
+    def _conn(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=FULL")   # the ledger is the source of truth: fsync every commit
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS blocks (idx INTEGER PRIMARY KEY, timestamp REAL NOT NULL, actor TEXT NOT NULL,"
+                " action TEXT NOT NULL, amount REAL NOT NULL, note TEXT NOT NULL, prev_hash TEXT NOT NULL,"
+                " wallet_address TEXT NOT NULL, signed_message TEXT NOT NULL, signature TEXT NOT NULL, hash TEXT NOT NULL)")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _values(rows: List[Dict[str, Any]]):
+        for r in rows:
+            yield (int(r["index"]), float(r["timestamp"]), str(r.get("actor", "")), str(r.get("action", "")),
+                   float(r.get("amount", 0.0)), *(str(r.get(c, "") or "") for c in COLUMNS[5:]))
+
+    def _write(self, rows: List[Dict[str, Any]], replace: bool):
+        db = self._conn()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                db.execute("DELETE FROM blocks")
+            else:
+                (last,) = db.execute("SELECT MAX(idx) FROM blocks").fetchone()
+                if last is not None and int(rows[0]["index"]) != last + 1:
+                    raise ValueError(f"append at #{rows[0]['index']} does not follow the tip #{last}")
+            db.executemany(f"INSERT INTO blocks ({','.join(_SQL_COLUMNS)}) VALUES ({','.join('?' * len(COLUMNS))})",
+                           self._values(rows))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def append(self, rows: List[Dict[str, Any]]):
+        self._write(rows, replace=False)
+
+    def rewrite(self, rows: List[Dict[str, Any]]):
+        self._write(rows, replace=True)
+
+    def _select(self, where: str = "", args=(), order: str = "ASC", limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        if not self.exists():
+            return
+        sql = f"SELECT {','.join(_SQL_COLUMNS)} FROM blocks {where} ORDER BY idx {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        for rec in self._conn().execute(sql, args):
+            yield dict(zip(COLUMNS, rec))
+
+    def load(self) -> List[Dict[str, Any]]:
+        return list(self._select())
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        if stop is None:
+            return self._select("WHERE idx >= ?", (start,))
+        return self._select("WHERE idx >= ? AND idx < ?", (start, stop))
+
+    def tail(self, n: int = 1) -> List[Dict[str, Any]]:
+        return list(self._select(order="DESC", limit=n))[::-1]
+
+    def count(self) -> int:
+        if not self.exists():
+            return 0
+        lo, hi = self._conn().execute("SELECT MIN(idx), MAX(idx) FROM blocks").fetchone()   # both off the primary key
+        return 0 if hi is None else hi - lo + 1
+
+
+# format -> (file name in the pot's directory, backend)
+BACKENDS = {
+    "csv": ("ledger.csv", CsvBackend),
+    "columnar": ("ledger.col", ColumnarBackend),
+    "sqlite": ("ledger.sqlite3", SqliteBackend),
+}
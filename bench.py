@@ -0,0 +1,274 @@
+# bench.py — scale benchmarks over synthetic, valid hash-linked ledgers
+#
+#   python bench.py                          # 1e3 and 1e4 blocks, JSON lines on stdout
+#   python bench.py --sizes 1e3,1e5,1e6 --signed 0.01 --memory --out bench_output.txt
+#   python bench.py --sizes 1e7              # generated straight into storage; load_chain/save_chain skipped over --rows-max
+#   python bench.py --imports                # cold-import budgets; exits 1 if any module is over (use in CI)
+#
+# Each result line is a JSON object: {"bench", "n", "ops", "seconds", "ops_per_sec", "peak_bytes", ...},
+# so runs from different versions can be diffed or loaded into a DataFrame.
+import argparse, ast, hashlib, itertools, json, os, platform, random, shutil, subprocess, sys, tempfile, time, tracemalloc
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+import storage
+from audit import verify_chain
+from chain import Block, _hash_block, canonical_message, make_genesis, make_block, validate_chain, to_dicts, block_dict
+from summarize import local_summary
+
+BENCH_POT = "BenchPot"
+T0 = 1_700_000_000.0
+
+# cold import budget per module (ms, cumulative as reported by `python -X importtime`) and the heavy
+# dependencies it must not pull in at import time. Roughly 3x what a laptop measures, to absorb CI noise.
+IMPORT_BUDGETS = {
+    "chain": (75, ("pandas", "numpy", "eth_account")),
+    "storage": (75, ("pandas", "numpy", "eth_account")),
+    "aggregates": (75, ("pandas", "numpy")),
+    "summarize": (100, ("dotenv", "google", "pandas")),
+    "committer": (100, ("pandas", "eth_account")),
+    "export": (100, ("pandas", "eth_account")),
+    "indexes": (75, ("pandas", "numpy", "eth_account")),
+    "audit": (150, ("eth_account", "pandas")),
+    "api": (250, ("eth_account", "pandas")),
+    "app": (1500, ("pandas", "altair", "eth_account")),   # streamlit alone is ~0.45 s
+}
+# a Streamlit script draws its whole page when imported, so only the import block at its top is timed
+SCRIPTS = {"app": "app.py"}
+
+
+def _key_for(seed: int, actor_no: int) -> bytes:
+    return hashlib.sha256(f"bench-key|{seed}|{actor_no}".encode()).digest()
+
+
+def iter_synthetic(n: int, actors: int = 50, signed: float = 0.0, seed: int = 0) -> Iterator[Block]:
+    """Deterministic valid ledger of `n` blocks (genesis included), one block at a time.
+
+    `signed` is the fraction of blocks carrying a real eth-account signature from a per-actor key
+    derived from `seed` (signing costs ~ms per block, so keep it small for big n).
+    """
+    rng = random.Random(seed)
+    accounts = {}
+    if signed > 0:
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+    prev = make_genesis()
+    yield prev
+    for i in range(1, n):
+        who = rng.randrange(actors)
+        ts = T0 + i * 60.0 + rng.random()
+        action = "WITHDRAW" if rng.random() < 0.1 else "DEPOSIT"
+        amount = round(rng.uniform(1, 500), 2)
+        msg = canonical_message(BENCH_POT, f"actor{who}", action, amount, int(ts), prev.hash)
+        wallet = signature = ""
+        if signed > 0 and rng.random() < signed:
+            acct = accounts.get(who) or accounts.setdefault(who, Account.from_key(_key_for(seed, who)))
+            wallet = acct.address
+            signature = "0x" + acct.sign_message(encode_defunct(text=msg)).signature.hex().removeprefix("0x")
+        payload = {
+            "index": i, "timestamp": ts, "actor": f"actor{who}", "action": action, "amount": amount,
+            "note": f"weekly #{i}" if i % 3 == 0 else "", "prev_hash": prev.hash,
+            "wallet_address": wallet, "signed_message": msg, "signature": signature,
+        }
+        prev = Block(**payload, hash=_hash_block(payload))
+        yield prev
+
+
+def synthetic_ledger(n: int, actors: int = 50, signed: float = 0.0, seed: int = 0) -> List[Block]:
+    """iter_synthetic as a list (small n: tests and fixtures)."""
+    return list(iter_synthetic(n, actors, signed, seed))
+
+
+def write_synthetic(n: int, pot: str, actors: int = 50, signed: float = 0.0, seed: int = 0,
+                    chunk: int = 10_000) -> Block:
+    """Generate straight into the pot's ledger in `chunk`-block appends, so memory stays flat for any n.
+    Returns the tip."""
+    blocks = iter_synthetic(n, actors, signed, seed)
+    tip = next(blocks)
+    storage.save_chain([block_dict(tip)], pot=pot)
+    while True:
+        batch = list(itertools.islice(blocks, chunk))
+        if not batch:
+            return tip
+        storage.append_blocks(to_dicts(batch), pot=pot)
+        tip = batch[-1]
+
+
+# ---------- measurement ----------
+def _measure(name: str, n: int, ops: int, fn: Callable[[], Any], memory: bool) -> Dict[str, Any]:
+    if memory:
+        tracemalloc.start()
+    t = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "bench": name, "n": n, "ops": ops, "seconds": round(dt, 6),
+        "ops_per_sec": round(ops / dt, 2) if dt > 0 else None,
+        "peak_bytes": peak,
+        "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+
+
+def warm_up():
+    """One tiny pass over every timed path, so deferred imports (pandas in the CSV backend, ...) are not
+    charged to the first measurement."""
+    tip = write_synthetic(10, "BenchWarmUp", chunk=4)
+    storage.save_chain(storage.load_chain("BenchWarmUp"), pot="BenchWarmUp")
+    store = storage.load_store("BenchWarmUp")
+    validate_chain(store)
+    verify_chain(store)
+    storage.append_block(block_dict(make_block(tip, "bench", "DEPOSIT", 1.0, "", "", "", "")), pot="BenchWarmUp")
+    local_summary(storage.iter_rows("BenchWarmUp"), 1000.0, "$")
+
+
+def run_size(n: int, actors: int, signed: float, seed: int, memory: bool,
+             append_ops: int, sig_sample: int, rows_max: int) -> List[Dict[str, Any]]:
+    """Benchmarks over an n-block ledger that is generated straight into storage and then read back.
+    load_chain / save_chain build a dict per block by design, so they only run while n <= rows_max."""
+    results = []
+    tips = []
+    results.append(_measure("bench.write_synthetic", n, n,
+                            lambda: tips.append(write_synthetic(n, BENCH_POT, actors, signed, seed)), memory))
+    if n <= rows_max:
+        loaded = []
+        results.append(_measure("storage.load_chain", n, n, lambda: loaded.append(storage.load_chain(BENCH_POT)), memory))
+        results.append(_measure("storage.save_chain", n, n, lambda: storage.save_chain(loaded[0], pot=BENCH_POT), memory))
+        del loaded
+    stores = []
+    results.append(_measure("storage.load_store", n, n, lambda: stores.append(storage.load_store(BENCH_POT)), memory))
+    store = stores[0]
+    results.append(_measure("chain.validate_chain", n, n, lambda: validate_chain(store), memory))
+    results.append(_measure("audit.verify_chain", n, n, lambda: verify_chain(store), memory))
+
+    def appends():
+        tip = tips[0]
+        for _ in range(append_ops):
+            tip = make_block(tip, "bench", "DEPOSIT", 1.0, "", "", "", "")
+            storage.append_block(block_dict(tip), pot=BENCH_POT)
+    results.append(_measure("make_block+append_block", n, append_ops, appends, memory))
+
+    results.append(_measure("summarize.local_summary", n, n,
+                            lambda: local_summary(storage.iter_rows(BENCH_POT), 1000.0, "$"), memory))
+
+    sig_rows = list(itertools.islice((b for b in store if b.signature), sig_sample)) if signed > 0 else []
+    if sig_rows:
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+
+        def recover():
+            for b in sig_rows:
+                Account.recover_message(encode_defunct(text=b.signed_message), signature=b.signature)
+        results.append(_measure("Account.recover_message", n, len(sig_rows), recover, memory))
+    return results
+
+
+# ---------- import time ----------
+def _script_imports(path: str) -> Tuple[str, List[str]]:
+    """(source of the import statements heading the script, the top-level modules they import)."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    nodes = []
+    for n in tree.body:
+        if not isinstance(n, (ast.Import, ast.ImportFrom)):
+            break   # imports further down are deferred until that part of the page runs
+        nodes.append(n)
+    roots = [a.name.split(".")[0] for n in nodes if isinstance(n, ast.Import) for a in n.names]
+    roots += [n.module.split(".")[0] for n in nodes if isinstance(n, ast.ImportFrom) and n.module]
+    return "\n".join(ast.unparse(n) for n in nodes), roots
+
+
+def import_profile(module: str) -> Tuple[float, List[str]]:
+    """(cumulative ms, every module loaded) for importing `module` in a fresh interpreter."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    code, roots = f"import {module}", [module]
+    if module in SCRIPTS:
+        code, roots = _script_imports(os.path.join(here, SCRIPTS[module]))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=here, capture_output=True, text=True, check=True)
+    total, loaded = 0, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue   # header line
+        loaded.append(name.strip())
+        if name[1:] in roots and name[1] != " ":   # top level (nested imports are indented further)
+            total += int(cumulative)
+    return total / 1000, loaded
+
+
+def check_imports(repeat: int = 3) -> List[Dict[str, Any]]:
+    results = []
+    for module, (budget, forbidden) in IMPORT_BUDGETS.items():
+        runs = [import_profile(module) for _ in range(repeat)]
+        ms = min(r[0] for r in runs)   # best of N: the budget is about our code, not machine noise
+        pulled = sorted({m.split(".")[0] for m in runs[0][1]} & set(forbidden))
+        results.append({"bench": "import", "module": module, "ms": round(ms, 2), "budget_ms": budget,
+                        "forbidden_loaded": pulled, "ok": ms <= budget and not pulled})
+    return results
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Ledger scale benchmarks")
+    ap.add_argument("--sizes", default="1e3,1e4", help="comma-separated ledger sizes, e.g. 1e3,1e5,1e7")
+    ap.add_argument("--actors", type=int, default=50)
+    ap.add_argument("--signed", type=float, default=0.0, help="fraction of blocks with real signatures")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--appends", type=int, default=1000, help="blocks appended in the append benchmark")
+    ap.add_argument("--sig-sample", type=int, default=200, help="max signatures recovered per size")
+    ap.add_argument("--rows-max", type=float, default=1e6,
+                    help="largest n for the load_chain/save_chain benchmarks (they hold a dict per block)")
+    ap.add_argument("--memory", action="store_true", help="record tracemalloc peak (slows timings)")
+    ap.add_argument("--out", help="append JSON lines here as well as stdout")
+    ap.add_argument("--imports", action="store_true", help="check cold-import budgets instead (exit 1 on failure)")
+    args = ap.parse_args(argv)
+
+    if args.imports:
+        results = check_imports()
+        for r in results:
+            print(json.dumps(r), flush=True)
+        return 0 if all(r["ok"] for r in results) else 1
+
+    meta = {"git": _git_rev(), "python": platform.python_version(), "ledger_format": storage.LEDGER_FORMAT,
+            "seed": args.seed, "signed": args.signed, "tracemalloc": args.memory}
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+    cwd = os.getcwd()
+    work = tempfile.mkdtemp(prefix="potbench-")
+    try:
+        os.chdir(work)  # storage paths are relative to the working dir
+        warm_up()
+        for n in (int(float(s)) for s in args.sizes.split(",") if s.strip()):
+            for r in run_size(n, args.actors, args.signed, args.seed, args.memory, args.appends, args.sig_sample,
+                              int(args.rows_max)):
+                line = json.dumps({**r, **meta})
+                print(line, flush=True)
+                if out:
+                    out.write(line + "\n")
+            shutil.rmtree(os.path.join(work, "data"), ignore_errors=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+        if out:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# blockstore.py — compact in-memory ledger: struct-of-arrays, integer cents, 32-byte hashes
+import re
+from array import array
+from typing import List, Dict, Any, Iterator, Iterable, Tuple, Union
+
+from chain import Block, to_cents, block_dict, canonical_message
+
+_HEX64 = re.compile(r"^[0-9a-f]{64}$")
+_MSG = re.compile(r"^POT:(.*)\|ACTOR:.*\|TS:(\d+)\|PREV:[0-9a-f]{64}$")
+
+
+class _Interned:
+    """Repeated strings (actors, actions, wallets, notes) stored once; columns hold small ints."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def id(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.values)
+            self.values.append(s)
+        return i
+
+
+def _reintern(table: _Interned, cols: List[array]) -> Tuple[_Interned, List[array]]:
+    """A fresh table with only the values `cols` refer to, and `cols` renumbered into it (-1 stays -1)."""
+    sub, remap = _Interned(), {-1: -1}
+    for i in sorted(set().union(*cols) - {-1}):
+        remap[i] = sub.id(table.values[i])
+    return sub, [array(col.typecode, map(remap.__getitem__, col)) for col in cols]
+
+
+class BlockStore:
+    """Sequence of Blocks backed by typed arrays instead of one object (and ~11 str/float objects) per block.
+
+    Amounts are integer minor units, hash/prev_hash are 32 raw bytes, signatures raw bytes, repeated
+    strings interned, and a canonical signed_message is kept as just (pot, TS). Indexing materializes an ordinary Block whose fields — and so _hash_block — are
+    identical to what was stored. Values that would not round-trip exactly (a non-hex prev_hash such as
+    the CSV's genesis "0", sub-cent amounts) are kept verbatim in a small side table.
+    """
+
+    def __init__(self):
+        self._index = array("q")
+        self._ts = array("d")
+        self._cents = array("q")
+        self._actor = array("I")
+        self._action = array("B")
+        self._note = array("I")
+        self._wallet = array("I")
+        self._hash = bytearray()
+        self._prev = bytearray()
+        self._msg_pot = array("i")   # canonical signed_message kept as (pot id, TS); -1 = verbatim in _exact
+        self._msg_ts = array("q")
+        self._sig: List[Union[bytes, str]] = []
+        self._strings = _Interned()
+        self._actions = _Interned()
+        self._exact: Dict[tuple, Any] = {}   # (position, field) -> original value
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[Block]) -> "BlockStore":
+        store = cls()
+        for b in blocks:
+            store.append(b)
+        return store
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "BlockStore":
+        store = cls()
+        for r in rows:
+            store.append(Block(**r))
+        return store
+
+    # ---------- write ----------
+    def _put_hash(self, buf: bytearray, pos: int, field: str, value: str):
+        if _HEX64.match(value):
+            buf += bytes.fromhex(value)
+        else:
+            buf += bytes(32)
+            self._exact[(pos, field)] = value
+
+    def append(self, b: Block):
+        pos = len(self._index)
+        self._index.append(int(b.index))
+        self._ts.append(float(b.timestamp))
+        if type(b.timestamp) is not float:
+            self._exact[(pos, "timestamp")] = b.timestamp
+        cents = to_cents(b.amount)
+        self._cents.append(cents)
+        if cents / 100 != b.amount or type(b.amount) is not float or (not cents and str(b.amount) != "0.0"):   # -0.0
+            self._exact[(pos, "amount")] = b.amount
+        self._actor.append(self._strings.id(b.actor))
+        self._action.append(self._actions.id(b.action))
+        self._note.append(self._strings.id(b.note))
+        self._wallet.append(self._strings.id(b.wallet_address))
+        self._put_hash(self._hash, pos, "hash", b.hash)
+        self._put_hash(self._prev, pos, "prev_hash", b.prev_hash)
+        self._pack_msg(pos, b)
+        sig = b.signature
+        if sig.startswith("0x") and len(sig) % 2 == 0 and sig[2:] == sig[2:].lower():
+            try:
+                sig = bytes.fromhex(sig[2:])
+            except ValueError:
+                pass
+        self._sig.append(sig)
+
+    def _pack_msg(self, pos: int, b: Block):
+        # the canonical message is fully determined by the block's own fields plus pot name and lock time
+        m = _MSG.match(b.signed_message)
+        if m and canonical_message(m.group(1), b.actor, b.action, b.amount, int(m.group(2)), b.prev_hash) == b.signed_message:
+            self._msg_pot.append(self._strings.id(m.group(1)))
+            self._msg_ts.append(int(m.group(2)))
+        else:
+            self._msg_pot.append(-1)
+            self._msg_ts.append(0)
+            if b.signed_message:
+                self._exact[(pos, "signed_message")] = b.signed_message
+
+    def _unpack_msg(self, pos: int, actor: str, action: str, amount: float, prev_hash: str) -> str:
+        pot = self._msg_pot[pos]
+        if pot < 0:
+            return self._exact.get((pos, "signed_message"), "")
+        return canonical_message(self._strings.values[pot], actor, action, amount, self._msg_ts[pos], prev_hash)
+
+    # ---------- read ----------
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _hex(self, buf: bytearray, pos: int, field: str) -> str:
+        exact = self._exact.get((pos, field))
+        return exact if exact is not None else buf[32 * pos:32 * pos + 32].hex()
+
+    def _block(self, pos: int) -> Block:
+        sig = self._sig[pos]
+        amount = self._exact.get((pos, "amount"))
+        ts = self._exact.get((pos, "timestamp"))
+        actor = self._strings.values[self._actor[pos]]
+        action = self._actions.values[self._action[pos]]
+        amount = self._cents[pos] / 100 if amount is None else amount
+        prev_hash = self._hex(self._prev, pos, "prev_hash")
+        return Block(
+            index=self._index[pos],
+            timestamp=self._ts[pos] if ts is None else ts,
+            actor=actor,
+            action=action,
+            amount=amount,
+            note=self._strings.values[self._note[pos]],
+            prev_hash=prev_hash,
+            wallet_address=self._strings.values[self._wallet[pos]],
+            signed_message=self._unpack_msg(pos, actor, action, amount, prev_hash),
+            signature="0x" + sig.hex() if isinstance(sig, bytes) else sig,
+            hash=self._hex(self._hash, pos, "hash"),
+        )
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._block(p) for p in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("block index out of range")
+        return self._block(i)
+
+    def __iter__(self) -> Iterator[Block]:
+        for p in range(len(self)):
+            yield self._block(p)
+
+    # ---------- column access (no Block objects built) ----------
+    def cents(self) -> array:
+        return self._cents
+
+    def timestamps(self) -> array:
+        return self._ts
+
+    def codes(self, field: str) -> tuple:
+        """(per-block ids, id -> value) for an interned column: actor, action, note or wallet_address."""
+        col = {"actor": self._actor, "action": self._action, "note": self._note, "wallet_address": self._wallet}[field]
+        return col, (self._actions if field == "action" else self._strings).values
+
+    def hash_at(self, i: int) -> str:
+        return self._hex(self._hash, i % len(self), "hash")
+
+    def hashes(self) -> List[str]:
+        return [self._hex(self._hash, p, "hash") for p in range(len(self))]
+
+    def segment(self, start: int, stop: int) -> "BlockStore":
+        """Blocks [start, stop) as their own store, with string tables holding only the values it uses,
+        so a pickled segment (audit's worker pool) scales with the segment, not the whole ledger."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        seg = BlockStore()
+        for name in ("_index", "_ts", "_cents", "_msg_ts"):
+            setattr(seg, name, getattr(self, name)[start:stop])
+        seg._strings, (seg._actor, seg._note, seg._wallet, seg._msg_pot) = _reintern(
+            self._strings, [col[start:stop] for col in (self._actor, self._note, self._wallet, self._msg_pot)])
+        seg._actions, (seg._action,) = _reintern(self._actions, [self._action[start:stop]])
+        seg._hash, seg._prev = self._hash[32 * start:32 * stop], self._prev[32 * start:32 * stop]
+        seg._sig = self._sig[start:stop]
+        seg._exact = {(p - start, f): v for (p, f), v in self._exact.items() if start <= p < stop}
+        return seg
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [block_dict(b) for b in self]
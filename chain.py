@@ -1,8 +1,10 @@
 import hashlib, time
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
-@dataclass
+from metrics import timed
+
+@dataclass(slots=True)
 class Block:
     index: int
     timestamp: float
@@ -17,6 +19,10 @@ class Block:
     signature: str        # 0x... signature from wallet
     hash: str
 
+def to_cents(amount: float) -> int:
+    """Amount in integer minor units (cents)."""
+    return int(round(float(amount) * 100))
+
 def _hash_block(payload: Dict[str, Any]) -> str:
     # include wallet/signature so tampering is evident
     raw = (
@@ -26,14 +32,15 @@ def _hash_block(payload: Dict[str, Any]) -> str:
     )
     return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
-def make_genesis() -> Block:
+def make_genesis(pot_name: str = "") -> Block:
+    # named pots get their own genesis (and so their own chain identity)
     base = {
         "index": 0,
         "timestamp": 0.0,
         "actor": "SYSTEM",
         "action": "GENESIS",
         "amount": 0.0,
-        "note": "Ledger created",
+        "note": f"Ledger created for {pot_name}" if pot_name else "Ledger created",
         "prev_hash": "0"*64,
         "wallet_address": "",
         "signed_message": "",
@@ -46,11 +53,13 @@ def canonical_message(pot_name: str, actor: str, action: str, amount: float, ts:
     return f"POT:{pot_name}|ACTOR:{actor}|ACTION:{action}|AMOUNT:{amount:.2f}|TS:{int(ts)}|PREV:{prev_hash}"
 
 def make_block(prev: Block, actor: str, action: str, amount: float, note: str,
-               wallet_address: str, signed_message: str, signature: str) -> Block:
+               wallet_address: str, signed_message: str, signature: str,
+               timestamp: Optional[float] = None) -> Block:
+    # timestamp defaults to now; batch ingest passes it so a pre-signed batch hashes deterministically
     idx = prev.index + 1
     payload = {
         "index": idx,
-        "timestamp": time.time(),
+        "timestamp": time.time() if timestamp is None else float(timestamp),
         "actor": actor.strip() or "UNKNOWN",
         "action": action,
         "amount": round(float(amount), 2),
@@ -62,31 +71,94 @@ def make_block(prev: Block, actor: str, action: str, amount: float, note: str,
     }
     return Block(**payload, hash=_hash_block(payload))
 
-def validate_chain(chain: List[Block]) -> bool:
-    if not chain or chain[0].action != "GENESIS":
-        return False
-    for i in range(1, len(chain)):
-        cur, prev = chain[i], chain[i-1]
-        if cur.prev_hash != prev.hash:
+def _payload(b: Block) -> Dict[str, Any]:
+    return {
+        "index": b.index,
+        "timestamp": b.timestamp,
+        "actor": b.actor,
+        "action": b.action,
+        "amount": b.amount,
+        "note": b.note,
+        "prev_hash": b.prev_hash,
+        "wallet_address": b.wallet_address,
+        "signed_message": b.signed_message,
+        "signature": b.signature,
+    }
+
+def _validate_range(chain: Sequence[Block], start: int, prev_hash: Optional[str] = None) -> bool:
+    # prev_hash: hash of the block before chain[0], when the chain doesn't start at genesis
+    if prev_hash is None:
+        start = max(start, 1)
+    if start >= len(chain):
+        return True
+    if start > 0:
+        prev_hash = chain[start - 1].hash
+    for cur in chain[start:]:
+        if cur.prev_hash != prev_hash:
             return False
-        recomputed = _hash_block({
-            "index": cur.index,
-            "timestamp": cur.timestamp,
-            "actor": cur.actor,
-            "action": cur.action,
-            "amount": cur.amount,
-            "note": cur.note,
-            "prev_hash": cur.prev_hash,
-            "wallet_address": cur.wallet_address,
-            "signed_message": cur.signed_message,
-            "signature": cur.signature,
-        })
-        if recomputed != cur.hash:
+        if _hash_block(_payload(cur)) != cur.hash:
             return False
+        prev_hash = cur.hash
     return True
 
-def to_dicts(chain: List[Block]) -> List[Dict[str, Any]]:
-    return [asdict(b) for b in chain]
+def resume_point(chain: Sequence[Block], count: int, tip_hash: str) -> Optional[int]:
+    """Position in `chain` right after block (count - 1) if it carries `tip_hash`, else None.
+
+    `chain` may start after genesis (older blocks archived); chain[0].prev_hash then stands in for
+    the block before it. count 0 resumes at the start of a chain that begins at genesis.
+    """
+    base = chain[0].index if len(chain) else 0
+    pos = count - base
+    if not 0 <= pos <= len(chain):
+        return None
+    if pos == 0:
+        return 0 if count == 0 or chain[0].prev_hash == tip_hash else None
+    return pos if chain[pos - 1].hash == tip_hash else None
+
+@timed("chain.validate_chain")
+def validate_chain(chain: Sequence[Block]) -> bool:
+    """Full audit: re-hash every block from genesis."""
+    if not chain or chain[0].action != "GENESIS":
+        return False
+    return _validate_range(chain, 1)
+
+@timed("chain.validate_incremental")
+def validate_incremental(chain: Sequence[Block], checkpoint: Optional[Dict[str, Any]] = None,
+                         anchor: Optional[Dict[str, Any]] = None) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Check only the blocks after a verified checkpoint {"index", "hash"}.
+
+    The checkpoint is trusted only if the block at that index still carries the same hash;
+    otherwise this falls back to a full audit. Returns (valid, checkpoint to persist).
+    Edits inside the verified prefix that keep the stored hashes are only caught by validate_chain.
+    A chain whose older blocks were archived needs `anchor`, the snapshot {"index", "hash"} of the
+    block right before chain[0]; the "full audit" then starts from it.
+    """
+    if not chain:
+        return False, None
+    base = chain[0].index
+    if base == 0 and chain[0].action != "GENESIS":
+        return False, None
+    if base > 0 and not (anchor and int(anchor.get("index", -1)) == base - 1 and anchor.get("hash") == chain[0].prev_hash):
+        return False, None
+    start = 1 if base == 0 else 0
+    if checkpoint:
+        pos = resume_point(chain, int(checkpoint.get("index", -1)) + 1, checkpoint.get("hash"))
+        if pos is not None:
+            start = max(start, pos)
+        else:
+            checkpoint = None
+    if not _validate_range(chain, start, chain[0].prev_hash if base > 0 else None):
+        return False, checkpoint
+    return True, {"index": chain[-1].index, "hash": chain[-1].hash}
+
+def block_dict(b: Block) -> Dict[str, Any]:
+    # Block is slotted (no __dict__/vars); this is the row shape storage reads and writes
+    row = _payload(b)
+    row["hash"] = b.hash
+    return row
+
+def to_dicts(chain: Sequence[Block]) -> List[Dict[str, Any]]:
+    return [block_dict(b) for b in chain]
 
 def from_dicts(rows: List[Dict[str, Any]]) -> List[Block]:
     return [Block(**row) for row in rows]
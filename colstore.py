@@ -0,0 +1,218 @@
+# colstore.py — columnar binary ledger: fixed-width numeric records + a string heap, memory-mapped on read
+import os, re, mmap, tempfile
+import numpy as np
+from typing import List, Dict, Any, Iterator, Optional
+
+STRING_COLS = ["actor", "note", "wallet_address", "signed_message", "signature"]
+
+# one fixed-width record per block; strings live in the heap as (offset, length) pairs
+RECORD = np.dtype(
+    [("index", "<i8"), ("timestamp", "<f8"), ("amount", "<f8"), ("action", "S8"),
+     ("prev_hash", "S64"), ("hash", "S64")]
+    + [(f"{c}_off", "<u8") for c in STRING_COLS]
+    + [(f"{c}_len", "<u4") for c in STRING_COLS]
+)
+
+
+_DATA_FILE = re.compile(r"^(records|strings)(\.\d+)?\.bin$")
+
+
+class ColumnarLedger:
+    """Ledger stored under `path/` as records.bin (fixed width) + strings.bin (utf-8 heap).
+
+    Numeric/hash columns are numpy memmaps, so stats and tail access never decode the string heap.
+    Appends write heap bytes first and the record last; readers ignore a torn record, the next append drops it.
+    A rewrite writes a new generation (records.N.bin + strings.N.bin) and switches to it by replacing
+    the one-line CURRENT file, so the pair is always swapped together.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._current_path = os.path.join(path, "CURRENT")
+        self._recs = None
+        self._heap = None
+        self._heap_size = -1
+        self.gen = -1
+        self._gen_stamp: Any = ()
+        os.makedirs(path, exist_ok=True)
+        self._sync_gen()
+        for p in (self.records_path, self.heap_path):
+            if not os.path.exists(p):
+                open(p, "wb").close()
+
+    # ---------- generations ----------
+    @staticmethod
+    def _names(gen: int):
+        # generation 0 keeps the original file names, so existing ledgers need no conversion
+        return ("records.bin", "strings.bin") if gen == 0 else (f"records.{gen}.bin", f"strings.{gen}.bin")
+
+    def _sync_gen(self):
+        """Follow CURRENT if another handle (or process) rewrote the ledger. One stat when nothing changed."""
+        try:
+            st = os.stat(self._current_path)
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._gen_stamp:
+            return
+        gen = 0
+        if stamp is not None:
+            with open(self._current_path, "r", encoding="ascii") as f:
+                gen = int(f.read().strip() or 0)
+        self._gen_stamp = stamp
+        if gen != self.gen:
+            self.close()
+            self.gen = gen
+            rec, heap = self._names(gen)
+            self.records_path, self.heap_path = os.path.join(self.path, rec), os.path.join(self.path, heap)
+
+    def _drop_stale(self):
+        keep = set(self._names(self.gen))
+        for name in os.listdir(self.path):
+            if _DATA_FILE.match(name) and name not in keep:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass   # still open elsewhere (Windows): retried after the next rewrite
+
+    # ---------- housekeeping ----------
+    def _repair(self):
+        size = os.path.getsize(self.records_path)
+        if size % RECORD.itemsize:
+            with open(self.records_path, "r+b") as f:
+                f.truncate(size - size % RECORD.itemsize)
+
+    def _records(self) -> np.ndarray:
+        self._sync_gen()
+        n = os.path.getsize(self.records_path) // RECORD.itemsize
+        if self._recs is None or len(self._recs) != n:
+            self._recs = np.memmap(self.records_path, dtype=RECORD, mode="r", shape=(n,)) if n else np.zeros(0, RECORD)
+        return self._recs
+
+    def _heap_view(self):
+        self._sync_gen()
+        size = os.path.getsize(self.heap_path)
+        if self._heap is None or size != self._heap_size:
+            if self._heap is not None:
+                self._heap.close()
+            self._heap = None
+            if size:
+                with open(self.heap_path, "rb") as f:
+                    self._heap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._heap_size = size
+        return self._heap
+
+    def close(self):
+        self._recs = None
+        if self._heap is not None:
+            self._heap.close()
+            self._heap = None
+            self._heap_size = -1
+
+    # ---------- read ----------
+    def __len__(self) -> int:
+        return len(self._records())
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy view of a fixed-width column (index, timestamp, amount, action, prev_hash, hash)."""
+        return self._records()[name]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        if i < 0:
+            i += len(self)
+        for row in self.rows(i, i + 1):
+            return row
+        raise IndexError("record index out of range")
+
+    def rows(self, start: int = 0, stop: Optional[int] = None, chunk: int = 4096) -> Iterator[Dict[str, Any]]:
+        # one memmap + heap lookup per call, and whole columns converted per chunk rather than field by field
+        recs, heap = self._records(), self._heap_view()
+        stop = len(recs) if stop is None else min(stop, len(recs))
+        for lo in range(max(start, 0), stop, chunk):
+            part = recs[lo:min(lo + chunk, stop)]
+            cols = [part[name].tolist() for name in ("index", "timestamp", "amount")]
+            cols += [[v.decode("ascii") for v in part[name].tolist()] for name in ("action", "prev_hash", "hash")]
+            seen: Dict[bytes, str] = {"": ""}   # actors, wallets and pot messages repeat: decode each once
+            for c in STRING_COLS:
+                vals = []
+                for off, ln in zip(part[f"{c}_off"].tolist(), part[f"{c}_len"].tolist()):
+                    raw = heap[off:off + ln] if ln else ""
+                    text = seen.get(raw)
+                    if text is None:
+                        text = seen[raw] = raw.decode("utf-8")
+                    vals.append(text)
+                cols.append(vals)
+            for i, ts, amount, action, prev_hash, h, actor, note, wallet, msg, sig in zip(*cols):
+                yield {
+                    "index": i, "timestamp": ts, "actor": actor, "action": action, "amount": amount,
+                    "note": note, "prev_hash": prev_hash, "wallet_address": wallet,
+                    "signed_message": msg, "signature": sig, "hash": h,
+                }
+
+    def tail(self, n: int = 1) -> List[Dict[str, Any]]:
+        total = len(self)
+        return list(self.rows(max(0, total - n), total))
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return list(self.rows())
+
+    # ---------- write ----------
+    def _pack(self, rows: List[Dict[str, Any]], heap_start: int):
+        recs = np.zeros(len(rows), RECORD)
+        blobs, off = [], heap_start
+        for k, r in enumerate(rows):
+            recs[k]["index"] = int(r["index"])
+            recs[k]["timestamp"] = float(r["timestamp"])
+            recs[k]["amount"] = float(r["amount"])
+            recs[k]["action"] = str(r["action"]).encode("ascii")
+            recs[k]["prev_hash"] = str(r["prev_hash"]).encode("ascii")
+            recs[k]["hash"] = str(r["hash"]).encode("ascii")
+            for c in STRING_COLS:
+                b = str(r.get(c, "") or "").encode("utf-8")
+                recs[k][f"{c}_off"], recs[k][f"{c}_len"] = off, len(b)
+                blobs.append(b)
+                off += len(b)
+        return recs, b"".join(blobs)
+
+    def append(self, rows: List[Dict[str, Any]]):
+        self._sync_gen()
+        self._repair()
+        recs, blob = self._pack(rows, os.path.getsize(self.heap_path))
+        with open(self.heap_path, "ab") as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.records_path, "ab") as f:
+            f.write(recs.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def rewrite(self, rows: List[Dict[str, Any]]):
+        self._sync_gen()
+        gen = self.gen + 1
+        recs, blob = self._pack(rows, 0)
+        for name, data in zip(self._names(gen), (recs.tobytes(), blob)):
+            with open(os.path.join(self.path, name), "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        # the switch: one rename, so readers and crashes see the old pair or the new one, never a mix
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix="CURRENT.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="ascii") as f:
+            f.write(f"{gen}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._current_path)
+        try:
+            dfd = os.open(self.path, os.O_RDONLY)
+        except OSError:
+            dfd = None
+        if dfd is not None:
+            try:
+                os.fsync(dfd)
+            except OSError:
+                pass
+            finally:
+                os.close(dfd)
+        self._sync_gen()
+        self._drop_stale()
@@ -0,0 +1,129 @@
+# export.py — streaming ledger export (CSV / NDJSON), full, ranged or "since index/hash"
+#
+#   python export.py --format ndjson --since-index 1200 > new_blocks.ndjson
+#   python export.py --pot RoadTrip --after-hash 9eb6e2... --out mirror_delta.csv
+#   python export.py --actor Alice --action DEPOSIT             # filtered through the secondary indexes
+import argparse, csv, io, json, sys
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence
+
+import storage
+from chain import Block, block_dict
+from storage import COLUMNS
+
+FORMATS = ("csv", "ndjson")
+
+
+def find_hash(chain: Sequence[Block], block_hash: str) -> Optional[int]:
+    """Position of the block with `block_hash`. Mirrors ask about recent tips, so scan from the end."""
+    hash_at = getattr(chain, "hash_at", None) or (lambda i: chain[i].hash)   # BlockStore: no Block built
+    for i in range(len(chain) - 1, -1, -1):
+        if hash_at(i) == block_hash:
+            return i
+    return None
+
+
+def iter_chunks(rows: Iterable[Dict[str, Any]], fmt: str = "csv", header: bool = True,
+                chunk_rows: int = 1000) -> Iterator[str]:
+    """Encode rows as CSV (same columns as data/ledger.csv) or NDJSON, `chunk_rows` at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    if fmt == "csv" and header:
+        writer.writerow(COLUMNS)
+    n = 0
+    for row in rows:
+        if fmt == "csv":
+            writer.writerow([row.get(c, "") for c in COLUMNS])
+        else:
+            buf.write(json.dumps({c: row.get(c, "") for c in COLUMNS}) + "\n")
+        n += 1
+        if n % chunk_rows == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def export_chain(chain: Sequence[Block], fmt: str = "csv", start: int = 0, stop: Optional[int] = None,
+                 after_hash: Optional[str] = None, chunk_rows: int = 1000,
+                 only: Optional[Iterable[int]] = None) -> Iterator[str]:
+    """Export blocks with index in [start, stop) of an in-memory chain, or everything after `after_hash`.
+    `only` restricts that to the given block indexes (ascending, e.g. from LedgerIndex.query).
+    A chain holding only the live tail (older blocks archived) can't export below chain[0].index."""
+    base = chain[0].index if len(chain) else 0
+    if after_hash:
+        pos = find_hash(chain, after_hash)
+        if pos is None:
+            raise KeyError(f"unknown block hash {after_hash}")
+        start = base + pos + 1
+    if start < base:
+        raise ValueError(f"blocks before #{base} are archived; use export_pot")
+    stop = len(chain) if stop is None else min(stop - base, len(chain))
+    if only is not None:
+        rows = (block_dict(chain[i - base]) for i in only if start <= i < base + stop)
+    else:
+        rows = (block_dict(chain[i]) for i in range(start - base, stop))
+    return iter_chunks(rows, fmt, chunk_rows=chunk_rows)
+
+
+def export_pot(pot: Optional[str] = None, fmt: str = "csv", start: int = 0, stop: Optional[int] = None,
+               after_hash: Optional[str] = None, chunk_rows: int = 1000) -> Iterator[str]:
+    """Same as export_chain, streamed straight from storage (constant memory)."""
+    def rows() -> Iterator[Dict[str, Any]]:
+        if after_hash:
+            found = False
+            for row in storage.iter_rows(pot):
+                if found:
+                    yield row
+                found = found or row["hash"] == after_hash
+            if not found:
+                raise KeyError(f"unknown block hash {after_hash}")
+            return
+        yield from storage.iter_rows(pot, start, stop)   # an indexed range read on the sqlite backend
+    return iter_chunks(rows(), fmt, chunk_rows=chunk_rows)
+
+
+def _filtered(args) -> Iterator[str]:
+    # field filters go through the pot's secondary indexes, over the live ledger
+    from indexes import open_index
+    chain = storage.load_store(args.pot)
+    index = open_index(args.pot)
+    index.sync(chain)
+    start = max(args.since_index, chain[0].index if len(chain) else 0)
+    only = index.query(actors=args.actor, wallets=args.wallet, actions=args.action, start=start, stop=args.until_index)
+    return export_chain(chain, args.format, start, args.until_index, args.after_hash, only=only)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Stream a pot's ledger as CSV or NDJSON")
+    ap.add_argument("--pot", default=None)
+    ap.add_argument("--format", choices=FORMATS, default="csv")
+    ap.add_argument("--since-index", type=int, default=0, help="first block index to include")
+    ap.add_argument("--until-index", type=int, default=None, help="stop before this block index")
+    ap.add_argument("--after-hash", default=None, help="only blocks after this hash (mirror sync)")
+    ap.add_argument("--actor", action="append", help="only this actor's blocks (repeatable; live ledger only)")
+    ap.add_argument("--wallet", action="append", help="only blocks signed by this wallet address (repeatable)")
+    ap.add_argument("--action", action="append", choices=["GENESIS", "DEPOSIT", "WITHDRAW"])
+    ap.add_argument("--out", default=None, help="file to write (default stdout)")
+    args = ap.parse_args(argv)
+    out = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+    try:
+        if args.actor or args.wallet or args.action:
+            for chunk in _filtered(args):
+                out.write(chunk)
+        else:
+            for chunk in export_pot(args.pot, args.format, args.since_index, args.until_index, args.after_hash):
+                out.write(chunk)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    finally:
+        if args.out:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# indexes.py — persisted secondary indexes (actor, wallet address, action, timestamp) over the live ledger,
+# so "all deposits by Alice" or "last week's activity" is an index lookup instead of a scan of every block
+import os, sqlite3, threading
+from typing import List, Iterable, Iterator, Optional, Sequence, Tuple
+
+import storage
+from chain import Block, resume_point
+from metrics import timed
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v);
+CREATE TABLE IF NOT EXISTS blocks (
+    idx INTEGER PRIMARY KEY, ts REAL NOT NULL, actor TEXT NOT NULL, wallet TEXT NOT NULL, action TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS blocks_actor ON blocks (actor, idx);
+CREATE INDEX IF NOT EXISTS blocks_wallet ON blocks (wallet, idx);
+CREATE INDEX IF NOT EXISTS blocks_action ON blocks (action, idx);
+CREATE INDEX IF NOT EXISTS blocks_ts ON blocks (ts);
+"""
+
+
+def _index_rows(chain: Sequence[Block], pos: int) -> Iterator[Tuple[int, float, str, str, str]]:
+    """(index, timestamp, actor, lowercased wallet, action) for chain[pos:]."""
+    if hasattr(chain, "codes"):   # BlockStore: read the columns, no Block built per row
+        actor_ids, actors = chain.codes("actor")
+        wallet_ids, wallets = chain.codes("wallet_address")
+        action_ids, actions = chain.codes("action")
+        wallets = [w.lower() for w in wallets]
+        base, ts = chain[0].index, chain.timestamps()
+        for p in range(pos, len(chain)):
+            yield base + p, ts[p], actors[actor_ids[p]], wallets[wallet_ids[p]], actions[action_ids[p]]
+        return
+    for b in chain[pos:]:
+        yield b.index, b.timestamp, b.actor, b.wallet_address.lower(), b.action
+
+
+class LedgerIndex:
+    """Block indexes by actor, wallet address (case-insensitive), action and timestamp, in an SQLite (WAL) file
+    next to the ledger. Kept in step with the chain like the aggregates: sync() indexes only blocks it hasn't
+    seen, in one transaction with its tip, and re-indexes the live ledger if history diverged.
+
+    Queries return absolute block indexes (ascending unless asked for newest first); once older blocks are archived only those from
+    `start` (pass chain[0].index) are meaningful to the in-memory chain.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")   # rebuildable from the ledger, so no fsync per append
+        self._db.executescript(_SCHEMA)
+
+    def _tip(self) -> Tuple[int, str]:
+        meta = dict(self._db.execute("SELECT k, v FROM meta").fetchall())
+        return int(meta.get("count", 0)), str(meta.get("tip_hash", ""))
+
+    @property
+    def count(self) -> int:
+        """Blocks indexed so far (genesis included): the next index to add."""
+        return self._tip()[0]
+
+    @timed("indexes.sync")
+    def sync(self, chain: Sequence[Block]) -> bool:
+        """Index blocks of `chain` added since the last sync. Returns True if anything changed."""
+        if not len(chain):
+            return False
+        with self._lock:
+            if resume_point(chain, *self._tip()) == len(chain):
+                return False   # common case: no write lock taken
+            db = self._db
+            db.execute("BEGIN IMMEDIATE")   # another process may be syncing the same pot
+            try:
+                pos = resume_point(chain, *self._tip())
+                if pos is None:
+                    db.execute("DELETE FROM blocks")
+                    pos = 0
+                db.executemany("INSERT OR REPLACE INTO blocks (idx, ts, actor, wallet, action) VALUES (?, ?, ?, ?, ?)",
+                               _index_rows(chain, pos))
+                db.executemany("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)",
+                               [("count", chain[-1].index + 1), ("tip_hash", chain[-1].hash)])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return pos < len(chain)
+
+    @timed("indexes.query")
+    def query(self, actors: Optional[Iterable[str]] = None, wallets: Optional[Iterable[str]] = None,
+              actions: Optional[Iterable[str]] = None, start_ts: Optional[float] = None,
+              end_ts: Optional[float] = None, start: int = 0, stop: Optional[int] = None,
+              limit: Optional[int] = None, newest_first: bool = False) -> List[int]:
+        """Indexes of blocks matching every given filter, ascending, or descending with `newest_first` (so
+        `limit` keeps the newest). Time bounds: start_ts inclusive, end_ts exclusive; index bounds [start, stop)."""
+        where, args = ["idx >= ?"], [start]
+        if stop is not None:
+            where.append("idx < ?")
+            args.append(stop)
+        for col, values in (("actor", actors), ("wallet", wallets), ("action", actions)):
+            if values is not None:
+                values = [v.lower() for v in values] if col == "wallet" else list(values)
+                if not values:
+                    return []
+                where.append(f"{col} IN ({','.join('?' * len(values))})")
+                args += values
+        if start_ts is not None:
+            where.append("ts >= ?")
+            args.append(start_ts)
+        if end_ts is not None:
+            where.append("ts < ?")
+            args.append(end_ts)
+        sql = f"SELECT idx FROM blocks WHERE {' AND '.join(where)} ORDER BY idx {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [i for (i,) in self._db.execute(sql, args)]
+
+    def keys(self, field: str) -> List[str]:
+        """Distinct values of "actor", "wallet" or "action" (sorted)."""
+        if field not in ("actor", "wallet", "action"):
+            raise ValueError(f"no index on {field!r}")
+        with self._lock:
+            return [v for (v,) in self._db.execute(f"SELECT DISTINCT {field} FROM blocks ORDER BY {field}")]
+
+    def close(self):
+        self._db.close()
+
+
+def open_index(pot: Optional[str] = None) -> LedgerIndex:
+    return LedgerIndex(storage.pot_path(pot, "ledger.index.sqlite3"))
@@ -0,0 +1,78 @@
+# ledger_view.py — windowed ledger table: filter, then format only the visible page
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from chain import Block
+from indexes import LedgerIndex
+from utils import pretty_time, fmt_money
+
+DISPLAY_COLUMNS = ["index", "time", "actor", "action", "amount", "note", "prev_hash", "hash", "wallet", "signed?"]
+
+
+@lru_cache(maxsize=50_000)
+def _display(block_hash: str, currency: str, index: int, timestamp: float, actor: str, action: str,
+             amount: float, note: str, prev_hash: str, wallet_address: str, signed: bool) -> tuple:
+    # keyed by the block hash (+ currency), so each block is formatted once per process
+    return (
+        index,
+        pretty_time(timestamp),
+        actor,
+        action,
+        fmt_money(amount, currency),
+        note,
+        str(prev_hash)[:10] + "…",
+        str(block_hash)[:10] + "…",
+        (wallet_address[:10] + "…") if wallet_address else "",
+        "yes" if signed else "no",
+    )
+
+
+def display_row(b: Block, currency: str) -> tuple:
+    return _display(b.hash, currency, b.index, b.timestamp, b.actor, b.action, b.amount, b.note,
+                    b.prev_hash, b.wallet_address, bool(b.signature))
+
+
+def select(chain: Sequence[Block], actors: Optional[Sequence[str]] = None, actions: Optional[Sequence[str]] = None,
+           start_ts: Optional[float] = None, end_ts: Optional[float] = None, wallets: Optional[Sequence[str]] = None,
+           index: Optional[LedgerIndex] = None) -> Sequence[int]:
+    """Positions in `chain` matching the filters (start_ts inclusive, end_ts exclusive). With no filter at all
+    this is a range, not a list.
+
+    Timestamps are not monotonic (clock skew, API batches with their own ts), so time bounds are a filter, not
+    a bisection. Filters are answered by `index` (synced with `chain`) when given, else by a scan.
+    """
+    if not actors and not actions and not wallets and start_ts is None and end_ts is None:
+        return range(len(chain))
+    if index is not None:
+        base = chain[0].index
+        found = index.query(actors=actors or None, wallets=wallets or None, actions=actions or None,
+                            start_ts=start_ts, end_ts=end_ts, start=base, stop=base + len(chain))
+        return [i - base for i in found]
+    actor_set, action_set = set(actors or ()), set(actions or ())
+    wallet_set = {w.lower() for w in wallets or ()}
+    return [
+        i for i, b in enumerate(chain)
+        if (not actor_set or b.actor in actor_set) and (not action_set or b.action in action_set)
+        and (not wallet_set or b.wallet_address.lower() in wallet_set)
+        and (start_ts is None or b.timestamp >= start_ts) and (end_ts is None or b.timestamp < end_ts)
+    ]
+
+
+def page_count(total: int, page_size: int) -> int:
+    return max(1, -(-total // page_size))
+
+
+def page_frame(chain: Sequence[Block], positions: Sequence[int], page: int, page_size: int,
+               currency: str, newest_first: bool = True) -> "pd.DataFrame":
+    """DataFrame for one page (1-based) of `positions`; only those rows are formatted."""
+    import pandas as pd
+    n = len(positions)
+    start = (page - 1) * page_size
+    if newest_first:
+        window = [positions[i] for i in range(n - 1 - start, max(n - 1 - start - page_size, -1), -1)]
+    else:
+        window = [positions[i] for i in range(start, min(start + page_size, n))]
+    return pd.DataFrame([display_row(chain[i], currency) for i in window], columns=DISPLAY_COLUMNS)
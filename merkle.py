@@ -0,0 +1,217 @@
+# merkle.py — append-only Merkle tree over block hashes (RFC 6962 / 9162 layout)
+import os, hashlib
+from typing import List, Optional, Iterable
+
+# domain-separated hashing so a leaf can never be passed off as an interior node
+def _leaf(block_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(block_hash)).digest()
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def _split(n: int) -> int:
+    # largest power of two strictly smaller than n
+    k = 1
+    while k * 2 < n:
+        k *= 2
+    return k
+
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+
+
+class MerkleLog:
+    """Incremental Merkle tree. levels[k] holds every complete subtree of 2**k leaves (32 bytes each),
+    so an append touches O(log n) nodes and roots/proofs for any size read O(log n) stored nodes.
+
+    With `path`, each level is persisted as an append-only file (L<k>.bin) and reloaded without re-hashing.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.levels: List[bytearray] = [bytearray()]
+        self._saved: List[int] = []
+        if path and os.path.isdir(path):
+            self._load()
+
+    # ---------- persistence ----------
+    def _level_file(self, k: int) -> str:
+        return os.path.join(self.path, f"L{k}.bin")
+
+    def _load(self):
+        levels, k = [], 0
+        while os.path.exists(self._level_file(k)):
+            with open(self._level_file(k), "rb") as f:
+                data = f.read()
+            levels.append(bytearray(data[:len(data) - len(data) % 32]))
+            k += 1
+        # a crash between level writes can leave upper levels short; rebuild anything inconsistent
+        n = len(levels[0]) // 32 if levels else 0
+        expected = 0
+        while n >> expected:
+            expected += 1
+        ok = len(levels) >= max(expected, 1) and all(
+            len(levels[i]) // 32 == n >> i for i in range(len(levels)))
+        if ok:
+            self.levels = levels or [bytearray()]
+            self._saved = [len(l) for l in self.levels]
+        else:
+            leaves = levels[0] if levels else bytearray()
+            self.levels = [bytearray()]
+            for i in range(0, len(leaves), 32):
+                self._push(bytes(leaves[i:i + 32]))
+            self._saved = []
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        if not self._saved:
+            # full rewrite: drop level files left over from a bigger, now-discarded tree
+            k = len(self.levels)
+            while os.path.exists(self._level_file(k)):
+                os.remove(self._level_file(k))
+                k += 1
+        for k, level in enumerate(self.levels):
+            done = self._saved[k] if k < len(self._saved) else 0
+            mode = "ab" if done else "wb"
+            if len(level) > done or not done:
+                with open(self._level_file(k), mode) as f:
+                    f.write(level[done:])
+                    f.flush()
+                    os.fsync(f.fileno())
+        self._saved = [len(l) for l in self.levels]
+
+    # ---------- building ----------
+    @property
+    def size(self) -> int:
+        return len(self.levels[0]) // 32
+
+    def _get(self, k: int, i: int) -> bytes:
+        return bytes(self.levels[k][32 * i:32 * i + 32])
+
+    def _push(self, leaf_hash: bytes):
+        self.levels[0] += leaf_hash
+        k, i = 0, self.size - 1
+        # each time a left sibling exists, a new complete node forms one level up
+        while i % 2 == 1:
+            parent = _node(self._get(k, i - 1), self._get(k, i))
+            k, i = k + 1, i // 2
+            if len(self.levels) <= k:
+                self.levels.append(bytearray())
+            self.levels[k] += parent
+
+    def append(self, block_hash: str):
+        self._push(_leaf(block_hash))
+
+    def extend(self, block_hashes: Iterable[str]):
+        for h in block_hashes:
+            self.append(h)
+
+    def sync(self, block_hashes: List[str], base: int = 0) -> bool:
+        """Catch up with the ledger's hash column; rebuild if it no longer matches what we've indexed.
+
+        `block_hashes` start at block `base` (> 0 once older blocks are archived). Leaves below `base`
+        are kept as they are; if the tree doesn't reach `base` it can't be rebuilt from these hashes.
+        """
+        n, end = self.size, base + len(block_hashes)
+        if n == end and (n == base or self._get(0, n - 1) == _leaf(block_hashes[-1])):
+            return False
+        if n < base or n > end or (n > base and self._get(0, n - 1) != _leaf(block_hashes[n - 1 - base])):
+            if base > 0:
+                raise ValueError("Merkle tree doesn't reach the live ledger; rebuild it from the full history")
+            self.levels, self._saved, n = [bytearray()], [], 0
+        self.extend(block_hashes[n - base:])
+        return True
+
+    # ---------- roots & proofs ----------
+    def _subtree(self, lo: int, hi: int) -> bytes:
+        n = hi - lo
+        if n & (n - 1) == 0 and lo % n == 0:
+            return self._get(n.bit_length() - 1, lo // n)   # stored complete subtree
+        k = _split(n)
+        return _node(self._subtree(lo, lo + k), self._subtree(lo + k, hi))
+
+    def root(self, size: Optional[int] = None) -> str:
+        size = self.size if size is None else size
+        if not 0 <= size <= self.size:
+            raise ValueError(f"size {size} out of range (tree has {self.size} leaves)")
+        return self._subtree(0, size).hex() if size else EMPTY_ROOT
+
+    def inclusion_proof(self, index: int, size: Optional[int] = None) -> List[str]:
+        """Audit path for leaf `index` in the tree of the first `size` leaves."""
+        size = self.size if size is None else size
+        if not 0 <= index < size <= self.size:
+            raise ValueError(f"index {index} / size {size} out of range (tree has {self.size} leaves)")
+        path, lo, hi = [], 0, size
+        while hi - lo > 1:
+            k = _split(hi - lo)
+            if index < lo + k:
+                path.append(self._subtree(lo + k, hi))
+                hi = lo + k
+            else:
+                path.append(self._subtree(lo, lo + k))
+                lo = lo + k
+        return [p.hex() for p in reversed(path)]
+
+    def consistency_proof(self, old_size: int, size: Optional[int] = None) -> List[str]:
+        """Proof that the first `old_size` leaves are a prefix of the first `size` leaves."""
+        size = self.size if size is None else size
+        if not 0 < old_size <= size <= self.size:
+            raise ValueError(f"sizes {old_size} -> {size} out of range (tree has {self.size} leaves)")
+        proof, lo, hi, m, complete = [], 0, size, old_size, True
+        while m != hi - lo:
+            k = _split(hi - lo)
+            if m <= k:
+                proof.append(self._subtree(lo + k, hi))
+                hi = lo + k
+            else:
+                proof.append(self._subtree(lo, lo + k))
+                lo, m, complete = lo + k, m - k, False
+        if not complete:
+            proof.append(self._subtree(lo, hi))
+        return [p.hex() for p in reversed(proof)]
+
+
+# ---------- verification (needs only the proof, never the ledger) ----------
+def verify_inclusion(block_hash: str, index: int, size: int, proof: List[str], root: str) -> bool:
+    if not 0 <= index < size:
+        return False
+    fn, sn, r = index, size - 1, _leaf(block_hash)
+    for p in map(bytes.fromhex, proof):
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = _node(p, r)
+            while not fn & 1 and fn != 0:
+                fn, sn = fn >> 1, sn >> 1
+        else:
+            r = _node(r, p)
+        fn, sn = fn >> 1, sn >> 1
+    return sn == 0 and r.hex() == root
+
+
+def verify_consistency(old_size: int, size: int, old_root: str, root: str, proof: List[str]) -> bool:
+    if not 0 < old_size <= size:
+        return False
+    if old_size == size:
+        return not proof and old_root == root
+    path = list(map(bytes.fromhex, proof))
+    if old_size & (old_size - 1) == 0:
+        path.insert(0, bytes.fromhex(old_root))
+    if not path:
+        return False
+    fn, sn = old_size - 1, size - 1
+    while fn & 1:
+        fn, sn = fn >> 1, sn >> 1
+    fr = sr = path[0]
+    for c in path[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr, sr = _node(c, fr), _node(c, sr)
+            while not fn & 1 and fn != 0:
+                fn, sn = fn >> 1, sn >> 1
+        else:
+            sr = _node(sr, c)
+        fn, sn = fn >> 1, sn >> 1
+    return sn == 0 and fr.hex() == old_root and sr.hex() == root
@@ -0,0 +1,178 @@
+# metrics.py — timings and counters for app reruns and the storage / chain / summarize entry points.
+# Process-wide, exported as a Prometheus text file (textfile-collector style) and shown in the app's diagnostics panel.
+import os, tempfile, threading, time
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Dict, Any, Optional, Tuple
+
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join("data", "metrics.prom"))   # "" disables the file
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_RERUNS = os.getenv("PROFILE_RERUNS", "") == "1"   # cProfile every app rerun (also a diagnostics toggle)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HELP = {
+    "pot_call_seconds": ("histogram", "fn", "Time spent in instrumented storage/chain/summarize calls."),
+    "pot_rerun_phase_seconds": ("histogram", "phase", "Time per phase of an app rerun."),
+    "pot_rerun_seconds": ("histogram", "", "Wall time of a whole app rerun."),
+    "pot_events_total": ("counter", "event", "Counted events (blocks committed, cache hits, ...)."),
+}
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count, self.total, self.max = 0, 0.0, 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, le in enumerate(BUCKETS):
+            if seconds <= le:
+                self.buckets[i] += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, metric: str, label: str, seconds: float):
+        with self._lock:
+            h = self.histograms.get((metric, label))
+            if h is None:
+                h = self.histograms[(metric, label)] = _Histogram()
+            h.observe(seconds)
+
+    def inc(self, metric: str, label: str, n: float = 1):
+        with self._lock:
+            self.counters[(metric, label)] = self.counters.get((metric, label), 0) + n
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """One dict per timed series (for the diagnostics table)."""
+        with self._lock:
+            return [
+                {"metric": m, "name": label, "calls": h.count, "total_ms": round(h.total * 1000, 2),
+                 "mean_ms": round(h.total / h.count * 1000, 3), "max_ms": round(h.max * 1000, 2)}
+                for (m, label), h in sorted(self.histograms.items())
+            ]
+
+    def prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            series = [(m, label, h) for (m, label), h in self.histograms.items()] + \
+                     [(m, label, v) for (m, label), v in self.counters.items()]
+            for metric in sorted({m for m, _, _ in series}):
+                kind, key, text = _HELP.get(metric, ("counter", "name", metric))
+                lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+                for m, label, v in sorted((s for s in series if s[0] == metric), key=lambda s: s[1]):
+                    lab = f'{key}="{label}"' if key else ""
+                    if kind == "counter":
+                        lines.append(f"{metric}{{{lab}}} {v:g}" if lab else f"{metric} {v:g}")
+                        continue
+                    sep = "," if lab else ""
+                    for le, n in zip(BUCKETS, v.buckets):
+                        lines.append(f'{metric}_bucket{{{lab}{sep}le="{le:g}"}} {n}')
+                    lines.append(f'{metric}_bucket{{{lab}{sep}le="+Inf"}} {v.count}')
+                    lines.append(f"{metric}_sum{{{lab}}} {v.total:.6f}" if lab else f"{metric}_sum {v.total:.6f}")
+                    lines.append(f"{metric}_count{{{lab}}} {v.count}" if lab else f"{metric}_count {v.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str = METRICS_PATH):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # own temp file per writer (app reruns and the API share the path); scrapers never see a half-written file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+REGISTRY = Registry()
+
+
+def timed(name: str):
+    """Decorator: record each call's duration as pot_call_seconds{fn=name}."""
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe("pot_call_seconds", name, time.perf_counter() - t)
+        return inner
+    return wrap
+
+
+@contextmanager
+def timer(name: str):
+    """Same as @timed for a block of code."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe("pot_call_seconds", name, time.perf_counter() - t)
+
+
+def count(event: str, n: float = 1):
+    REGISTRY.inc("pot_events_total", event, n)
+
+
+class RerunTrace:
+    """Phases of one top-to-bottom script run. The script is linear, so phases are laps:
+    begin("x") ends whatever phase was running. Optionally profiles the whole run with cProfile."""
+
+    def __init__(self, profile: bool = False):
+        self.t0 = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self._current: Optional[Tuple[str, float]] = None
+        self.profiler = None
+        if profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def begin(self, phase: str):
+        now = time.perf_counter()
+        self._close(now)
+        self._current = (phase, now)
+
+    def _close(self, now: float):
+        if self._current:
+            name, t = self._current
+            self.phases.append((name, now - t))
+            REGISTRY.observe("pot_rerun_phase_seconds", name, now - t)
+            self._current = None
+
+    def abort(self):
+        # a run cut short by st.stop(): stop profiling, keep the phases we have
+        if self.profiler:
+            self.profiler.disable()
+            self.profiler = None
+
+    def finish(self, path: str = METRICS_PATH) -> Optional[str]:
+        """Close the last phase, record the total and write the metrics file. Returns the profile path, if any."""
+        now = time.perf_counter()
+        self._close(now)
+        REGISTRY.observe("pot_rerun_seconds", "", now - self.t0)
+        REGISTRY.write(path)
+        if not self.profiler:
+            return None
+        self.profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        out = os.path.join(PROFILE_DIR, time.strftime("rerun-%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}.prof")
+        self.profiler.dump_stats(out)
+        self.profiler = None
+        return out
@@ -0,0 +1,126 @@
+# sigcache.py — persistent (message, signature) -> recovered address cache, so re-verifying an unchanged
+# ledger skips the ECDSA work. SQLite file next to the ledgers, shared by the app, audit.py and api.py.
+import hashlib, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from metrics import count
+
+SIGCACHE_PATH = os.getenv("SIGCACHE_PATH", os.path.join("data", "sigcache.sqlite3"))   # "" disables persistence
+SIGCACHE_MAX = int(os.getenv("SIGCACHE_MAX", "200000"))   # entries kept; least recently used go first
+
+
+def sig_key(message: str, signature: str) -> bytes:
+    return hashlib.sha256(message.encode("utf-8") + b"\x00" + signature.strip().lower().encode("ascii", "replace")).digest()
+
+
+def _recover(message: str, signature: str) -> str:
+    # eth_account takes ~1s to import; only paid once there is a signature to check
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    return Account.recover_message(encode_defunct(text=message), signature=signature)
+
+
+class SignatureCache:
+    """Only successful recoveries are stored (a bad signature is re-checked every time).
+
+    Anyone who can write the data dir could plant entries, which is no more than they could do to the ledger itself.
+    """
+
+    def __init__(self, path: str = SIGCACHE_PATH, max_entries: int = SIGCACHE_MAX):
+        self.path, self.max_entries = path, max_entries
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._mem: "OrderedDict[bytes, str]" = OrderedDict()   # used when persistence is off; LRU order
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")   # losing the last few entries on power loss only costs a re-check
+            db.execute("CREATE TABLE IF NOT EXISTS sigs (key BLOB PRIMARY KEY, address TEXT NOT NULL, used REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS sigs_used ON sigs (used)")
+            self._db = db
+        return self._db
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, str]:
+        keys = list(dict.fromkeys(keys))
+        if not self.path:
+            with self._lock:
+                found = {k: self._mem[k] for k in keys if k in self._mem}
+                for k in found:
+                    self._mem.move_to_end(k)
+        else:
+            found = {}
+            with self._lock:
+                db = self._conn()
+                for i in range(0, len(keys), 500):   # stay under SQLite's bound-parameter limit
+                    part = keys[i:i + 500]
+                    q = f"SELECT key, address FROM sigs WHERE key IN ({','.join('?' * len(part))})"
+                    found.update(db.execute(q, part).fetchall())
+                if found:
+                    now = time.time()
+                    db.executemany("UPDATE sigs SET used = ? WHERE key = ?", [(now, k) for k in found])
+                    db.commit()
+        count("sigcache_hits", len(found))
+        count("sigcache_misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[bytes, str]]):
+        entries = list(entries)
+        if not entries:
+            return
+        if not self.path:
+            with self._lock:
+                for k, a in entries:
+                    self._mem[k] = a
+                    self._mem.move_to_end(k)
+                while len(self._mem) > self.max_entries:
+                    self._mem.popitem(last=False)
+            return
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.executemany("INSERT OR REPLACE INTO sigs (key, address, used) VALUES (?, ?, ?)",
+                           [(k, a, now) for k, a in entries])
+            (n,) = db.execute("SELECT COUNT(*) FROM sigs").fetchone()
+            if n > self.max_entries:
+                # evict down to 90% so we don't trim on every insert
+                db.execute("DELETE FROM sigs WHERE key IN (SELECT key FROM sigs ORDER BY used LIMIT ?)",
+                           (n - int(self.max_entries * 0.9),))
+            db.commit()
+
+    def recover(self, message: str, signature: str) -> str:
+        """Recovered signer address; raises like Account.recover_message for a bad signature."""
+        key = sig_key(message, signature)
+        hit = self.get_many([key]).get(key)
+        if hit is not None:
+            return hit
+        address = _recover(message, signature)
+        self.put_many([(key, address)])
+        return address
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self.path and os.path.exists(self.path):
+                self._conn().execute("DELETE FROM sigs")
+                self._conn().commit()
+
+
+_default: Optional[SignatureCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> SignatureCache:
+    """Process-wide cache on SIGCACHE_PATH (opened on first use)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SignatureCache()
+        return _default
+
+
+def recover_signer(message: str, signature: str) -> str:
+    return default_cache().recover(message, signature)
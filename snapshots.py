@@ -0,0 +1,193 @@
+# snapshots.py — state at block N (tip hash, totals, rollups, Merkle root) so startup only replays later blocks,
+# and archival of old blocks into compressed segments that stay verifiable
+#
+#   python snapshots.py snapshot [pot]          # snapshot the current (valid) tip
+#   python snapshots.py archive [pot] [--upto N] # move blocks up to snapshot N (default: latest below the tip) into a segment
+#   python snapshots.py verify [pot]            # re-hash archive segments and check them against the snapshot
+import argparse, os, sys
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import storage
+from aggregates import Aggregates
+from analytics import Rollups
+from chain import Block, _hash_block, _payload, resume_point, validate_incremental
+from committer import pot_lock
+from merkle import MerkleLog
+
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "1000"))   # blocks between automatic snapshots (0 = off)
+SNAPSHOT_KEEP = 5
+
+
+def latest_usable(chain: Sequence[Block], pot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Newest snapshot whose block is in `chain` (or is the archived block right before it)."""
+    for i in reversed(storage.list_snapshots(pot)):
+        snap = storage.load_snapshot(i, pot)
+        if snap and resume_point(chain, i + 1, snap["hash"]) is not None:
+            return snap
+    return None
+
+
+def anchor_for(chain: Sequence[Block], pot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Snapshot of the block right before chain[0] when older blocks are archived, else None."""
+    base = chain[0].index if len(chain) else 0
+    return storage.load_snapshot(base - 1, pot) if base > 0 else None
+
+
+def sync_state(chain: Sequence[Block], pot: Optional[str] = None) -> Tuple[Aggregates, Rollups, MerkleLog]:
+    """Aggregates, rollups and Merkle tree caught up with `chain`, persisted.
+
+    Each starts from its sidecar; one that is missing or doesn't match the chain starts from the newest
+    usable snapshot instead of genesis, so only the blocks after it are replayed.
+    """
+    agg = Aggregates.from_dict(storage.load_aggregates(pot) or {})
+    rollups = Rollups.from_dict(storage.load_rollups(pot) or {})
+    snap = None
+    for state in (agg, rollups):
+        if resume_point(chain, state.count, state.tip_hash) is None or state.count == 0:
+            snap = snap or latest_usable(chain, pot) or {}
+    if snap:
+        if resume_point(chain, agg.count, agg.tip_hash) is None or agg.count < snap["index"] + 1:
+            agg = Aggregates.from_dict(snap["aggregates"])
+        if resume_point(chain, rollups.count, rollups.tip_hash) is None or rollups.count < snap["index"] + 1:
+            rollups = Rollups.from_dict(snap["rollups"])
+    if agg.sync(chain):
+        storage.save_aggregates(agg.to_dict(), pot=pot)
+    if rollups.sync(chain):
+        storage.save_rollups(rollups.to_dict(), pot=pot)
+
+    mtree = MerkleLog(storage.pot_path(pot, "ledger.merkle"))
+    base = chain[0].index if len(chain) else 0
+    hashes = chain.hashes() if hasattr(chain, "hashes") else [b.hash for b in chain]
+    try:
+        changed = mtree.sync(hashes, base)
+    except ValueError:
+        changed = mtree.sync([r["hash"] for r in storage.iter_rows(pot)])   # archived leaves too
+    if changed:
+        mtree.save()
+    return agg, rollups, mtree
+
+
+# ---------- taking snapshots ----------
+def take_snapshot(chain: Sequence[Block], agg: Aggregates, rollups: Rollups, mtree: MerkleLog,
+                  pot: Optional[str] = None) -> Dict[str, Any]:
+    """Record the state at the tip. Only call this for a chain that just validated."""
+    tip = chain[-1]
+    if agg.tip_hash != tip.hash or rollups.tip_hash != tip.hash or mtree.size != tip.index + 1:
+        raise ValueError("state is not synced to the tip")
+    snap = {
+        "index": tip.index, "hash": tip.hash, "timestamp": tip.timestamp,
+        "aggregates": agg.to_dict(), "rollups": rollups.to_dict(),
+        "merkle": {"size": mtree.size, "root": mtree.root()},
+    }
+    storage.save_snapshot(snap, pot)
+    _prune(pot)
+    return snap
+
+
+def maybe_snapshot(chain: Sequence[Block], agg: Aggregates, rollups: Rollups, mtree: MerkleLog,
+                   pot: Optional[str] = None, every: int = SNAPSHOT_EVERY) -> Optional[Dict[str, Any]]:
+    """Snapshot once the tip is `every` blocks past the last snapshot."""
+    taken = storage.list_snapshots(pot)
+    if every <= 0 or chain[-1].index - (taken[-1] if taken else 0) < every:
+        return None
+    return take_snapshot(chain, agg, rollups, mtree, pot)
+
+
+def _prune(pot: Optional[str]):
+    # keep the newest few plus the one anchoring the live ledger to the archive
+    segments = storage.load_archive_manifest(pot)
+    anchor = segments[-1]["last"] if segments else None
+    for i in storage.list_snapshots(pot)[:-SNAPSHOT_KEEP]:
+        if i != anchor:
+            storage.delete_snapshot(i, pot)
+
+
+# ---------- archival ----------
+def archive_upto(upto: int, pot: Optional[str] = None) -> Dict[str, Any]:
+    """Move live blocks up to and including `upto` into a segment. Needs a snapshot at `upto`: it anchors
+    the live ledger, which is then verified from that hash. The tip always stays live."""
+    snap = storage.load_snapshot(upto, pot)
+    if not snap:
+        raise ValueError(f"no snapshot at block {upto}")
+    with pot_lock(pot):
+        segments = storage.load_archive_manifest(pot)
+        done = segments[-1]["last"] if segments else -1
+        live = [r for r in storage.load_chain(pot) if r["index"] > done]   # a crash may have left archived rows
+        if not live or not live[0]["index"] <= upto < live[-1]["index"]:
+            raise ValueError(f"block {upto} is not an archivable live block (the tip stays live)")
+        pos = upto - live[0]["index"]
+        if live[pos]["hash"] != snap["hash"]:
+            raise ValueError(f"snapshot {upto} does not match the ledger")
+        seg = storage.write_segment(live[:pos + 1], pot)
+        storage.save_chain(live[pos + 1:], pot, reindex=False)
+    return seg
+
+
+def verify_archive(pot: Optional[str] = None) -> bool:
+    """Full audit of the archived prefix: digests, hash links and block hashes from genesis, ending at the anchor snapshot."""
+    segments = storage.load_archive_manifest(pot)
+    if not segments:
+        return True
+    prev, expected = None, 0
+    try:
+        for row in storage.iter_archive(pot, check=True):
+            b = Block(**row)
+            if b.index != expected:
+                return False
+            if expected == 0:
+                if b.action != "GENESIS":
+                    return False
+            elif b.prev_hash != prev or _hash_block(_payload(b)) != b.hash:
+                return False
+            prev, expected = b.hash, expected + 1
+    except (ValueError, OSError):
+        return False
+    anchor = storage.load_snapshot(segments[-1]["last"], pot)
+    return prev == segments[-1]["last_hash"] and bool(anchor) and anchor["hash"] == prev
+
+
+# ---------- CLI ----------
+def _open(pot: Optional[str]):
+    chain = storage.load_store(pot)
+    if not len(chain):
+        raise SystemExit(f"pot {pot or storage.DEFAULT_POT!r} has no ledger")
+    return chain
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Ledger snapshots and archive segments")
+    ap.add_argument("command", choices=["snapshot", "archive", "verify"])
+    ap.add_argument("pot", nargs="?", default=None)
+    ap.add_argument("--upto", type=int, default=None, help="archive up to this snapshot index (default: latest)")
+    args = ap.parse_args(argv)
+
+    if args.command == "verify":
+        chain = _open(args.pot)
+        ok = verify_archive(args.pot) and validate_incremental(chain, None, anchor_for(chain, args.pot))[0]
+        print("valid" if ok else "INVALID")
+        return 0 if ok else 1
+    if args.command == "snapshot":
+        chain = _open(args.pot)
+        if not validate_incremental(chain, storage.load_checkpoint(args.pot), anchor_for(chain, args.pot))[0]:
+            print("ledger does not validate; not snapshotting", file=sys.stderr)
+            return 1
+        snap = take_snapshot(chain, *sync_state(chain, args.pot), pot=args.pot)
+        print(f"snapshot at block {snap['index']} ({snap['hash']})")
+        return 0
+    tip = storage.load_tail(args.pot, 1)
+    below_tip = [i for i in storage.list_snapshots(args.pot) if tip and i < tip[0]["index"]]
+    upto = args.upto if args.upto is not None else (below_tip or [None])[-1]
+    if upto is None:
+        print("no snapshot below the tip to archive up to (snapshot, then add blocks)", file=sys.stderr)
+        return 1
+    try:
+        seg = archive_upto(upto, args.pot)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"archived blocks {seg['first']}..{seg['last']} -> {seg['file']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
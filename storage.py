@@ -1,26 +1,312 @@
-import os, pandas as pd
-from typing import List, Dict, Any
+import os, re, io, csv, gzip, json, shutil, hashlib, logging, tempfile, threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:   # no advisory file locks: pots.json updates are serialized per process only
+    fcntl = None
+
+from backends import BACKENDS, COLUMNS, LedgerBackend, read_records
+from metrics import timed
 
 DATA_DIR = "data"
+POTS_DIR = os.path.join(DATA_DIR, "pots")
+POT_INDEX_PATH = os.path.join(DATA_DIR, "pots.json")
+
+log = logging.getLogger(__name__)
+
+# the original single ledger lives directly in data/ and is served as this pot
+DEFAULT_POT = "SpringBreakFund"
 CSV_PATH = os.path.join(DATA_DIR, "ledger.csv")
+COL_PATH = os.path.join(DATA_DIR, "ledger.col")
+
+# "csv" (default, human-readable), "columnar" (memory-mapped binary, see colstore.py) or "sqlite" (WAL);
+# see backends.py, and migrate.py to convert a pot
+LEDGER_FORMAT = os.getenv("LEDGER_FORMAT", "csv").strip().lower()
+
+def ensure_data_dir(pot: Optional[str] = None):
+    d = pot_dir(pot)
+    if not os.path.exists(d):
+        os.makedirs(d, exist_ok=True)
+
+# ---------- Pot addressing ----------
+def pot_slug(pot: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", pot.strip()).strip("_")
+    return slug or "pot"
+
+def pot_dir(pot: Optional[str] = None) -> str:
+    if not pot or pot == DEFAULT_POT:
+        return DATA_DIR
+    return os.path.join(POTS_DIR, pot_slug(pot))
+
+def pot_owner(pot: Optional[str]) -> Optional[str]:
+    """The indexed pot, other than `pot`, whose directory `pot` maps to ("Road Trip", "Road_Trip" and
+    "Road/Trip" share a slug), or None if the name is free."""
+    d, name = pot_dir(pot), pot or DEFAULT_POT
+    return next((other for other in list_pots() if other != name and pot_dir(other) == d), None)
+
+def pot_path(pot: Optional[str], name: str) -> str:
+    """Path of a ledger file ("ledger.csv", "ledger.col", "ledger.verified.json", ...) for a pot."""
+    return os.path.join(pot_dir(pot), name)
+
+def pot_exists(pot: Optional[str] = None) -> bool:
+    """True if the pot has a live ledger in any format (checked without creating its directory)."""
+    return any(os.path.exists(pot_path(pot, name)) for name, _ in BACKENDS.values())
+
+_ledgers: Dict[Tuple[str, str], LedgerBackend] = {}
+_ledgers_lock = threading.Lock()
+
+def open_ledger(pot: Optional[str] = None, fmt: Optional[str] = None) -> LedgerBackend:
+    """The pot's live ledger in `fmt` (default LEDGER_FORMAT). One handle per file per process."""
+    fmt = fmt or LEDGER_FORMAT
+    if fmt not in BACKENDS:
+        raise ValueError(f"LEDGER_FORMAT must be one of {sorted(BACKENDS)}, not {fmt!r}")
+    name, cls = BACKENDS[fmt]
+    ensure_data_dir(pot)
+    path = pot_path(pot, name)
+    with _ledgers_lock:
+        led = _ledgers.get((fmt, path))
+        if led is None:
+            led = _ledgers[(fmt, path)] = cls(path)
+        return led
+
+@timed("storage.save_chain")
+def save_chain(rows: List[Dict[str, Any]], pot: Optional[str] = None, reindex: bool = True):
+    """Full rewrite (genesis / reset / archiving). Swapped in whole, so a crash never truncates the ledger.
+    Creating a pot whose name maps onto another pot's directory raises ValueError."""
+    if (pot or DEFAULT_POT) not in list_pots():
+        owner = pot_owner(pot)
+        if owner is not None:
+            raise ValueError(f"pot name {pot!r} clashes with existing pot {owner!r}")
+    open_ledger(pot).rewrite(rows)
+    if reindex:
+        _index_rewrite(pot, rows)
+
+@timed("storage.append_blocks")
+def append_blocks(rows: List[Dict[str, Any]], pot: Optional[str] = None, index: bool = True):
+    """Append-only mode: write just the new blocks with a single fsync / commit. O(len(rows)), not O(ledger).
+    The blocks are durable once this returns; with index=False the caller updates the pot index itself.
+    Callers hold committer.pot_lock (commit_block / commit_blocks do), as appending may cut a torn CSV tail."""
+    if not rows:
+        return
+    open_ledger(pot).append(rows)
+    if index:
+        index_appended(rows, pot)
+
+def index_appended(rows: List[Dict[str, Any]], pot: Optional[str] = None):
+    """Best-effort pot index update for blocks already on disk. A failure is logged, not raised: the next
+    append notices the entry no longer ends where the ledger did and rebuilds it."""
+    if not rows:
+        return
+    try:
+        _index_append(pot, rows)
+    except Exception:
+        log.warning("pot index update for %r failed; it is rebuilt on the next append", pot or DEFAULT_POT,
+                    exc_info=True)
+
+def append_block(row: Dict[str, Any], pot: Optional[str] = None):
+    append_blocks([row], pot)
+
+@timed("storage.load_chain")
+def load_chain(pot: Optional[str] = None) -> List[Dict[str, Any]]:
+    return open_ledger(pot).load()
+
+@timed("storage.load_store")
+def load_store(pot: Optional[str] = None):
+    """The live ledger as a compact blockstore.BlockStore, streamed in from the backend: no list of row
+    dicts is built, so peak memory is the store itself (the columnar format also skips pandas and CSV parsing)."""
+    from blockstore import BlockStore
+    return BlockStore.from_rows(open_ledger(pot).rows())
+
+# ---------- Tail / range reads (no full load) ----------
+@timed("storage.load_tail")
+def load_tail(pot: Optional[str] = None, n: int = 1) -> List[Dict[str, Any]]:
+    """Last `n` blocks (a torn trailing CSV record is ignored)."""
+    return open_ledger(pot).tail(n)
+
+def count_blocks(pot: Optional[str] = None) -> int:
+    """Blocks in the live ledger (archived ones not included)."""
+    return open_ledger(pot).count()
+
+def iter_rows(pot: Optional[str] = None, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Stream rows with start <= index < stop without loading the ledger (no pandas, one row at a time).
+    Archived segments come first, so this is always the full history."""
+    segments = load_archive_manifest(pot)
+    done = segments[-1]["last"] if segments else -1
+    if start <= done:
+        for row in iter_archive(pot, start):
+            if stop is not None and row["index"] >= stop:
+                return
+            yield row
+    start = max(start, done + 1)
+    if stop is None or start < stop:
+        yield from open_ledger(pot).rows(start, stop)
+
+# ---------- Archive segments (old blocks moved out of the live ledger, see snapshots.py) ----------
+def archive_dir(pot: Optional[str] = None) -> str:
+    return pot_path(pot, "ledger.archive")
 
-def ensure_data_dir():
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR, exist_ok=True)
+def load_archive_manifest(pot: Optional[str] = None) -> List[Dict[str, Any]]:
+    """[{"file", "first", "last", "first_prev_hash", "last_hash", "sha256"}, ...] oldest first."""
+    return (_load_json(os.path.join(archive_dir(pot), "manifest.json")) or {}).get("segments", [])
 
-def save_chain(rows: List[Dict[str, Any]]):
-    ensure_data_dir()
-    pd.DataFrame(rows).to_csv(CSV_PATH, index=False)
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-def load_chain() -> List[Dict[str, Any]]:
-    ensure_data_dir()
-    if not os.path.exists(CSV_PATH):
+def write_segment(rows: List[Dict[str, Any]], pot: Optional[str] = None) -> Dict[str, Any]:
+    """Write rows as a gzip'd CSV segment and record it in the manifest (durably, before the live ledger drops them)."""
+    d = archive_dir(pot)
+    os.makedirs(d, exist_ok=True)
+    name = f"{rows[0]['index']:012d}-{rows[-1]['index']:012d}.csv.gz"
+    path = os.path.join(d, name)
+    with open(path + ".tmp", "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+            text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+            writer = csv.writer(text, lineterminator="\n")
+            writer.writerow(COLUMNS)
+            for r in rows:
+                writer.writerow([r[c] for c in COLUMNS])
+            text.flush()
+            text.detach()
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(path + ".tmp", path)
+    seg = {"file": name, "first": int(rows[0]["index"]), "last": int(rows[-1]["index"]),
+           "first_prev_hash": str(rows[0]["prev_hash"]), "last_hash": rows[-1]["hash"], "sha256": _file_sha256(path)}
+    _save_json(os.path.join(d, "manifest.json"), {"segments": load_archive_manifest(pot) + [seg]})
+    return seg
+
+def iter_archive(pot: Optional[str] = None, start: int = 0, check: bool = False) -> Iterator[Dict[str, Any]]:
+    """Archived rows with index >= `start`. With `check`, a segment whose file digest changed raises ValueError."""
+    for seg in load_archive_manifest(pot):
+        if seg["last"] < start:
+            continue
+        path = os.path.join(archive_dir(pot), seg["file"])
+        if check and _file_sha256(path) != seg["sha256"]:
+            raise ValueError(f"archive segment {seg['file']} does not match its digest")
+        with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+            yield from read_records(f, start)
+
+# ---------- Snapshots (state at block N; contents built in snapshots.py) ----------
+def snapshot_dir(pot: Optional[str] = None) -> str:
+    return pot_path(pot, "ledger.snapshots")
+
+def list_snapshots(pot: Optional[str] = None) -> List[int]:
+    d = snapshot_dir(pot)
+    if not os.path.isdir(d):
         return []
-    df = pd.read_csv(CSV_PATH)
-    # types
-    if "index" in df: df["index"] = df["index"].astype(int)
-    if "timestamp" in df: df["timestamp"] = df["timestamp"].astype(float)
-    if "amount" in df: df["amount"] = df["amount"].astype(float)
-    for col in ["actor","action","note","prev_hash","wallet_address","signed_message","signature","hash"]:
-        if col in df: df[col] = df[col].fillna("").astype(str)
-    return df.to_dict(orient="records")
+    return sorted(int(f[:-5]) for f in os.listdir(d) if f.endswith(".json") and f[:-5].isdigit())
+
+def load_snapshot(index: int, pot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return _load_json(os.path.join(snapshot_dir(pot), f"{index:012d}.json"))
+
+def save_snapshot(snap: Dict[str, Any], pot: Optional[str] = None):
+    _save_json(os.path.join(snapshot_dir(pot), f"{snap['index']:012d}.json"), snap)
+
+def delete_snapshot(index: int, pot: Optional[str] = None):
+    _save_json(os.path.join(snapshot_dir(pot), f"{index:012d}.json"), None)
+
+def drop_history(pot: Optional[str] = None):
+    """Remove a pot's snapshots and archive segments (reset)."""
+    shutil.rmtree(snapshot_dir(pot), ignore_errors=True)
+    shutil.rmtree(archive_dir(pot), ignore_errors=True)
+
+# ---------- Sidecar state (small JSON files next to the ledger) ----------
+def _load_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_json(path: str, obj: Optional[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if obj is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    # a unique temp file per writer: concurrent saves of the same sidecar never share (or rename away) a .tmp
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def load_checkpoint(pot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    cp = _load_json(pot_path(pot, "ledger.verified.json"))
+    return cp if cp and "index" in cp and "hash" in cp else None
+
+def save_checkpoint(cp: Optional[Dict[str, Any]], pot: Optional[str] = None):
+    _save_json(pot_path(pot, "ledger.verified.json"), {"index": int(cp["index"]), "hash": cp["hash"]} if cp else None)
+
+def load_aggregates(pot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return _load_json(pot_path(pot, "ledger.aggregates.json"))
+
+def save_aggregates(agg: Optional[Dict[str, Any]], pot: Optional[str] = None):
+    _save_json(pot_path(pot, "ledger.aggregates.json"), agg)
+
+def load_rollups(pot: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return _load_json(pot_path(pot, "ledger.rollups.json"))
+
+def save_rollups(r: Optional[Dict[str, Any]], pot: Optional[str] = None):
+    _save_json(pot_path(pot, "ledger.rollups.json"), r)
+
+
+# ---------- Pot index (tip + balance per pot, so listing pots never opens a ledger) ----------
+def _signed(row: Dict[str, Any]) -> float:
+    amt = float(row.get("amount", 0.0) or 0.0)
+    return amt if row.get("action") == "DEPOSIT" else (-amt if row.get("action") == "WITHDRAW" else 0.0)
+
+_pot_index_lock = threading.Lock()
+
+@contextmanager
+def _locked_pot_index():
+    """Serialize read-modify-write of data/pots.json across threads and processes (every pot shares it)."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with _pot_index_lock, open(POT_INDEX_PATH + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)   # released when the file closes
+        yield
+
+def _index_write(pot: Optional[str], rows: List[Dict[str, Any]], reset: bool):
+    name = pot or DEFAULT_POT
+    with _locked_pot_index():
+        idx = _load_json(POT_INDEX_PATH) or {}
+        if not reset and (name not in idx or idx[name].get("tip_hash") != str(rows[0].get("prev_hash", ""))):
+            # first write since the index existed, or an earlier update was missed: (re)build this pot's
+            # entry from its ledger (rows already on disk)
+            rows, reset = list(iter_rows(pot)), True
+        entry = {"count": 0, "tip_hash": "", "balance": 0.0} if reset else idx[name]
+        for r in rows:
+            entry["count"] += 1
+            entry["tip_hash"] = str(r.get("hash", ""))
+            entry["balance"] = round(entry["balance"] + _signed(r), 2)
+        idx[name] = entry
+        _save_json(POT_INDEX_PATH, idx)
+
+def _index_append(pot: Optional[str], rows: List[Dict[str, Any]]):
+    _index_write(pot, rows, reset=False)
+
+def _index_rewrite(pot: Optional[str], rows: List[Dict[str, Any]]):
+    _index_write(pot, rows, reset=True)
+
+@timed("storage.list_pots")
+def list_pots() -> Dict[str, Dict[str, Any]]:
+    """{pot name: {"count", "tip_hash", "balance"}} straight from data/pots.json."""
+    idx = _load_json(POT_INDEX_PATH) or {}
+    if DEFAULT_POT not in idx and any(os.path.exists(pot_path(None, name)) for name, _ in BACKENDS.values()):
+        # legacy single-ledger install: index it once
+        _index_rewrite(DEFAULT_POT, list(iter_rows(DEFAULT_POT)))
+        idx = _load_json(POT_INDEX_PATH) or {}
+    return idx
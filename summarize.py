@@ -1,36 +1,42 @@
 # summarize.py
-from typing import List, Dict, Any
-from collections import defaultdict
-import os
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+import os, threading, time
 
-from dotenv import load_dotenv
-load_dotenv()
+from aggregates import Aggregates
+from metrics import timed, count
 
-# Env flags/keys
-USE_AI_STUDIO = os.getenv("USE_AI_STUDIO", "0") == "1"
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
-ENV_MODEL = os.getenv("GEMINI_MODEL", "").strip()  # optional override, e.g. "gemini-2.5-flash"
+MODEL_CACHE_TTL = 3600.0   # list_models() result reused for an hour
+_env_loaded = False
+
+
+# Env flags/keys: USE_AI_STUDIO, GOOGLE_API_KEY, GEMINI_MODEL (optional override, e.g. "gemini-2.5-flash"),
+# AI_TIMEOUT (seconds before a coach call is abandoned), AI_CACHE_TTL (seconds an AI summary stays fresh)
+def _env(name: str, default: str = "") -> str:
+    # .env is read on first use, so the local summary never pays for python-dotenv
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+    return os.getenv(name, default)
 
 
 # ---------- Local (fallback) summary ----------
-def local_summary(rows: List[Dict[str, Any]], goal: float, currency_sym: str = "$") -> str:
-    """Deterministic, no-network summary so your demo never breaks."""
-    if not rows or len(rows) == 1:
+@timed("summarize.local_summary")
+def local_summary(rows: List[Dict[str, Any]], goal: float, currency_sym: str = "$",
+                  agg: Optional[Aggregates] = None) -> str:
+    """Deterministic, no-network summary so your demo never breaks.
+    Pass the app's running `agg` to skip re-scanning `rows`."""
+    if agg is None:
+        agg = Aggregates.from_rows(rows or [])
+    if agg.count <= 1:
         return "No activity yet. Invite friends and start saving!"
 
-    txs = [r for r in rows if r.get("action") in ("DEPOSIT", "WITHDRAW")]
-    total_in = sum(float(r.get("amount", 0.0)) for r in txs if r.get("action") == "DEPOSIT")
-    total_out = sum(float(r.get("amount", 0.0)) for r in txs if r.get("action") == "WITHDRAW")
-    net = round(total_in - total_out, 2)
+    net = agg.net
     progress = 0.0 if goal <= 0 else min(100.0, round(100.0 * net / goal, 1))
-
-    contrib = defaultdict(float)
-    for r in txs:
-        amt = float(r.get("amount", 0.0))
-        if r.get("action") == "DEPOSIT":
-            contrib[r.get("actor", "Unknown")] += amt
-        elif r.get("action") == "WITHDRAW":
-            contrib[r.get("actor", "Unknown")] -= amt
+    contrib = agg.by_actor
 
     top_str = "No contributors yet."
     if contrib:
@@ -48,8 +54,9 @@ def local_summary(rows: List[Dict[str, Any]], goal: float, currency_sym: str = "
 # ---------- Optional Google AI Studio (Gemini) summary ----------
 def _pick_model(genai) -> str:
     """Choose a working model id. Prefers env override; otherwise finds a supported one."""
-    if ENV_MODEL:
-        return ENV_MODEL  # e.g., "gemini-2.5-flash"
+    env_model = _env("GEMINI_MODEL").strip()
+    if env_model:
+        return env_model  # e.g., "gemini-2.5-flash"
     try:
         models = genai.list_models()
         # Keep short names if either "models/<id>" or "<id>" appears
@@ -68,21 +75,35 @@ def _pick_model(genai) -> str:
     return "gemini-2.5-flash"
 
 
-def ai_studio_summary(rows: List[Dict[str, Any]], goal: float, currency_sym: str = "$") -> str:
-    """Summarize using Google AI Studio (Gemini). Falls back to local_summary on any error."""
-    if not USE_AI_STUDIO or not GOOGLE_API_KEY:
-        return local_summary(rows, goal, currency_sym)
-    try:
-        import google.generativeai as genai
-        genai.configure(api_key=GOOGLE_API_KEY)
+# configure() and list_models() are per-process work, not per-rerun work
+_setup_lock = threading.Lock()
+_configured = {}    # id(genai) -> api key it was configured with
+_model_choice = {}  # id(genai) -> (model id, expires at)
+
 
+def _ready_model_id(genai) -> str:
+    with _setup_lock:
+        key, api_key = id(genai), _env("GOOGLE_API_KEY")
+        if _configured.get(key) != api_key:
+            genai.configure(api_key=api_key)
+            _configured[key] = api_key
+            _model_choice.pop(key, None)
+        cached = _model_choice.get(key)
+        if cached and cached[1] > time.time():
+            return cached[0]
         model_id = _pick_model(genai)
-        txs = [r for r in rows if r.get("action") in ("DEPOSIT", "WITHDRAW")]
-        text_rows = "\n".join(
-            f"{r.get('actor','?')} | {r.get('action','?')} | {r.get('amount',0)} | {r.get('note','')}"
-            for r in txs[-80:]  # last 80 entries is plenty
-        )
-        prompt = f"""You are a friendly finance coach
+        _model_choice[key] = (model_id, time.time() + MODEL_CACHE_TTL)
+        return model_id
+
+
+def _generate(genai, rows: List[Dict[str, Any]], goal: float, currency_sym: str, timeout: float) -> str:
+    model_id = _ready_model_id(genai)
+    txs = [r for r in rows if r.get("action") in ("DEPOSIT", "WITHDRAW")]
+    text_rows = "\n".join(
+        f"{r.get('actor','?')} | {r.get('action','?')} | {r.get('amount',0)} | {r.get('note','')}"
+        for r in txs[-80:]  # last 80 entries is plenty
+    )
+    prompt = f"""You are a friendly finance coach
 Summarize this shared savings pot in ONE short paragraph.
 Be fun and make it engaging!
 Include: net saved, progress vs goal, top contributor, and ONE actionable next step.
@@ -92,9 +113,111 @@ Goal: {goal}
 Rows: actor | action | amount | note
 {text_rows}
 """
-        model = genai.GenerativeModel(model_id)
-        resp = model.generate_content(prompt)
-        out = (getattr(resp, "text", "") or "").strip()
-        return out[:600] if out else local_summary(rows, goal, currency_sym)
+    model = genai.GenerativeModel(model_id)
+    resp = model.generate_content(prompt, request_options={"timeout": timeout})
+    return (getattr(resp, "text", "") or "").strip()[:600]
+
+
+def _ai_enabled(genai) -> bool:
+    # an injected client (e.g. a local stub) bypasses the env switches
+    return genai is not None or (_env("USE_AI_STUDIO", "0") == "1" and bool(_env("GOOGLE_API_KEY")))
+
+
+def _import_genai():
+    import google.generativeai as genai
+    return genai
+
+
+@timed("summarize.ai_studio_summary")
+def ai_studio_summary(rows: List[Dict[str, Any]], goal: float, currency_sym: str = "$",
+                      agg: Optional[Aggregates] = None, genai=None) -> str:
+    """Summarize using Google AI Studio (Gemini). Falls back to local_summary on any error. Blocks on the call."""
+    if not _ai_enabled(genai):
+        return local_summary(rows, goal, currency_sym, agg)
+    try:
+        out = _generate(genai or _import_genai(), rows, goal, currency_sym, float(_env("AI_TIMEOUT", "20")))
+        return out if out else local_summary(rows, goal, currency_sym, agg)
+    except Exception:
+        return local_summary(rows, goal, currency_sym, agg)
+
+
+# ---------- Cached, non-blocking coach ----------
+class SummaryCache:
+    """Small LRU with per-entry TTL."""
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._data: "OrderedDict[Any, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[0] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def put(self, key, value: str, ttl: Optional[float] = None):
+        with self._lock:
+            if ttl is None:
+                ttl = float(_env("AI_CACHE_TTL", "900")) if self.ttl is None else self.ttl
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_summary_cache = SummaryCache()
+_inflight: Dict[Any, Tuple[Future, float]] = {}
+_inflight_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="coach")
+
+
+@timed("summarize.coach_summary")
+def coach_summary(rows: List[Dict[str, Any]], goal: float, currency_sym: str, tip_hash: str,
+                  agg: Optional[Aggregates] = None, genai=None, timeout: Optional[float] = None) -> Tuple[str, bool]:
+    """AI summary for (tip_hash, goal, currency) if it's ready, else local_summary while it generates.
+
+    Never waits on the network. Returns (text, pending) — pending means an AI result is still on its way.
+    """
+    if not _ai_enabled(genai):
+        return local_summary(rows, goal, currency_sym, agg), False
+    key = (tip_hash, float(goal), currency_sym)
+    timeout = float(_env("AI_TIMEOUT", "20")) if timeout is None else timeout
+    cached = _summary_cache.get(key)
+    count("coach_cache_hit" if cached is not None else "coach_cache_miss")
+    if cached is not None:
+        return cached, False
+
+    fallback = local_summary(rows, goal, currency_sym, agg)
+    with _inflight_lock:
+        job = _inflight.get(key)
+        if job is None:
+            client = genai or _import_genai()
+            fut = _executor.submit(_generate, client, list(rows), goal, currency_sym, timeout)
+            _inflight[key] = job = (fut, time.time())
+        fut, started = job
+        if not fut.done():
+            if time.time() - started <= timeout:
+                return fallback, True
+            # abandoned: serve the local summary for a while instead of retrying every rerun
+            del _inflight[key]
+            _summary_cache.put(key, fallback, ttl=60)
+            return fallback, False
+        del _inflight[key]
+    try:
+        out = fut.result() or fallback
     except Exception:
-        return local_summary(rows, goal, currency_sym)
+        out, ttl = fallback, 60   # failed call: retry in a minute, not on every rerun
+    else:
+        ttl = None
+    _summary_cache.put(key, out, ttl=ttl)
+    return out, False
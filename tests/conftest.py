@@ -0,0 +1,15 @@
+# the modules live at the repository root and keep their data under a relative data/ directory
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test in an empty directory, so data/ (ledgers, pots.json, sidecars) starts fresh."""
+    import storage
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "_ledgers", {})   # cached handles (SQLite connections, memmaps) of other tests
+    return tmp_path
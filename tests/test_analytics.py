@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+from analytics import Rollups, actor_cumulative, balance_series, project_goal
+from bench import synthetic_ledger
+from blockstore import BlockStore
+from chain import make_block, make_genesis
+
+DAY = 86400
+T0 = 1_700_006_400.0   # 2023-11-15 00:00 UTC
+
+
+def ledger(*entries):
+    """entries: (day offset, actor, action, amount)."""
+    blocks = [make_genesis()]
+    for day, actor, action, amount in entries:
+        blocks.append(make_block(blocks[-1], actor, action, amount, "", "", "", "", timestamp=T0 + day * DAY + 60))
+    return blocks
+
+
+def rollups(blocks):
+    r = Rollups()
+    r.sync(blocks)
+    return r
+
+
+def test_rollups_sum_per_day_and_actor():
+    r = rollups(ledger((0, "Alice", "DEPOSIT", 10.0), (0, "Bob", "DEPOSIT", 2.5), (2, "Alice", "WITHDRAW", 4.0)))
+    day0 = int(T0 // DAY)
+    assert r.days == {day0: [1250, 0], day0 + 2: [0, 400]}
+    assert r.actor_days == {"Alice": {day0: 1000, day0 + 2: -400}, "Bob": {day0: 250}}
+
+
+@pytest.mark.parametrize("wrap", [list, BlockStore.from_blocks])
+def test_incremental_sync_matches_a_rebuild(wrap):
+    blocks = synthetic_ledger(300, actors=6)
+    r = Rollups()
+    for stop in (1, 50, 51, 200, 300):
+        r.sync(wrap(blocks[:stop]))
+    assert r == rollups(blocks)
+    assert Rollups.from_dict(r.to_dict()) == r
+    assert not r.sync(wrap(blocks))
+    other = synthetic_ledger(20, seed=3)
+    assert r.sync(wrap(other)) and r == rollups(other)   # history replaced: rebuilt
+    with pytest.raises(ValueError):
+        Rollups().sync(wrap(blocks[100:]))
+
+
+def test_balance_series_fills_every_day():
+    r = rollups(ledger((0, "Alice", "DEPOSIT", 10.0), (3, "Bob", "DEPOSIT", 5.0), (3, "Alice", "WITHDRAW", 1.0)))
+    s = balance_series(r)
+    assert list(s["net"]) == [10.0, 0.0, 0.0, 4.0] and list(s["balance"]) == [10.0, 10.0, 10.0, 14.0]
+    assert s["date"].iloc[0] == pd.Timestamp("2023-11-15")
+    weekly = balance_series(r, "W")
+    assert weekly["balance"].iloc[-1] == 14.0 and weekly["deposits"].sum() == 15.0
+    assert balance_series(Rollups()).empty
+
+
+def test_actor_cumulative_groups_small_actors():
+    entries = [(i, f"a{i}", "DEPOSIT", 10.0 * (i + 1)) for i in range(5)]
+    cum = actor_cumulative(rollups(ledger(*entries)), top=2)
+    last = cum[cum["date"] == cum["date"].max()].set_index("actor")["cumulative"]
+    assert last.to_dict() == {"a4": 50.0, "a3": 40.0, "others": 60.0}
+
+
+def test_projection_uses_the_window_up_to_today():
+    daily = balance_series(rollups(ledger(*[(d, "Alice", "DEPOSIT", 10.0) for d in range(10)])))
+    today = pd.Timestamp("2023-11-24")   # last activity day
+    proj = project_goal(daily, 200.0, 10, today=today)
+    assert proj["per_day"] == 10.0 and proj["date"] == today + pd.Timedelta(days=10)
+    # the same history a month later: the last 10 days saved nothing
+    assert project_goal(daily, 200.0, 10, today=today + pd.Timedelta(days=30)) == \
+        {"reached": False, "date": None, "per_day": 0.0}
+    later = project_goal(daily, 200.0, 20, today=today + pd.Timedelta(days=10))
+    assert later["per_day"] == 5.0 and later["date"] == today + pd.Timedelta(days=30)
+    whole = project_goal(daily, 200.0, None, today=today + pd.Timedelta(days=10))
+    assert whole["per_day"] == 5.0
+
+
+def test_reached_is_about_the_current_balance():
+    up = balance_series(rollups(ledger((0, "Alice", "DEPOSIT", 60.0), (1, "Bob", "DEPOSIT", 50.0))))
+    assert project_goal(up, 100.0) == {"reached": True, "date": pd.Timestamp("2023-11-16"), "per_day": None}
+    # hit the goal, then spent some: not reached any more
+    down = balance_series(rollups(ledger((0, "Alice", "DEPOSIT", 120.0), (1, "Bob", "WITHDRAW", 50.0))))
+    proj = project_goal(down, 100.0, 28, today=pd.Timestamp("2023-11-16"))
+    assert not proj["reached"] and proj["per_day"] == pytest.approx(70.0 / 28)
+    assert project_goal(down, 0.0)["reached"] is False and project_goal(balance_series(Rollups()), 50.0)["date"] is None
@@ -0,0 +1,136 @@
+import json, math, os, threading, time
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import api
+import storage
+from chain import block_dict, make_genesis
+
+
+@pytest.fixture
+def pot(workdir):
+    storage.save_chain([block_dict(make_genesis())])
+    return storage.DEFAULT_POT
+
+
+@pytest.fixture
+def server(pot):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), api.Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def call(base, path, body=None):
+    data = None if body is None else (body if isinstance(body, bytes) else json.dumps(body).encode())
+    try:
+        with urlopen(Request(base + path, data=data, method="GET" if data is None else "POST")) as r:
+            return r.status, json.loads(r.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def deposit(**kw):
+    return {"actor": "Alice", "action": "DEPOSIT", "amount": 10, **kw}
+
+
+def test_batch_is_committed_in_order(pot):
+    res = api.ingest(pot, {"transactions": [deposit(), deposit(amount=2.5, note="x")]})
+    assert res["committed"] == 2 and res["first_index"] == 1
+    rows = storage.load_chain(pot)
+    assert [r["amount"] for r in rows[1:]] == [10.0, 2.5]
+    assert storage.list_pots()[pot]["balance"] == 12.5
+
+
+def test_signed_batch_verifies_and_a_forged_one_does_not(pot):
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    acct = Account.from_key(b"\x01" * 32)
+
+    def sign(msg):
+        return acct.address, "0x" + acct.sign_message(encode_defunct(text=msg)).signature.hex().removeprefix("0x")
+
+    tip = storage.load_tail(pot)[0]
+    entries = [deposit(ts=int(time.time())), deposit(ts=int(time.time()))]
+    blocks = api.build_blocks(pot, api.Block(**tip), entries, sign=sign)
+    signed = [dict(e, wallet_address=b.wallet_address, signature=b.signature) for e, b in zip(entries, blocks)]
+    forged = [dict(e) for e in signed]
+    forged[1]["amount"] = 1000
+    with pytest.raises(api.BatchError) as err:
+        api.ingest(pot, {"base_hash": tip["hash"], "transactions": forged})
+    assert err.value.status == 400 and [e["i"] for e in err.value.errors] == [1]
+    assert api.ingest(pot, {"base_hash": tip["hash"], "transactions": signed})["tip"]["hash"] == blocks[-1].hash
+
+
+@pytest.mark.parametrize("entry", [
+    deposit(amount="NaN"), deposit(amount=math.inf), deposit(amount=-5), deposit(amount=0.001),
+    deposit(amount=1e300), deposit(amount=True), deposit(amount="ten"), deposit(action="STEAL"),
+    deposit(ts="nan"), deposit(ts=1e300), deposit(ts=time.time() + 86400), deposit(ts=-1),
+    deposit(wallet_address="0xabc"), "not an object",
+    deposit(note=5), deposit(actor=["Alice"]), deposit(wallet_address=1, signature="0x00"), deposit(note={"a": 1}),
+])
+def test_bad_entries_are_rejected(pot, entry):
+    with pytest.raises(api.BatchError) as err:
+        api.ingest(pot, {"transactions": [entry]})
+    assert err.value.status == 400 and err.value.errors[0]["i"] == 0
+    assert storage.count_blocks(pot) == 1
+
+
+def test_timestamps_may_not_run_backwards(pot):
+    api.ingest(pot, {"transactions": [deposit(ts=2_000_000)]})
+    with pytest.raises(api.BatchError) as err:
+        api.ingest(pot, {"transactions": [deposit(ts=1_000_000)]})
+    assert err.value.errors[0]["i"] == 0
+    with pytest.raises(api.BatchError) as err:
+        api.ingest(pot, {"transactions": [deposit(ts=3_000_000), deposit(ts=2_500_000)]})
+    assert err.value.errors[0]["i"] == 1
+    assert storage.count_blocks(pot) == 2
+
+
+def test_batch_shape_and_tip_checks(pot):
+    for body, status in [({}, 400), ({"transactions": []}, 400),
+                         ({"transactions": [deposit()] * (api.MAX_BATCH + 1)}, 413),
+                         ({"base_hash": "0" * 64, "transactions": [deposit()]}, 409)]:
+        with pytest.raises(api.BatchError) as err:
+            api.ingest(pot, body)
+        assert err.value.status == status
+
+
+def test_concurrent_unsigned_batches_all_land(pot):
+    errors = []
+
+    def submit(n):
+        try:
+            for _ in range(5):
+                api.ingest(pot, {"transactions": [deposit(note=f"w{n}"), deposit(note=f"w{n}")]})
+        except api.BatchError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=submit, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []   # built on the tip under the writer lock: no 409s
+    rows = storage.load_chain(pot)
+    assert len(rows) == 1 + 8 * 5 * 2
+    assert all(a["hash"] == b["prev_hash"] for a, b in zip(rows, rows[1:]))
+    notes = [r["note"] for r in rows[1:]]
+    assert all(notes[i] == notes[i + 1] for i in range(0, len(notes), 2))   # a batch is never split
+
+
+def test_http_errors(server, monkeypatch):
+    assert call(server, "/pots/SpringBreakFund/tip")[0] == 200
+    assert call(server, "/pots/Nope/tip") == (404, {"error": "unknown pot"})
+    assert call(server, "/pots/Nope/transactions", {"transactions": [deposit()]})[0] == 404
+    assert not os.path.exists(storage.pot_dir("Nope"))   # a lookup never creates a pot
+    assert call(server, "/pots/SpringBreakFund/transactions", b"{not json")[0] == 400
+    assert call(server, "/pots/SpringBreakFund/transactions", [1, 2])[0] == 400
+    status, res = call(server, "/pots/SpringBreakFund/transactions", {"transactions": [deposit(note={"a": 1})]})
+    assert status == 400 and res["errors"] == [{"i": 0, "error": "note must be a string"}]
+    monkeypatch.setattr(storage, "load_tail", lambda *a, **k: 1 / 0)
+    assert call(server, "/pots/SpringBreakFund/tip") == (500, {"error": "internal error"})
+    assert call(server, "/pots/SpringBreakFund/transactions", {"transactions": [deposit()]})[0] == 500
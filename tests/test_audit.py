@@ -0,0 +1,97 @@
+import dataclasses
+
+import pytest
+
+from audit import audit_signatures, verify_chain
+from bench import BENCH_POT, synthetic_ledger
+from blockstore import BlockStore
+from chain import _hash_block, _payload, to_dicts
+from sigcache import SignatureCache
+
+
+@pytest.fixture(scope="module")
+def signed_rows():
+    return to_dicts(synthetic_ledger(25, actors=4, signed=1.0))
+
+
+def test_clean_signed_ledger_has_no_problems(signed_rows):
+    assert audit_signatures(signed_rows, pot_name=BENCH_POT, workers=1, cache=SignatureCache("")) == []
+
+
+def test_tampering_is_reported_by_block_index(signed_rows):
+    rows = [dict(r) for r in signed_rows]
+    rows[5]["signature"] = rows[9]["signature"]          # someone else's signature
+    rows[12]["amount"] = rows[12]["amount"] + 1           # fields no longer match what was signed
+    rows[20]["wallet_address"] = "0x" + "1" * 40                # claimed by a wallet that did not sign
+    problems = audit_signatures(rows, pot_name=BENCH_POT, workers=1, cache=SignatureCache(""))
+    assert [p["index"] for p in problems] == [5, 12, 20]
+    assert "does not match block fields" in problems[1]["problem"]
+
+
+def test_messages_must_name_the_audited_pot(signed_rows):
+    signed = [r["index"] for r in signed_rows if r["signature"]]
+    # signed for BENCH_POT: audited as the default pot (None) or another pot, none of them match
+    for pot in (None, "OtherPot"):
+        problems = audit_signatures(signed_rows, pot_name=pot, workers=1, cache=SignatureCache(""))
+        assert [p["index"] for p in problems] == signed
+        assert all("does not match block fields" in p["problem"] for p in problems)
+
+
+def test_pool_and_cache_give_the_same_answer(signed_rows):
+    rows = [dict(r) for r in signed_rows]
+    rows[7]["signature"] = rows[8]["signature"]
+    cache = SignatureCache("")
+    pooled = audit_signatures(rows, pot_name=BENCH_POT, workers=2, chunk_size=4, cache=cache)
+    cached = audit_signatures(rows, pot_name=BENCH_POT, workers=1, cache=cache)   # all signers known now
+    assert [p["index"] for p in pooled] == [p["index"] for p in cached] == [7]
+
+
+# ---------- full chain re-hash ----------
+def edited(b, **changes):
+    """`b` with fields changed and its hash recomputed (a consistent forgery of just that block)."""
+    b = dataclasses.replace(b, **changes)
+    return dataclasses.replace(b, hash=_hash_block(_payload(b)))
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    return synthetic_ledger(95)
+
+
+@pytest.mark.parametrize("as_store", [False, True])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_valid_chain_verifies(ledger, as_store, workers):
+    chain = BlockStore.from_blocks(ledger) if as_store else ledger
+    assert verify_chain(chain, workers=workers, segment_size=10) is None
+
+
+@pytest.mark.parametrize("as_store", [False, True])
+@pytest.mark.parametrize("bad", [1, 9, 10, 11, 47, 94])   # around and inside segment boundaries
+def test_first_bad_block_is_reported(ledger, as_store, bad):
+    chain = list(ledger)
+    for i in {bad, len(chain) - 1}:   # a second bad block further on must not be the one reported
+        chain[i] = dataclasses.replace(chain[i], amount=chain[i].amount + 1)   # hash no longer matches
+    chain = BlockStore.from_blocks(chain) if as_store else chain
+    problem = verify_chain(chain, workers=2, segment_size=10)
+    assert problem == {"index": bad, "problem": "hash does not match block contents"}
+
+
+@pytest.mark.parametrize("bad", [5, 30, 31])
+def test_broken_link_is_reported_at_the_block_that_breaks_it(ledger, bad):
+    chain = list(ledger)
+    chain[bad] = edited(chain[bad], prev_hash="f" * 64)   # self-consistent, but linked to nothing
+    problem = verify_chain(chain, workers=2, segment_size=10)
+    assert problem == {"index": bad, "problem": "prev_hash does not link to the previous block"}
+
+
+def test_archived_chain_needs_its_anchor(ledger):
+    tail = ledger[40:]
+    assert verify_chain(tail, segment_size=10)["index"] == 40
+    anchor = {"index": 39, "hash": ledger[39].hash}
+    assert verify_chain(tail, anchor=anchor, workers=1, segment_size=10) is None
+    assert verify_chain(tail, anchor={"index": 39, "hash": ledger[38].hash}, segment_size=10)["index"] == 40
+
+
+def test_degenerate_chains(ledger):
+    assert verify_chain([])["problem"] == "empty ledger"
+    assert verify_chain([dataclasses.replace(ledger[1], index=0)])["problem"] == "first block is not GENESIS"
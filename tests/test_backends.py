@@ -0,0 +1,143 @@
+import itertools
+import os
+
+import pytest
+
+import migrate
+import storage
+from backends import BACKENDS, repair_tail
+from bench import synthetic_ledger
+from chain import from_dicts, make_block, to_dicts, validate_chain
+
+
+@pytest.fixture(scope="module")
+def rows():
+    blocks = synthetic_ledger(40, actors=3, signed=0.1)
+    tip = blocks[-1]
+    for note in ['two\nlines and "quotes"', "ünïcödé, commas", ""]:   # what CSV quoting has to survive
+        tip = make_block(tip, "Zoë", "DEPOSIT", 0.1 + 0.2, note, "", "", "")
+        blocks.append(tip)
+    return to_dicts(blocks)
+
+
+@pytest.mark.parametrize("fmt", sorted(BACKENDS))
+def test_backend_round_trip(workdir, rows, fmt):
+    led = storage.open_ledger(None, fmt)
+    assert not led.exists() and led.tail() == [] and led.count() == 0
+    led.rewrite(rows[:10])
+    led.append(rows[10:30])
+    led.append(rows[30:])
+    assert led.load() == rows
+    assert list(led.rows(12, 15)) == rows[12:15]
+    assert led.tail(3) == rows[-3:] and led.tip() == rows[-1] and led.count() == len(rows)
+    led.rewrite(rows[:5])   # reset: the old blocks are gone
+    assert led.load() == rows[:5]
+
+
+@pytest.mark.parametrize("src, dst", list(itertools.permutations(sorted(BACKENDS), 2)))
+def test_migration_round_trip(workdir, rows, src, dst):
+    storage.open_ledger("Trip", src).rewrite(rows)
+    res = migrate.migrate("Trip", src, dst)
+    assert res["problem"] is None and res["blocks"] == len(rows) and res["tip_hash"] == rows[-1]["hash"]
+    back = storage.open_ledger("Trip", dst).load()
+    assert back == rows
+    storage.open_ledger("Trip", src).rewrite(rows[:1])
+    assert migrate.migrate("Trip", dst, src)["problem"] is None
+    assert storage.open_ledger("Trip", src).load() == rows
+
+
+def test_compare_chains_reports_the_first_difference(rows):
+    assert migrate.compare_chains(rows, rows) is None
+    assert "expected" in migrate.compare_chains(rows, rows[:-1])
+    changed = [dict(r) for r in rows]
+    changed[7]["amount"] += 1
+    assert migrate.compare_chains(rows, changed) == "block #7 differs in amount"
+    assert "no longer hashes" in migrate.compare_chains(changed, changed)
+
+
+def test_migrate_refuses_same_format_and_empty_source(workdir):
+    with pytest.raises(ValueError):
+        migrate.migrate(None, "csv", "csv")
+    with pytest.raises(ValueError):
+        migrate.migrate(None, "csv", "sqlite")
+
+
+@pytest.mark.parametrize("torn", [b"41,1700000000.0,Zo", b'41,1700000000.0,Zo,DEPOSIT,1.0,"half a\n', b'41,1.0,"x\ny"\n'])
+def test_csv_torn_tail_is_skipped_by_readers_and_repaired_by_the_writer(workdir, rows, torn):
+    led = storage.open_ledger(None, "csv")
+    led.rewrite(rows[:41])
+    with open(led.path, "ab") as f:
+        f.write(torn)   # crash mid-append
+    size = os.path.getsize(led.path)
+    assert led.tail(2) == rows[39:41]
+    assert list(led.rows(39)) == rows[39:41]
+    assert led.load() == rows[:41]
+    assert os.path.getsize(led.path) == size   # readers skip the tear; only a writer cuts it
+    led.append(rows[41:])   # never written onto the torn record
+    assert led.load() == rows
+    assert not repair_tail(led.path)
+
+
+@pytest.mark.parametrize("fmt", sorted(BACKENDS))
+def test_na_like_notes_load_verbatim(workdir, rows, fmt):
+    tip = from_dicts(rows)[-1]
+    extra = []
+    for note in ["N/A", "NA", "null", "NaN", "None", "nan"]:   # what a CSV parser may read as missing
+        tip = make_block(tip, "Zoë", "DEPOSIT", 1.0, note, "", "", "")
+        extra.append(tip)
+    led = storage.open_ledger(None, fmt)
+    led.rewrite(rows)
+    led.append(to_dicts(extra))
+    loaded = led.load()
+    assert [r["note"] for r in loaded[-len(extra):]] == [b.note for b in extra]
+    assert validate_chain(from_dicts(loaded))
+
+
+def test_sqlite_append_must_follow_the_tip(workdir, rows):
+    led = storage.open_ledger(None, "sqlite")
+    led.rewrite(rows[:10])
+    with pytest.raises(ValueError):
+        led.append(rows[11:13])
+    assert led.count() == 10
+
+
+def test_columnar_rewrite_is_seen_by_other_handles(workdir, rows):
+    from colstore import ColumnarLedger
+    a = storage.open_ledger(None, "columnar")
+    a.rewrite(rows)
+    b = ColumnarLedger(a.path)   # e.g. another process
+    a.rewrite(rows[:3])
+    assert b.to_rows() == rows[:3]
+    b.append(rows[3:])
+    assert a.load() == rows
+
+
+def test_columnar_torn_record_is_skipped_then_dropped_by_the_next_append(workdir, rows):
+    led = storage.open_ledger(None, "columnar")
+    led.rewrite(rows[:10])
+    with open(led.led.records_path, "ab") as f:
+        f.write(b"\x01" * 17)   # crash mid-append
+    size = os.path.getsize(led.led.records_path)
+    assert led.load() == rows[:10] and led.led.row(-1) == rows[9]
+    assert os.path.getsize(led.led.records_path) == size
+    led.append(rows[10:])
+    assert led.load() == rows
+
+
+@pytest.mark.parametrize("fmt", sorted(BACKENDS))
+def test_load_store_streams_the_ledger(workdir, rows, fmt, monkeypatch):
+    monkeypatch.setattr(storage, "LEDGER_FORMAT", fmt)
+    storage.save_chain(rows)
+    store = storage.load_store()
+    assert store.to_dicts() == rows and validate_chain(store)
+
+
+def test_append_blocks_keeps_the_pot_index(workdir, rows):
+    storage.save_chain(rows[:10])
+    storage.append_blocks(rows[10:20])
+    entry = storage.list_pots()[storage.DEFAULT_POT]
+    assert entry["count"] == 20 and entry["tip_hash"] == rows[19]["hash"]
+    storage.open_ledger().append(rows[20:25])   # written without updating the index
+    storage.append_blocks(rows[25:])
+    entry = storage.list_pots()[storage.DEFAULT_POT]
+    assert entry["count"] == len(rows) and entry["tip_hash"] == rows[-1]["hash"]
@@ -0,0 +1,108 @@
+import pickle
+
+import pytest
+
+import storage
+from backends import BACKENDS
+from blockstore import BlockStore
+from chain import Block, _hash_block, _payload, block_dict, canonical_message, make_genesis, to_dicts, validate_chain
+
+# amounts / timestamps that don't survive a trip through integer cents or a short float repr
+AMOUNTS = [0.1 + 0.2, 1 / 3, 1e-7, 12.345, 2.675, 1e16 + 2.0, -0.0, 5e-324, 123456789.01]
+TIMESTAMPS = [1700000000.1 + 0.2, 1700000000.123456789, 1e-300, 1700000060.0]
+
+
+def chained(payloads):
+    blocks = [make_genesis()]
+    for i, p in enumerate(payloads, 1):
+        payload = {"index": i, "timestamp": 1700000000.0 + i, "actor": "Alice", "action": "DEPOSIT", "amount": 1.0,
+                   "note": "", "prev_hash": blocks[-1].hash, "wallet_address": "", "signed_message": "",
+                   "signature": "", **p}
+        blocks.append(Block(**payload, hash=_hash_block(payload)))
+    return blocks
+
+
+@pytest.fixture(scope="module")
+def edge_blocks():
+    payloads = [{"amount": a} for a in AMOUNTS] + [{"timestamp": t} for t in TIMESTAMPS]
+    payloads += [
+        {"note": "ünïcödé\nand a newline"},
+        {"signature": "0x" + "AB" * 65},   # upper-case hex: kept verbatim
+        {"signature": "0x" + "ab" * 65, "wallet_address": "0x" + "12" * 20},
+        {"signed_message": "free text, not canonical"},
+    ]
+    blocks = chained(payloads)
+    # a canonical message (kept as just pot + TS) has to name the block's own prev_hash
+    payload = {**_payload(blocks[-1]), "index": len(blocks), "prev_hash": blocks[-1].hash,
+               "signed_message": canonical_message("Pot|With|Bars", "Alice", "DEPOSIT", 1.0, 1700000020, blocks[-1].hash)}
+    blocks.append(Block(**payload, hash=_hash_block(payload)))
+    return blocks
+
+
+def test_store_rehashes_exactly_like_the_blocks(edge_blocks):
+    store = BlockStore.from_rows(to_dicts(edge_blocks))
+    assert store.to_dicts() == to_dicts(edge_blocks)
+    for stored, b in zip(store, edge_blocks):
+        assert _hash_block(_payload(stored)) == b.hash
+        assert type(stored.amount) is type(b.amount) and type(stored.timestamp) is type(b.timestamp)
+    assert validate_chain(store) and validate_chain(edge_blocks)
+
+
+def test_non_float_and_non_hex_values_use_the_side_table():
+    blocks = chained([{"amount": 5, "timestamp": 1700000001}, {"amount": 0.005}])
+    rows = to_dicts(blocks)
+    rows[0]["prev_hash"] = "0"   # how a CSV genesis used to read back
+    store = BlockStore.from_rows(rows)
+    assert store.to_dicts() == rows
+    assert store[1].amount == 5 and type(store[1].amount) is int and type(store[1].timestamp) is int
+    assert store[2].amount == 0.005
+
+
+@pytest.mark.parametrize("field, value", [("amount", 2.0), ("note", "edited"), ("actor", "Mallory"),
+                                          ("timestamp", 1700000000.5), ("signature", "0x" + "cd" * 65)])
+def test_tampered_row_fails_in_the_store_like_in_the_list(edge_blocks, field, value):
+    rows = to_dicts(edge_blocks)
+    rows[5][field] = value
+    blocks = [Block(**r) for r in rows]
+    assert validate_chain(BlockStore.from_rows(rows)) is validate_chain(blocks) is False
+
+
+def test_tampered_tail_fails_in_the_store_like_in_the_list(edge_blocks):
+    rows = to_dicts(edge_blocks)
+    rows[-1]["hash"] = "f" * 64
+    assert validate_chain(BlockStore.from_rows(rows)) is validate_chain([Block(**r) for r in rows]) is False
+    rows = to_dicts(edge_blocks)
+    rows[-1]["amount"] = 1e-7
+    assert validate_chain(BlockStore.from_rows(rows)) is validate_chain([Block(**r) for r in rows]) is False
+
+
+def test_segments_rehash_like_the_whole_store(edge_blocks):
+    store = BlockStore.from_blocks(edge_blocks)
+    seg = store.segment(4, 12)
+    assert seg.to_dicts() == to_dicts(edge_blocks[4:12])
+    assert [block_dict(b) for b in store[4:12]] == seg.to_dicts()
+    assert store.segment(len(store) - 5, len(store)).to_dicts() == to_dicts(edge_blocks[-5:])   # canonical message
+
+
+def test_segments_carry_only_their_own_strings():
+    store = BlockStore.from_blocks(chained([{"note": f"note {i}", "actor": f"a{i % 7}"} for i in range(2000)]))
+    seg = store.segment(100, 110)
+    col, values = seg.codes("note")
+    assert sorted(values[c] for c in col) == sorted(f"note {i}" for i in range(99, 109))
+    # actor, note and wallet share one table: 10 notes, 7 actors and the empty wallet
+    assert set(values) == {f"note {i}" for i in range(99, 109)} | {f"a{i}" for i in range(7)} | {""}
+    assert len(pickle.dumps(seg)) * 20 < len(pickle.dumps(store))
+
+
+@pytest.mark.parametrize("fmt", sorted(BACKENDS))
+def test_non_representable_floats_round_trip_through_storage(workdir, edge_blocks, fmt, monkeypatch):
+    rows = to_dicts(edge_blocks)
+    if fmt == "sqlite":   # SQLite stores a REAL -0.0 as 0.0 (migrate.py reports such a block as no longer hashing)
+        rows = to_dicts(chained([{"amount": a} for a in AMOUNTS if str(a) != "-0.0"] + [{"timestamp": t} for t in TIMESTAMPS]))
+    led = storage.open_ledger(None, fmt)
+    led.rewrite(rows[:1])
+    led.append(rows[1:])
+    assert led.load() == rows
+    monkeypatch.setattr(storage, "LEDGER_FORMAT", fmt)
+    store = storage.load_store()
+    assert store.to_dicts() == rows and validate_chain(store)
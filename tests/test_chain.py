@@ -0,0 +1,79 @@
+import dataclasses
+
+import pytest
+
+from bench import synthetic_ledger
+from blockstore import BlockStore
+from chain import _hash_block, _payload, validate_chain, validate_incremental
+
+
+@pytest.fixture(scope="module")
+def blocks():
+    return synthetic_ledger(60, actors=4)
+
+
+def edited(chain, pos, rehash=False, **changes):
+    out = list(chain)
+    b = dataclasses.replace(out[pos], **changes)
+    if rehash:
+        b = dataclasses.replace(b, hash=_hash_block(_payload(b)))
+    out[pos] = b
+    return out
+
+
+def cp(chain, pos):
+    return {"index": chain[pos].index, "hash": chain[pos].hash}
+
+
+@pytest.mark.parametrize("wrap", [list, BlockStore.from_blocks])
+def test_checkpoint_is_the_tip_of_a_valid_chain(blocks, wrap):
+    chain = wrap(blocks)
+    assert validate_incremental(chain) == (True, cp(blocks, -1))
+    assert validate_incremental(chain, cp(blocks, 30)) == (True, cp(blocks, -1))
+    assert validate_incremental(chain, cp(blocks, -1)) == (True, cp(blocks, -1))
+
+
+def test_only_blocks_after_the_checkpoint_are_rehashed(blocks):
+    chain = edited(blocks, 10, note="edited, hash kept")   # inside the verified prefix
+    assert validate_incremental(chain, cp(blocks, 30)) == (True, cp(blocks, -1))
+    assert not validate_chain(chain)   # only the full audit sees it
+    assert validate_incremental(chain) == (False, None)
+
+
+@pytest.mark.parametrize("pos", [31, 45, -1])
+def test_tampered_block_after_the_checkpoint_fails(blocks, pos):
+    chain = edited(blocks, pos, amount=999.0)
+    assert validate_incremental(chain, cp(blocks, 30)) == (False, cp(blocks, 30))
+
+
+def test_rehashed_block_after_the_checkpoint_breaks_the_link(blocks):
+    chain = edited(blocks, 45, rehash=True, amount=999.0)
+    assert validate_incremental(chain, cp(blocks, 30)) == (False, cp(blocks, 30))
+
+
+def test_tampered_tail_with_a_consistent_hash_moves_the_checkpoint(blocks):
+    # the tip has no successor, so a re-hashed tip is a different but well-formed chain
+    chain = edited(blocks, -1, rehash=True, amount=999.0)
+    ok, new = validate_incremental(chain, cp(blocks, 30))
+    assert ok and new == cp(chain, -1) != cp(blocks, -1)
+    # ...which the old tip checkpoint no longer vouches for: full audit
+    assert validate_incremental(chain, cp(blocks, -1)) == (True, cp(chain, -1))
+
+
+def test_a_stale_checkpoint_falls_back_to_a_full_audit(blocks):
+    chain = edited(blocks, 10, note="edited, hash kept")
+    assert validate_incremental(chain, {"index": 30, "hash": "f" * 64}) == (False, None)
+    assert validate_incremental(chain, {"index": 500, "hash": blocks[-1].hash}) == (False, None)
+    assert validate_incremental(blocks, {"index": 30, "hash": "f" * 64}) == (True, cp(blocks, -1))
+
+
+def test_chain_must_start_at_genesis_or_an_anchor(blocks):
+    assert validate_incremental([]) == (False, None)
+    assert validate_incremental(blocks[1:]) == (False, None)
+    live = blocks[20:]
+    anchor = cp(blocks, 19)
+    assert validate_incremental(live, anchor=anchor) == (True, cp(blocks, -1))
+    assert validate_incremental(live, cp(blocks, 40), anchor) == (True, cp(blocks, -1))
+    assert validate_incremental(live, anchor={"index": 19, "hash": "f" * 64}) == (False, None)
+    assert validate_incremental(live, anchor={"index": 18, "hash": blocks[19].hash}) == (False, None)
+    assert validate_incremental(edited(live, 0, amount=1.0), anchor=anchor)[0] is False
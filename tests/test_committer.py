@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+import storage
+from chain import Block, block_dict, from_dicts, make_block, make_genesis, validate_chain
+from committer import CommitConflict, commit_block, commit_blocks, commit_built, reset_pot
+
+
+@pytest.fixture
+def genesis(workdir):
+    g = make_genesis()
+    storage.save_chain([block_dict(g)])
+    return g
+
+
+def tip() -> Block:
+    return Block(**storage.load_tail()[0])
+
+
+def deposit(prev, amount=1.0):
+    return make_block(prev, "Alice", "DEPOSIT", amount, "", "", "", "")
+
+
+def test_concurrent_writers_each_land_once(genesis):
+    def writer(n):
+        for _ in range(n):
+            while True:
+                try:
+                    commit_block(deposit(tip()))
+                    break
+                except CommitConflict:
+                    continue   # someone else got there first: rebuild on the new tip
+    threads = [threading.Thread(target=writer, args=(10,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    chain = from_dicts(storage.load_chain())
+    assert len(chain) == 61 and validate_chain(chain)
+    assert storage.list_pots()[storage.DEFAULT_POT]["count"] == 61
+
+
+def test_stale_block_is_rejected(genesis):
+    first = commit_block(deposit(genesis))
+    with pytest.raises(CommitConflict):
+        commit_block(deposit(genesis, 2.0))   # built on genesis, but the tip moved
+    assert tip().hash == first.hash
+
+
+def test_batch_after_a_conflict_is_rejected_whole(genesis):
+    a = deposit(genesis)
+    b = deposit(a)
+    commit_block(deposit(genesis, 5.0))
+    with pytest.raises(CommitConflict):
+        commit_blocks([a, b])
+    assert storage.count_blocks() == 2
+
+
+def test_commit_built_builds_on_the_tip_under_the_lock(genesis):
+    seen = []
+
+    def build(t):
+        seen.append(t.hash)
+        a = deposit(t)
+        return [a, deposit(a)]
+    first = commit_block(deposit(genesis))
+    assert [b.index for b in commit_built(build)] == [2, 3] and seen == [first.hash]
+    with pytest.raises(ValueError):
+        commit_built(lambda t: (_ for _ in ()).throw(ValueError("no")))
+    assert commit_built(lambda t: []) == [] and storage.count_blocks() == 4
+
+
+def test_failed_index_update_does_not_fail_the_commit(genesis):
+    def broken(pot, rows):
+        raise OSError("disk full")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(storage, "_index_append", broken)
+        block = commit_block(deposit(genesis))
+    assert tip().hash == block.hash
+    commit_block(deposit(block))
+    entry = storage.list_pots()[storage.DEFAULT_POT]
+    assert entry["count"] == 3 and entry["balance"] == 2.0   # healed on the next append
+
+
+def test_failed_ledger_write_fails_the_commit(genesis):
+    def broken(rows):
+        raise OSError("disk full")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(storage.open_ledger(), "append", broken)
+        with pytest.raises(OSError):
+            commit_block(deposit(genesis))
+    assert storage.count_blocks() == 1
+    commit_block(deposit(genesis))   # the writer re-reads the tip after a failure
+
+
+def test_reset_keeps_only_genesis(genesis):
+    commit_blocks([deposit(genesis)])
+    reset_pot(genesis)
+    assert [r["hash"] for r in storage.load_chain()] == [genesis.hash]
+    commit_block(deposit(genesis))
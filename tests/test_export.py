@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+import export
+import storage
+from backends import read_records
+from bench import synthetic_ledger
+from blockstore import BlockStore
+from chain import to_dicts
+from export import export_chain, export_pot, iter_chunks
+
+
+@pytest.fixture(scope="module")
+def blocks():
+    return synthetic_ledger(75, actors=3)
+
+
+@pytest.fixture
+def pot(workdir, blocks):
+    storage.save_chain(to_dicts(blocks))
+
+
+def parse(chunks, fmt="csv"):
+    text = "".join(chunks)
+    if fmt == "ndjson":
+        return [json.loads(line) for line in text.splitlines()]
+    return list(read_records(io.StringIO(text, newline="")))
+
+
+@pytest.mark.parametrize("fmt", export.FORMATS)
+@pytest.mark.parametrize("wrap", [list, BlockStore.from_blocks])
+def test_full_export_round_trips(blocks, fmt, wrap):
+    assert parse(export_chain(wrap(blocks), fmt), fmt) == to_dicts(blocks)
+
+
+def test_chunks_hold_chunk_rows_rows(blocks):
+    chunks = list(iter_chunks(to_dicts(blocks), "ndjson", chunk_rows=20))
+    assert [c.count("\n") for c in chunks] == [20, 20, 20, 15]
+    chunks = list(iter_chunks(to_dicts(blocks), "csv", chunk_rows=50))
+    assert chunks[0].startswith(",".join(storage.COLUMNS) + "\n") and len(chunks) == 2
+    assert list(iter_chunks([], "csv", header=False)) == []
+    with pytest.raises(ValueError):
+        list(iter_chunks([], "xml"))
+
+
+def test_ranges_and_since_hash(blocks):
+    rows = to_dicts(blocks)
+    assert parse(export_chain(blocks, start=70)) == rows[70:]
+    assert parse(export_chain(blocks, start=10, stop=20)) == rows[10:20]
+    assert parse(export_chain(blocks, after_hash=blocks[60].hash)) == rows[61:]
+    assert parse(export_chain(blocks, after_hash=blocks[-1].hash)) == []   # mirror is up to date
+    with pytest.raises(KeyError):
+        export_chain(blocks, after_hash="f" * 64)
+
+
+def test_live_tail_exports_from_its_first_block(blocks):
+    live = BlockStore.from_blocks(blocks[40:])
+    rows = to_dicts(blocks)
+    assert parse(export_chain(live, start=50)) == rows[50:]
+    assert parse(export_chain(live, after_hash=blocks[40].hash)) == rows[41:]
+    with pytest.raises(ValueError):
+        export_chain(live, start=10)
+
+
+def test_only_restricts_to_given_indexes(blocks):
+    only = [b.index for b in blocks if b.actor == "actor1"]
+    got = parse(export_chain(blocks, start=30, only=only))
+    assert got == [r for r in to_dicts(blocks) if r["actor"] == "actor1" and r["index"] >= 30]
+
+
+@pytest.mark.parametrize("fmt", export.FORMATS)
+def test_export_pot_streams_the_same_rows(pot, blocks, fmt):
+    assert list(export_pot(fmt=fmt)) == list(export_chain(blocks, fmt))
+    assert list(export_pot(fmt=fmt, start=5, stop=9)) == list(export_chain(blocks, fmt, 5, 9))
+    assert parse(export_pot(after_hash=blocks[70].hash)) == to_dicts(blocks)[71:]
+    with pytest.raises(KeyError):
+        list(export_pot(after_hash="f" * 64))
+
+
+def test_cli(pot, blocks, tmp_path, capsys):
+    out = tmp_path / "delta.ndjson"
+    assert export.main(["--format", "ndjson", "--since-index", "72", "--out", str(out)]) == 0
+    assert [json.loads(line)["index"] for line in out.read_text().splitlines()] == [72, 73, 74]
+    assert export.main(["--actor", "actor2", "--action", "WITHDRAW"]) == 0
+    expected = [r for r in to_dicts(blocks) if r["actor"] == "actor2" and r["action"] == "WITHDRAW"]
+    assert parse([capsys.readouterr().out]) == expected
+    assert export.main(["--after-hash", "f" * 64]) == 2
+    assert "unknown block hash" in capsys.readouterr().err
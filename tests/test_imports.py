@@ -0,0 +1,16 @@
+import os
+
+import bench
+
+
+def test_cold_imports_within_budget():
+    results = bench.check_imports()
+    assert {r["module"] for r in results} >= {"storage", "api", "app"}
+    over = [r for r in results if not r["ok"]]
+    assert not over, over
+
+
+def test_app_import_block_skips_deferred_imports():
+    _, roots = bench._script_imports(os.path.join(os.path.dirname(os.path.abspath(bench.__file__)), "app.py"))
+    assert "streamlit" in roots
+    assert not {"pandas", "altair", "analytics", "ledger_view"} & set(roots)
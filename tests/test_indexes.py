@@ -0,0 +1,55 @@
+import pytest
+
+from bench import synthetic_ledger
+from blockstore import BlockStore
+from indexes import LedgerIndex
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    return synthetic_ledger(120, actors=5, signed=0.25)
+
+
+@pytest.fixture
+def index(tmp_path):
+    ix = LedgerIndex(str(tmp_path / "ledger.index.sqlite3"))
+    yield ix
+    ix.close()
+
+
+@pytest.mark.parametrize("as_store", [False, True])
+def test_queries_match_a_scan(ledger, index, as_store):
+    assert index.sync(BlockStore.from_blocks(ledger) if as_store else ledger)
+    wallet = next(b.wallet_address for b in ledger if b.wallet_address)
+    assert index.query(actors=["actor1"]) == [b.index for b in ledger if b.actor == "actor1"]
+    assert index.query(actors=["actor1", "actor3"], actions=["WITHDRAW"]) == [
+        b.index for b in ledger if b.actor in ("actor1", "actor3") and b.action == "WITHDRAW"]
+    assert index.query(wallets=[wallet.upper()]) == [b.index for b in ledger if b.wallet_address == wallet]
+    lo, hi = ledger[30].timestamp, ledger[45].timestamp
+    assert index.query(start_ts=lo, end_ts=hi) == [b.index for b in ledger if lo <= b.timestamp < hi]
+    assert index.query(actions=["DEPOSIT"], start=50, stop=60) == [
+        b.index for b in ledger[50:60] if b.action == "DEPOSIT"]
+    assert index.query(actors=[]) == []
+    assert index.keys("action") == sorted({b.action for b in ledger})
+
+
+def test_newest_first_returns_the_newest_in_descending_order(ledger, index):
+    index.sync(ledger)
+    deposits = [b.index for b in ledger if b.action == "DEPOSIT"]
+    assert index.query(actions=["DEPOSIT"], limit=5, newest_first=True) == deposits[::-1][:5]
+    assert index.query(actions=["DEPOSIT"], limit=5) == deposits[:5]
+
+
+def test_sync_is_incremental_and_rebuilds_after_a_reset(ledger, index):
+    assert index.sync(ledger[:70])
+    assert index.count == 70
+    assert index.sync(ledger) and index.count == 120
+    assert not index.sync(ledger)
+    other = synthetic_ledger(40, actors=2, seed=7)   # history replaced (reset)
+    assert index.sync(other)
+    assert index.count == 40 and index.keys("actor") == sorted({b.actor for b in other})
+
+
+def test_unknown_field_raises(index):
+    with pytest.raises(ValueError):
+        index.keys("note")
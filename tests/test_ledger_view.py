@@ -0,0 +1,100 @@
+import dataclasses
+
+import pytest
+
+from bench import T0, synthetic_ledger
+from blockstore import BlockStore
+from chain import _hash_block, _payload, make_block
+from indexes import LedgerIndex
+from ledger_view import DISPLAY_COLUMNS, page_count, page_frame, select
+
+
+@pytest.fixture(scope="module")
+def chain():
+    blocks = synthetic_ledger(90, actors=4, signed=0.2)
+    tip = blocks[-1]
+    for ts in (T0 + 10.0, T0 + 200_000.0, T0 + 5.0):   # out of order: API batches, clock skew
+        tip = make_block(tip, "Late", "DEPOSIT", 1.0, "", "", "", "", timestamp=ts)
+        blocks.append(tip)
+    return BlockStore.from_blocks(blocks)
+
+
+@pytest.fixture
+def index(tmp_path, chain):
+    idx = LedgerIndex(str(tmp_path / "index.sqlite3"))
+    idx.sync(chain)
+    yield idx
+    idx.close()
+
+
+def scan(chain, keep):
+    return [i for i, b in enumerate(chain) if keep(b)]
+
+
+FILTERS = [
+    ({}, lambda b: True),
+    ({"actors": ["actor1", "Late"]}, lambda b: b.actor in ("actor1", "Late")),
+    ({"actions": ["WITHDRAW"]}, lambda b: b.action == "WITHDRAW"),
+    ({"start_ts": T0 + 60 * 30, "end_ts": T0 + 60 * 60}, lambda b: T0 + 1800 <= b.timestamp < T0 + 3600),
+    ({"start_ts": T0 + 60 * 85}, lambda b: b.timestamp >= T0 + 5100),
+    ({"end_ts": T0 + 60 * 2}, lambda b: b.timestamp < T0 + 120),
+    ({"actors": ["actor2"], "actions": ["DEPOSIT"], "start_ts": T0 + 600},
+     lambda b: b.actor == "actor2" and b.action == "DEPOSIT" and b.timestamp >= T0 + 600),
+]
+
+
+@pytest.mark.parametrize("filters, keep", FILTERS)
+def test_select_matches_a_scan_with_and_without_the_index(chain, index, filters, keep):
+    expected = scan(chain, keep)
+    assert list(select(chain, **filters)) == expected
+    assert list(select(chain, index=index, **filters)) == expected
+
+
+def test_time_filter_sees_blocks_with_earlier_timestamps(chain, index):
+    # the last blocks are stamped before most of the ledger: a bisection on ts would miss them
+    late = [len(chain) - 3, len(chain) - 1]
+    got = select(chain, start_ts=T0, end_ts=T0 + 30, index=index)
+    assert [p for p in got if p in late] == late
+
+
+def test_select_by_wallet_is_case_insensitive(chain, index):
+    wallet = next(b.wallet_address for b in chain if b.wallet_address)
+    expected = scan(chain, lambda b: b.wallet_address == wallet)
+    assert select(chain, wallets=[wallet.upper().replace("0X", "0x")]) == expected
+    assert select(chain, wallets=[wallet.lower()], index=index) == expected
+
+
+def test_select_over_an_archived_tail(tmp_path, chain):
+    live = chain.segment(40, len(chain))
+    idx = LedgerIndex(str(tmp_path / "tail.sqlite3"))
+    idx.sync(chain)   # the index covers the whole history; positions are relative to the live tail
+    try:
+        assert select(live, actors=["actor3"], index=idx) == scan(live, lambda b: b.actor == "actor3")
+    finally:
+        idx.close()
+
+
+def test_pages():
+    assert page_count(0, 50) == 1 and page_count(50, 50) == 1 and page_count(51, 50) == 2
+
+
+def test_page_frame_formats_only_the_page(chain):
+    positions = select(chain, actions=["DEPOSIT"])
+    first = page_frame(chain, positions, 1, 10, "USD")
+    assert list(first.columns) == DISPLAY_COLUMNS and len(first) == 10
+    assert list(first["index"]) == [chain[p].index for p in positions[::-1][:10]]   # newest first
+    oldest = page_frame(chain, positions, 1, 10, "USD", newest_first=False)
+    assert list(oldest["index"]) == [chain[p].index for p in positions[:10]]
+    last = page_count(len(positions), 10)
+    tail = page_frame(chain, positions, last, 10, "USD")
+    assert len(tail) == len(positions) - 10 * (last - 1) and tail["index"].iloc[-1] == chain[positions[0]].index
+    assert page_frame(chain, [], 1, 10, "USD").empty
+
+
+def test_display_rows_follow_the_block(chain):
+    b = chain[5]
+    row = page_frame(chain, [5], 1, 10, "EUR").iloc[0]
+    assert row["actor"] == b.actor and row["hash"] == b.hash[:10] + "…" and row["amount"].startswith("€")
+    edited = dataclasses.replace(b, note="edited")
+    edited = dataclasses.replace(edited, hash=_hash_block(_payload(edited)))
+    assert page_frame([edited], [0], 1, 1, "EUR").iloc[0]["note"] == "edited"   # cached per hash, not per index
@@ -0,0 +1,94 @@
+import hashlib
+
+import pytest
+
+from merkle import EMPTY_ROOT, MerkleLog, _leaf, _node, _split, verify_consistency, verify_inclusion
+
+
+def hashes(n):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(n)]
+
+
+def naive_root(leaves):
+    # straight from the definition: split at the largest power of two below n
+    if len(leaves) == 1:
+        return _leaf(leaves[0])
+    k = _split(len(leaves))
+    return _node(naive_root(leaves[:k]), naive_root(leaves[k:]))
+
+
+def test_root_matches_definition_for_every_size():
+    hs = hashes(40)
+    tree = MerkleLog()
+    assert tree.root() == EMPTY_ROOT
+    for n in range(1, len(hs) + 1):
+        tree.append(hs[n - 1])
+        assert tree.root() == naive_root(hs[:n]).hex()
+    assert all(tree.root(n) == naive_root(hs[:n]).hex() for n in range(1, len(hs) + 1))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 8, 13, 33])
+def test_inclusion_proofs_verify(size):
+    hs = hashes(size + 5)
+    tree = MerkleLog()
+    tree.extend(hs)
+    root = tree.root(size)
+    for i in range(size):
+        proof = tree.inclusion_proof(i, size)
+        assert verify_inclusion(hs[i], i, size, proof, root)
+        assert not verify_inclusion(hs[i], i, size, proof, tree.root())   # root of the bigger tree
+        assert not verify_inclusion(hs[(i + 1) % len(hs)], i, size, proof, root)   # other block
+        if size > 1:
+            assert not verify_inclusion(hs[i], (i + 1) % size, size, proof, root)  # wrong position
+            bad = list(proof)
+            bad[0] = hashlib.sha256(b"x").hexdigest()
+            assert not verify_inclusion(hs[i], i, size, bad, root)
+
+
+def test_consistency_proofs_verify():
+    hs = hashes(21)
+    tree = MerkleLog()
+    tree.extend(hs)
+    for size in range(1, 22):
+        for old in range(1, size + 1):
+            proof = tree.consistency_proof(old, size)
+            assert verify_consistency(old, size, tree.root(old), tree.root(size), proof), (old, size)
+            if old < size:
+                assert not verify_consistency(old, size, tree.root(size), tree.root(size), proof)
+
+
+def test_consistency_fails_after_history_rewrite():
+    hs = hashes(12)
+    tree = MerkleLog()
+    tree.extend(hs)
+    forked = MerkleLog()
+    forked.extend(hs[:5] + [hashlib.sha256(b"forged").hexdigest()] + hs[6:])
+    proof = forked.consistency_proof(8, 12)
+    assert not verify_consistency(8, 12, tree.root(8), forked.root(12), proof)
+
+
+def test_out_of_range_requests_raise():
+    tree = MerkleLog()
+    tree.extend(hashes(4))
+    with pytest.raises(ValueError):
+        tree.inclusion_proof(4)
+    with pytest.raises(ValueError):
+        tree.consistency_proof(0, 4)
+    with pytest.raises(ValueError):
+        tree.root(5)
+
+
+def test_persisted_tree_reloads_and_resyncs(tmp_path):
+    hs = hashes(30)
+    tree = MerkleLog(str(tmp_path / "merkle"))
+    tree.sync(hs[:17])
+    tree.save()
+    tree.sync(hs)
+    tree.save()
+    again = MerkleLog(str(tmp_path / "merkle"))
+    assert again.size == 30 and again.root() == naive_root(hs).hex()
+    assert not again.sync(hs)
+    # the ledger diverged (reset): the tree is rebuilt from the new hashes
+    other = hashes(31)[1:]
+    assert again.sync(other)
+    assert again.root() == naive_root(other).hex()
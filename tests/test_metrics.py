@@ -0,0 +1,114 @@
+import os
+import threading
+
+import pytest
+
+import metrics
+import storage
+from metrics import Registry, RerunTrace, count, timed, timer
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    reg = Registry()
+    monkeypatch.setattr(metrics, "REGISTRY", reg)
+    return reg
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    for s in (0.0005, 0.02, 0.02, 3.0, 60.0):
+        registry.observe("pot_call_seconds", "f", s)
+    h = registry.histograms[("pot_call_seconds", "f")]
+    assert h.count == 5 and h.max == 60.0 and h.total == pytest.approx(63.0405)
+    assert dict(zip(metrics.BUCKETS, h.buckets))[0.001] == 1
+    assert dict(zip(metrics.BUCKETS, h.buckets))[0.025] == 3
+    assert h.buckets[-1] == 4   # 60 s is only in +Inf
+
+
+def test_prometheus_text(registry):
+    registry.observe("pot_call_seconds", "storage.load_chain", 0.002)
+    registry.observe("pot_rerun_seconds", "", 0.3)
+    registry.inc("pot_events_total", "blocks_committed", 3)
+    text = registry.prometheus()
+    assert "# TYPE pot_call_seconds histogram" in text
+    assert 'pot_call_seconds_bucket{fn="storage.load_chain",le="0.001"} 0' in text
+    assert 'pot_call_seconds_bucket{fn="storage.load_chain",le="0.005"} 1' in text
+    assert 'pot_call_seconds_bucket{fn="storage.load_chain",le="+Inf"} 1' in text
+    assert 'pot_call_seconds_count{fn="storage.load_chain"} 1' in text
+    assert 'pot_rerun_seconds_bucket{le="0.5"} 1' in text and "pot_rerun_seconds_sum 0.300000" in text
+    assert "# TYPE pot_events_total counter" in text and 'pot_events_total{event="blocks_committed"} 3' in text
+    assert text.endswith("\n")
+
+
+def test_rows_for_the_diagnostics_table(registry):
+    registry.observe("pot_call_seconds", "b", 0.004)
+    registry.observe("pot_call_seconds", "b", 0.002)
+    registry.observe("pot_call_seconds", "a", 0.001)
+    rows = registry.rows()
+    assert [r["name"] for r in rows] == ["a", "b"]
+    assert rows[1] == {"metric": "pot_call_seconds", "name": "b", "calls": 2, "total_ms": 6.0, "mean_ms": 3.0, "max_ms": 4.0}
+
+
+def test_timed_timer_and_count_use_the_registry(registry):
+    @timed("demo.fails")
+    def fails():
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        fails()
+    with timer("demo.block"):
+        pass
+    count("cache_hit")
+    count("cache_hit", 2)
+    assert registry.histograms[("pot_call_seconds", "demo.fails")].count == 1   # recorded even on error
+    assert registry.histograms[("pot_call_seconds", "demo.block")].count == 1
+    assert registry.counters[("pot_events_total", "cache_hit")] == 3
+
+
+def test_entry_points_are_instrumented(workdir, registry):
+    storage.save_chain([{"index": 0, "timestamp": 0.0, "actor": "SYSTEM", "action": "GENESIS", "amount": 0.0,
+                         "note": "", "prev_hash": "0" * 64, "wallet_address": "", "signed_message": "",
+                         "signature": "", "hash": "a" * 64}])
+    storage.load_chain()
+    storage.load_store()
+    names = {label for _, label in registry.histograms}
+    assert {"storage.save_chain", "storage.load_chain", "storage.load_store"} <= names
+
+
+def test_write_replaces_the_file_whole(tmp_path, registry):
+    path = tmp_path / "m" / "metrics.prom"
+    registry.inc("pot_events_total", "x")
+
+    def writer():
+        for _ in range(20):
+            registry.write(str(path))
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert path.read_text() == registry.prometheus()
+    assert os.listdir(path.parent) == ["metrics.prom"]   # no temp files left behind
+    registry.write("")   # disabled: nothing to do
+
+
+def test_rerun_trace_laps_phases(tmp_path, registry, monkeypatch):
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path / "profiles"))
+    trace = RerunTrace(profile=True)
+    trace.begin("load")
+    trace.begin("render")
+    prof = trace.finish(str(tmp_path / "metrics.prom"))
+    assert [name for name, _ in trace.phases] == ["load", "render"]
+    assert registry.histograms[("pot_rerun_phase_seconds", "load")].count == 1
+    assert registry.histograms[("pot_rerun_seconds", "")].count == 1
+    assert os.path.exists(prof) and prof.endswith(".prof")
+    assert "pot_rerun_phase_seconds" in (tmp_path / "metrics.prom").read_text()
+
+
+def test_aborted_rerun_stops_profiling(tmp_path, registry):
+    trace = RerunTrace(profile=True)
+    trace.begin("insert")
+    trace.abort()
+    assert trace.profiler is None
+    assert trace.finish(str(tmp_path / "metrics.prom")) is None
+    assert [name for name, _ in trace.phases] == ["insert"]
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import storage
+from bench import synthetic_ledger
+from chain import Block, block_dict, make_block, make_genesis, to_dicts
+
+
+def pot_rows(pot, n):
+    g = make_genesis(pot)
+    blocks = [g]
+    for i in range(1, n):
+        blocks.append(make_block(blocks[-1], "Alice" if i % 2 else "Bob", "DEPOSIT", 10.0 * i, "", "", "", ""))
+    return to_dicts(blocks)
+
+
+def test_pot_directories():
+    assert storage.pot_dir(None) == storage.pot_dir(storage.DEFAULT_POT) == storage.DATA_DIR
+    assert storage.pot_dir("Road Trip") == os.path.join(storage.POTS_DIR, "Road_Trip")
+    assert storage.pot_slug("Road/Trip!") == "Road_Trip" and storage.pot_slug("???") == "pot"
+
+
+def test_pots_are_stored_and_indexed_separately(workdir):
+    storage.save_chain(pot_rows("", 3))
+    storage.save_chain(pot_rows("Road Trip", 5), "Road Trip")
+    pots = storage.list_pots()
+    assert set(pots) == {storage.DEFAULT_POT, "Road Trip"}
+    assert pots["Road Trip"]["count"] == 5 and pots["Road Trip"]["balance"] == 100.0
+    assert pots[storage.DEFAULT_POT]["count"] == 3 and pots[storage.DEFAULT_POT]["balance"] == 30.0
+    assert storage.load_chain("Road Trip")[0]["note"] == "Ledger created for Road Trip"
+    assert len(storage.load_chain()) == 3
+
+
+def test_pot_owner_reports_a_slug_clash(workdir):
+    storage.save_chain(pot_rows("Road Trip", 2), "Road Trip")
+    assert storage.pot_owner("Road Trip") is None   # its own directory
+    assert storage.pot_owner("Road_Trip") == storage.pot_owner("Road/Trip") == "Road Trip"
+    assert storage.pot_owner("Ski Week") is None
+    with pytest.raises(ValueError, match="Road Trip"):
+        storage.save_chain(pot_rows("Road_Trip", 2), "Road_Trip")
+    assert storage.load_chain("Road Trip")[0]["note"] == "Ledger created for Road Trip"   # untouched
+    storage.save_chain(pot_rows("Road Trip", 3), "Road Trip")   # re-saving the owner itself is fine
+    assert storage.list_pots()["Road Trip"]["count"] == 3
+
+
+def test_pot_exists_does_not_create_the_pot(workdir):
+    assert not storage.pot_exists("Ghost")
+    assert not os.path.exists(storage.pot_dir("Ghost"))
+    storage.save_chain(pot_rows("Ghost", 1), "Ghost")
+    assert storage.pot_exists("Ghost")
+
+
+def test_legacy_single_ledger_is_indexed_as_the_default_pot(workdir):
+    rows = to_dicts(synthetic_ledger(12))
+    storage.open_ledger().rewrite(rows)   # data/ledger.csv, no data/pots.json yet
+    entry = storage.list_pots()[storage.DEFAULT_POT]
+    assert entry["count"] == 12 and entry["tip_hash"] == rows[-1]["hash"]
+
+
+def test_appends_update_only_their_pot(workdir):
+    storage.save_chain(pot_rows("", 2))
+    rows = pot_rows("Road Trip", 2)
+    storage.save_chain(rows, "Road Trip")
+    tip = make_block(Block(**rows[-1]), "Carol", "WITHDRAW", 5.0, "", "", "", "")
+    storage.append_blocks([block_dict(tip)], "Road Trip")
+    pots = storage.list_pots()
+    assert pots["Road Trip"]["count"] == 3 and pots["Road Trip"]["balance"] == 5.0
+    assert pots[storage.DEFAULT_POT]["count"] == 2
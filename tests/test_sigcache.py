@@ -0,0 +1,65 @@
+import pytest
+
+import sigcache
+from sigcache import SignatureCache, sig_key
+
+
+@pytest.fixture
+def signed():
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+    acct = Account.from_key(b"\x02" * 32)
+    msg = "POT:test|ACTOR:Alice|ACTION:DEPOSIT|AMOUNT:1.00|TS:1|PREV:" + "0" * 64
+    return msg, acct.sign_message(encode_defunct(text=msg)).signature.hex(), acct.address
+
+
+@pytest.fixture
+def recoveries(monkeypatch):
+    calls = []
+    real = sigcache._recover
+
+    def counting(message, signature):
+        calls.append(message)
+        return real(message, signature)
+    monkeypatch.setattr(sigcache, "_recover", counting)
+    return calls
+
+
+def test_recovery_is_cached_across_instances(tmp_path, signed, recoveries):
+    msg, sig, address = signed
+    path = str(tmp_path / "sigcache.sqlite3")
+    assert SignatureCache(path).recover(msg, sig) == address
+    assert SignatureCache(path).recover(msg, sig) == address   # reopened: served from the file
+    assert SignatureCache(path).recover(msg, sig.upper().replace("0X", "0x")) == address   # same key
+    assert len(recoveries) == 1
+
+
+def test_failed_recoveries_are_not_cached(signed, recoveries):
+    msg, _, _ = signed
+    cache = SignatureCache("")
+    for _ in range(2):
+        with pytest.raises(Exception):
+            cache.recover(msg, "0x" + "00" * 65)
+    assert len(recoveries) == 2
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    cache = SignatureCache(str(tmp_path / "s.sqlite3"), max_entries=10)
+    keys = [sig_key(f"m{i}", "0x01") for i in range(25)]
+    for k in keys:
+        cache.put_many([(k, "0xabc")])
+    found = cache.get_many(keys)
+    assert len(found) <= 10 and keys[-1] in found and keys[0] not in found
+    mem = SignatureCache("", max_entries=10)
+    mem.put_many((k, "0xabc") for k in keys)
+    assert set(mem.get_many(keys)) == set(keys[-10:])
+
+
+def test_in_memory_eviction_keeps_recently_used_entries():
+    keys = [sig_key(f"m{i}", "0x01") for i in range(12)]
+    mem = SignatureCache("", max_entries=10)
+    mem.put_many((k, "0xabc") for k in keys[:10])
+    mem.get_many([keys[0]])                       # a hit makes keys[0] the most recently used
+    mem.put_many([(keys[1], "0xdef")])            # so does a re-put
+    mem.put_many((k, "0xabc") for k in keys[10:])
+    assert set(mem.get_many(keys)) == {keys[0], keys[1]} | set(keys[4:])
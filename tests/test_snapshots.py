@@ -0,0 +1,143 @@
+import gzip
+import os
+
+import pytest
+
+import snapshots
+import storage
+from aggregates import Aggregates
+from analytics import Rollups
+from bench import synthetic_ledger
+from chain import to_dicts, validate_incremental
+from export import export_chain, export_pot
+from merkle import MerkleLog
+from snapshots import anchor_for, archive_upto, maybe_snapshot, sync_state, take_snapshot, verify_archive
+
+
+@pytest.fixture(scope="module")
+def blocks():
+    return synthetic_ledger(120, actors=4)
+
+
+@pytest.fixture
+def pot(workdir, blocks):
+    storage.save_chain(to_dicts(blocks[:80]))
+
+
+def full_state(blocks):
+    agg, rollups = Aggregates(), Rollups()
+    agg.sync(blocks)
+    rollups.sync(blocks)
+    mtree = MerkleLog()
+    mtree.extend(b.hash for b in blocks)
+    return agg, rollups, mtree.root()
+
+
+def synced():
+    chain = storage.load_store()
+    agg, rollups, mtree = sync_state(chain)
+    return chain, agg, rollups, mtree
+
+
+def grow(blocks, stop):
+    storage.append_blocks(to_dicts(blocks[storage.load_tail()[0]["index"] + 1:stop]))
+
+
+def test_sync_state_catches_up_and_persists(pot, blocks):
+    chain, agg, rollups, mtree = synced()
+    assert (agg, rollups, mtree.root()) == full_state(blocks[:80])
+    assert Aggregates.from_dict(storage.load_aggregates()) == agg
+    assert Rollups.from_dict(storage.load_rollups()) == rollups
+
+
+def test_take_snapshot_needs_synced_state(pot, blocks):
+    chain, agg, rollups, mtree = synced()
+    grow(blocks, 90)
+    with pytest.raises(ValueError):
+        take_snapshot(storage.load_store(), agg, rollups, mtree)
+    snap = take_snapshot(chain, agg, rollups, mtree)
+    assert snap["index"] == 79 and storage.list_snapshots() == [79]
+    assert snap["merkle"] == {"size": 80, "root": mtree.root()}
+
+
+def test_maybe_snapshot_every_n_blocks(pot, blocks):
+    assert maybe_snapshot(*synced(), every=100) is None
+    assert maybe_snapshot(*synced(), every=50)["index"] == 79
+    grow(blocks, 100)
+    assert maybe_snapshot(*synced(), every=50) is None
+    assert maybe_snapshot(*synced(), every=0) is None
+
+
+def test_lost_sidecars_resume_from_the_snapshot(pot, blocks, monkeypatch):
+    take_snapshot(*synced())
+    grow(blocks, 100)
+    storage.save_aggregates(None)
+    storage.save_rollups(None)
+    applied = []
+    real = Aggregates.apply
+    monkeypatch.setattr(Aggregates, "apply", lambda self, b: (applied.append(b.index), real(self, b)))
+    chain, agg, rollups, mtree = synced()
+    assert applied == list(range(80, 100))   # only the blocks after the snapshot are replayed
+    assert (agg, rollups, mtree.root()) == full_state(blocks[:100])
+
+
+def test_archive_keeps_the_history_verifiable(pot, blocks):
+    take_snapshot(*synced())
+    grow(blocks, 120)
+    seg = archive_upto(79)
+    assert (seg["first"], seg["last"], seg["last_hash"]) == (0, 79, blocks[79].hash)
+    live = storage.load_store()
+    assert live[0].index == 80 and len(live) == 40
+    assert list(storage.iter_rows()) == to_dicts(blocks)   # archive first, then the live ledger
+    assert list(storage.iter_rows(None, 75, 85)) == to_dicts(blocks[75:85])
+    assert "".join(export_pot()) == "".join(export_chain(blocks))
+    assert verify_archive()
+    assert validate_incremental(live, None, anchor_for(live)) == (True, {"index": 119, "hash": blocks[-1].hash})
+    # startup on the live tail: sidecars or, if lost, the anchoring snapshot
+    assert full_state(blocks)[:2] == tuple(sync_state(live))[:2]
+    storage.save_aggregates(None)
+    storage.save_rollups(None)
+    agg, rollups, mtree = sync_state(live)
+    assert (agg, rollups, mtree.root()) == full_state(blocks)
+
+
+def test_archive_refuses_bad_requests(pot, blocks):
+    with pytest.raises(ValueError, match="no snapshot"):
+        archive_upto(50)
+    take_snapshot(*synced())
+    with pytest.raises(ValueError, match="tip stays live"):
+        archive_upto(79)   # 79 is the tip
+    assert storage.load_archive_manifest() == []
+
+
+def test_tampered_archive_fails_verification(pot, blocks):
+    take_snapshot(*synced())
+    grow(blocks, 90)
+    seg = archive_upto(79)
+    path = os.path.join(storage.archive_dir(), seg["file"])
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        text = f.read()
+    with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+        f.write(text.replace("actor1", "actor9", 1))
+    assert not verify_archive()
+    assert snapshots.main(["verify"]) == 1
+
+
+def test_old_snapshots_are_pruned_but_the_anchor_is_kept(pot, blocks, monkeypatch):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_KEEP", 2)
+    take_snapshot(*synced())
+    for stop in (85, 90, 95, 100):
+        grow(blocks, stop)
+        if stop == 85:
+            archive_upto(79)
+        take_snapshot(*synced())
+    assert storage.list_snapshots() == [79, 94, 99]
+
+
+def test_cli(pot, blocks, capsys):
+    assert snapshots.main(["snapshot"]) == 0
+    assert snapshots.main(["archive"]) == 1   # nothing below the tip yet
+    grow(blocks, 100)
+    assert snapshots.main(["archive"]) == 0
+    assert "archived blocks 0..79" in capsys.readouterr().out
+    assert snapshots.main(["verify"]) == 0
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+import summarize
+from summarize import coach_summary, local_summary
+
+ROWS = [
+    {"index": 0, "actor": "GENESIS", "action": "GENESIS", "amount": 0.0, "note": ""},
+    {"index": 1, "actor": "Alice", "action": "DEPOSIT", "amount": 40.0, "note": "rent"},
+    {"index": 2, "actor": "Bob", "action": "DEPOSIT", "amount": 25.0, "note": ""},
+]
+
+
+class StubGenai:
+    """Stands in for google.generativeai: records prompts, answers once `release` is set."""
+
+    def __init__(self, text="AI says: keep going!", fail=False):
+        self.text, self.fail = text, fail
+        self.prompts = []
+        self.release = threading.Event()   # held until the test lets the call finish
+
+    def configure(self, api_key):
+        pass
+
+    def list_models(self):
+        return []
+
+    def GenerativeModel(self, model_id):
+        stub = self
+
+        class Model:
+            def generate_content(self, prompt, request_options=None):
+                stub.prompts.append(prompt)
+                stub.release.wait(5)
+                if stub.fail:
+                    raise RuntimeError("quota exceeded")
+                return type("Resp", (), {"text": stub.text})()
+        return Model()
+
+
+@pytest.fixture(autouse=True)
+def fresh_coach(monkeypatch):
+    monkeypatch.setattr(summarize, "_env_loaded", True)   # no .env from the checkout
+    monkeypatch.setenv("GEMINI_MODEL", "stub-model")
+    monkeypatch.delenv("USE_AI_STUDIO", raising=False)
+    summarize._summary_cache.clear()
+    summarize._inflight.clear()
+    yield
+    summarize._summary_cache.clear()
+    summarize._inflight.clear()
+
+
+def settle(genai, key):
+    genai.release.set()
+    fut, _ = summarize._inflight[key]
+    fut.result(timeout=5)
+
+
+def test_miss_serves_the_local_summary_then_the_cached_ai_text():
+    genai = StubGenai()
+    local = local_summary(ROWS, 100.0, "$")
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == (local, True)
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == (local, True)   # still generating
+    settle(genai, ("tip1", 100.0, "$"))
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == ("AI says: keep going!", False)
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == ("AI says: keep going!", False)   # hit
+    assert len(genai.prompts) == 1 and "Alice | DEPOSIT | 40.0 | rent" in genai.prompts[0]
+
+
+def test_a_new_tip_or_goal_is_a_miss():
+    for tip, goal in [("tip1", 100.0), ("tip2", 100.0), ("tip2", 200.0)]:
+        genai = StubGenai(text=f"AI on {tip}")
+        assert coach_summary(ROWS, goal, "$", tip, genai=genai)[1]
+        settle(genai, (tip, goal, "$"))
+        assert coach_summary(ROWS, goal, "$", tip, genai=genai) == (f"AI on {tip}", False)
+        assert len(genai.prompts) == 1
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == ("AI on tip1", False)   # still cached
+
+
+def test_a_failed_call_caches_the_local_summary():
+    genai = StubGenai(fail=True)
+    local = local_summary(ROWS, 100.0, "$")
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == (local, True)
+    with pytest.raises(RuntimeError):
+        settle(genai, ("tip1", 100.0, "$"))
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == (local, False)
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == (local, False)
+    assert len(genai.prompts) == 1   # not retried on every rerun
+
+
+def test_a_call_past_the_timeout_is_abandoned():
+    genai = StubGenai()
+    local = local_summary(ROWS, 100.0, "$")
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai, timeout=0.05) == (local, True)
+    time.sleep(0.1)
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai, timeout=0.05) == (local, False)
+    assert not summarize._inflight
+    genai.release.set()
+    assert coach_summary(ROWS, 100.0, "$", "tip1", genai=genai) == (local, False)   # not retried for a while
+    assert len(genai.prompts) == 1
+
+
+def test_without_a_client_or_key_the_coach_stays_local(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    assert coach_summary(ROWS, 100.0, "$", "tip1") == (local_summary(ROWS, 100.0, "$"), False)
+    assert not summarize._inflight